@@ -0,0 +1,80 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+import logging
+from .models.analytics import rollups
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+SORT_FIELDS = ("avg_score", "attempts", "pass_rate")
+
+# Leaderboard endpoint
+@router.get("/leaderboard")
+async def leaderboard(level: Optional[int] = None, limit: int = Query(10, ge=1, le=100)):
+    """
+    Top players by best score on a level
+
+    - level: The level to rank (attempts sent without a level are ranked together when omitted)
+    - limit: How many entries to return
+    """
+    return rollups.leaderboard(level, limit)
+
+# Streak leaderboard endpoint
+@router.get("/streaks")
+async def streaks(limit: int = Query(10, ge=1, le=100)):
+    """Top players by longest run of passing attempts, with their current streak"""
+    return rollups.streak_leaderboard(limit)
+
+# Player summary endpoint
+@router.get("/players/{player_id}")
+async def player(player_id: str):
+    """A player's streaks, and best score and rank on each level they have played"""
+    if player_id not in rollups.streaks:
+        raise HTTPException(status_code=404, detail=f"No scored attempts for player {player_id}")
+    return rollups.player(player_id)
+
+# Card combination analytics endpoint
+@router.get("/combinations")
+async def combinations(
+    limit: int = Query(20, ge=1, le=500),
+    min_attempts: int = Query(1, ge=1),
+    sort: str = "avg_score"
+):
+    """
+    Average score, pass rate and average metrics per mentor x method x modifiers combination
+
+    - limit: How many combinations to return
+    - min_attempts: Leave out combinations with fewer scored attempts
+    - sort: avg_score, attempts or pass_rate (highest first)
+    """
+    if sort not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_FIELDS)}")
+    return {"combinations": rollups.combination_summaries(limit, min_attempts, sort)}
+
+# Single combination endpoint
+@router.get("/combination")
+async def combination(
+    mentor_type: Optional[str] = None,
+    method_type: Optional[str] = None,
+    modifiers: Optional[List[str]] = Query(None)
+):
+    """One combination's summary and score histogram; modifiers may be given in any order"""
+    result = rollups.combination(mentor_type, method_type, modifiers)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No scored attempts for this card combination")
+    return result
+
+# Percentile rank endpoint
+@router.get("/percentile")
+async def percentile(score: float = Query(..., ge=0.0, le=1.0), level: Optional[int] = None):
+    """Percentile rank of a score among all scored attempts, or among one level's"""
+    return rollups.percentile(score, level)
+
+# Rollup statistics endpoint
+@router.get("/stats")
+async def analytics_stats():
+    """Report rollup sizes and whether the startup rebuild is still running"""
+    return rollups.stats()
@@ -0,0 +1,276 @@
+"""
+Run a JSONL corpus of prompts through generation and evaluation offline.
+
+    python -m api.bulk prompts.jsonl --output results.jsonl
+    python -m api.bulk prompts.jsonl --output results.jsonl --kind play --workers 8
+    python -m api.bulk prompts.jsonl --output results.jsonl --resume
+
+Each input line is a GenerationRequest, EvaluationRequest or PlayRequest as
+JSON, with an optional "kind" (generate, evaluate or play; --kind sets the
+default). Records go to a pool of worker processes in batches, straight to
+MistralGenerator and PrometheusEvaluator, skipping the cache and the heuristic
+tier. Results are appended to the output in input order, one line per input
+line, as each batch finishes, and only a bounded window of batches is ever in
+flight, so memory stays flat however large the corpus is. After an
+interruption, --resume continues from the last line written. Score statistics
+per card combination are printed at the end.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .mistral import GenerationRequest
+from .prometheus import EvaluationRequest
+from .play import PlayRequest
+from .models.analytics import Combination, CombinationStats, catalogued, rollups
+from .models.attempts import combination_key
+from .models.load_mistral import generator
+from .models.eval_prometheus import evaluator
+from .models.similarity import similarity_index, with_similarity
+from .models.workers import InferenceWorkerPool
+
+REQUEST_MODELS = {"generate": GenerationRequest, "evaluate": EvaluationRequest, "play": PlayRequest}
+
+# The request fields each engine takes; the rest (no_cache, level, output) are for the caller
+GENERATION_FIELDS = {"prompt", "temperature", "max_tokens", "mentor_type", "method_type", "modifiers", "seed"}
+EVALUATION_FIELDS = {"prompt", "target_output", "mentor_type", "method_type", "modifiers", "token_limit", "criteria", "seed"}
+
+# Seconds between progress lines
+PROGRESS_INTERVAL = 1.0
+
+class Tally:
+    """Running totals for the end-of-run summary, bounded by the card catalogue rather than the corpus"""
+    def __init__(self, pass_score: float, bins: int = 10):
+        self.pass_score = pass_score
+        self.bins = bins
+        self.records = 0
+        self.errors = 0
+        self.combinations: Dict[Combination, CombinationStats] = {}
+
+    def add(self, record: Dict[str, Any]):
+        self.records += 1
+        if record.get("error"):
+            self.errors += 1
+            return
+        evaluation = record.get("evaluation")
+        if evaluation is None:
+            return
+        combination = catalogued(record.get("mentor_type"), record.get("method_type"), record.get("modifiers"))
+        stats = self.combinations.get(combination)
+        if stats is None:
+            stats = self.combinations[combination] = CombinationStats(combination, self.bins)
+        stats.add(evaluation["score"], evaluation.get("metrics"), evaluation["score"] >= self.pass_score)
+
+def parse_line(line_number: int, line: str, default_kind: str) -> Tuple[Dict[str, Any], Optional[BaseModel]]:
+    """Turn one input line into its output record and validated request; an invalid line gets an error instead"""
+    record: Dict[str, Any] = {"line": line_number}
+    try:
+        fields = json.loads(line)
+        if not isinstance(fields, dict):
+            raise ValueError("expected a JSON object")
+        kind = fields.pop("kind", default_kind)
+        if kind not in REQUEST_MODELS:
+            raise ValueError(f"kind must be one of {', '.join(REQUEST_MODELS)}")
+        request = REQUEST_MODELS[kind](**fields)
+    except ValueError as e:
+        record["error"] = f"Invalid record: {str(e)}"
+        return record, None
+
+    record["kind"] = kind
+    record["combination"] = combination_key(request.mentor_type, request.method_type, request.modifiers)
+    record["mentor_type"] = request.mentor_type
+    record["method_type"] = request.method_type
+    record["modifiers"] = request.modifiers or []
+    if request.level is not None:
+        record["level"] = request.level
+    return record, request
+
+def read_batches(input_file, start_line: int, default_kind: str, batch_size: int) -> Iterator[List[Tuple[Dict[str, Any], Optional[BaseModel]]]]:
+    """Lazily parse the input into batches, skipping blank lines and lines before start_line"""
+    batch = []
+    for line_number, line in enumerate(input_file, start=1):
+        if line_number < start_line or not line.strip():
+            continue
+        batch.append(parse_line(line_number, line, default_kind))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def call_engine(pool: Optional[InferenceWorkerPool], engine_name: str, requests: List[Dict[str, Any]]) -> List[Any]:
+    """Run one batch on a worker process, or in-process without a pool; item errors come back as Exceptions"""
+    if engine_name == "mistral":
+        if pool is None:
+            return await generator.generate_batch(requests)
+        return await pool.submit("mistral", "generate_batch", requests=requests)
+    if pool is None:
+        return await evaluator.evaluate_many(requests)
+    return await pool.submit("prometheus", "evaluate_many", requests=requests)
+
+async def process_batch(pool: Optional[InferenceWorkerPool], batch: List[Tuple[Dict[str, Any], Optional[BaseModel]]]) -> List[Dict[str, Any]]:
+    """Generate, then evaluate, then compare outputs with targets for one batch; returns its records in order"""
+    generations = [(record, request) for record, request in batch if request is not None and record["kind"] != "evaluate"]
+    if generations:
+        try:
+            outcomes = await call_engine(pool, "mistral", [request.model_dump(include=GENERATION_FIELDS) for _, request in generations])
+        except Exception as e:
+            outcomes = [e] * len(generations)
+        for (record, _), outcome in zip(generations, outcomes):
+            if isinstance(outcome, Exception):
+                record["error"] = f"Generation error: {str(outcome)}"
+            else:
+                record["generation"] = outcome
+
+    evaluations = [
+        (record, request) for record, request in batch
+        if request is not None and record["kind"] != "generate" and "error" not in record
+    ]
+    if evaluations:
+        try:
+            outcomes = await call_engine(pool, "prometheus", [request.model_dump(include=EVALUATION_FIELDS) for _, request in evaluations])
+        except Exception as e:
+            outcomes = [e] * len(evaluations)
+        compared = []
+        for (record, request), outcome in zip(evaluations, outcomes):
+            if isinstance(outcome, Exception):
+                record["error"] = f"Evaluation error: {str(outcome)}"
+                continue
+            record["evaluation"] = outcome
+            output = record["generation"]["output"] if record["kind"] == "play" else request.output
+            if output and request.target_output:
+                compared.append((record, output, request.target_output))
+        if compared:
+            similarities = similarity_index.score_pairs([output for _, output, _ in compared], [target for _, _, target in compared])
+            for (record, _, _), similarity in zip(compared, similarities):
+                record["evaluation"] = with_similarity(record["evaluation"], similarity)
+
+    return [record for record, _ in batch]
+
+def resume_point(path: str, tally: Tally) -> int:
+    """
+    Fold the records already in the output into the tally and return the input
+    line to continue from. A torn last line from an interrupted write is cut off.
+    """
+    next_line = 1
+    kept_bytes = 0
+    with open(path, "rb+") as output_file:
+        for raw in output_file:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                break
+            tally.add(record)
+            next_line = record["line"] + 1
+            kept_bytes += len(raw)
+        output_file.truncate(kept_bytes)
+    return next_line
+
+def print_summary(tally: Tally, limit: int):
+    summaries = sorted(
+        (stats.summary() for stats in tally.combinations.values()),
+        key=lambda summary: summary["avg_score"],
+        reverse=True
+    )
+    if not summaries:
+        return
+    print(f"{'combination':<60} {'n':>7} {'avg':>6} {'pass':>6} {'target':>7}")
+    for summary in summaries[:limit]:
+        similarity = summary["avg_metrics"].get("target_similarity")
+        print(
+            f"{summary['combination'][:60]:<60} {summary['attempts']:>7} {summary['avg_score']:>6.3f} "
+            f"{summary['pass_rate']:>6.1%} {'' if similarity is None else f'{similarity:.3f}':>7}"
+        )
+    if len(summaries) > limit:
+        print(f"... {len(summaries) - limit} more combinations")
+
+async def run(args: argparse.Namespace, tally: Tally, start_line: int):
+    pool = InferenceWorkerPool(num_workers=args.workers, max_queue=args.in_flight) if args.workers > 0 else None
+    start_time = time.monotonic()
+    last_progress = start_time
+    processed = 0
+
+    def write(records: List[Dict[str, Any]]):
+        nonlocal processed, last_progress
+        # One write per batch, flushed, so an interruption tears at most the last line
+        output_file.write("".join(json.dumps(record) + "\n" for record in records))
+        output_file.flush()
+        for record in records:
+            tally.add(record)
+        processed += len(records)
+        now = time.monotonic()
+        if now - last_progress >= PROGRESS_INTERVAL:
+            last_progress = now
+            sys.stderr.write(f"\r{tally.records} records  {processed / (now - start_time):8.1f}/s  {tally.errors} errors")
+            sys.stderr.flush()
+
+    # Batches in flight, oldest first; results are written in this order
+    window: Deque[asyncio.Task] = deque()
+    try:
+        with open(args.input) as input_file, open(args.output, "a" if start_line > 1 else "w") as output_file:
+            for batch in read_batches(input_file, start_line, args.kind, args.batch_size):
+                window.append(asyncio.create_task(process_batch(pool, batch)))
+                if len(window) >= args.in_flight:
+                    write(await window.popleft())
+            while window:
+                write(await window.popleft())
+    finally:
+        for task in window:
+            task.cancel()
+        if pool is not None:
+            pool.shutdown()
+
+    elapsed_time = time.monotonic() - start_time
+    sys.stderr.write(f"\r{tally.records} records  {processed / elapsed_time if elapsed_time else 0.0:8.1f}/s  {tally.errors} errors\n")
+    print(f"Processed {processed} records in {elapsed_time:.1f}s; results in {args.output}")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a JSONL corpus of prompts through generation and evaluation")
+    parser.add_argument("input", help="JSONL file of generation, evaluation or play requests")
+    parser.add_argument("--output", required=True, help="JSONL file to write one result per input line to")
+    parser.add_argument("--kind", default="evaluate", choices=sorted(REQUEST_MODELS), help="Kind of records without a \"kind\" field")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (0 runs the engines in-process)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Records sent to a worker at once")
+    parser.add_argument("--in-flight", type=int, default=0, help="Batches in flight at once (default: twice --workers)")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted run from the end of --output")
+    parser.add_argument("--overwrite", action="store_true", help="Replace an existing --output")
+    parser.add_argument("--pass-score", type=float, default=rollups.pass_score, help="Score that counts as a pass in the summary")
+    parser.add_argument("--top", type=int, default=50, help="Combinations to list in the summary")
+    args = parser.parse_args()
+    args.batch_size = max(1, args.batch_size)
+    args.in_flight = args.in_flight if args.in_flight > 0 else 2 * max(1, args.workers)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    tally = Tally(args.pass_score)
+    start_line = 1
+    if os.path.exists(args.output):
+        if args.resume:
+            start_line = resume_point(args.output, tally)
+            print(f"Resuming at input line {start_line} ({tally.records} records already done)")
+        elif not args.overwrite:
+            print(f"{args.output} exists; pass --resume to continue it or --overwrite to replace it", file=sys.stderr)
+            return 2
+
+    try:
+        asyncio.run(run(args, tally, start_line))
+    except KeyboardInterrupt:
+        print(f"\nInterrupted after {tally.records} records; rerun with --resume to continue", file=sys.stderr)
+        return 130
+
+    print_summary(tally, args.top)
+    print(f"{tally.records} records, {tally.errors} errors")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Request, Response
+import logging
+from .models.cards import registry
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+# Cards endpoint
+@router.get("/")
+async def get_cards(request: Request):
+    """
+    Return every mentor, method and modifier card in the frontend's Card shape
+    
+    The payload is serialized once at startup and tagged with an ETag, so clients
+    revalidating with If-None-Match get an empty 304 while the cards are unchanged.
+    """
+    headers = {"ETag": registry.etag, "Cache-Control": "no-cache"}
+    
+    if request.headers.get("if-none-match") == registry.etag:
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=registry.payload, media_type="application/json", headers=headers)
@@ -0,0 +1,159 @@
+import os
+import zlib
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content types worth compressing; images, audio and already-compressed bodies are left alone
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "application/problem+json")
+
+# Bodies that fit in one TCP segment gain no round trips from compression, only CPU on both ends
+DEFAULT_MINIMUM_SIZE = 1400
+
+# Preferred first when the client accepts both at the same quality
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick the encoding the client rates highest (ties go to ENCODINGS order), or None for identity"""
+    ratings: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, parameters = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        parameters = parameters.strip()
+        if parameters.startswith("q="):
+            try:
+                quality = float(parameters[2:])
+            except ValueError:
+                quality = 0.0
+        ratings[name] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = ratings.get(encoding, ratings.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def settings_from_env() -> Dict[str, Any]:
+    """CompressionMiddleware options from COMPRESSION_* settings, for app.add_middleware"""
+    return {
+        "minimum_size": int(os.getenv("COMPRESSION_MIN_BYTES", str(DEFAULT_MINIMUM_SIZE))),
+        "gzip_level": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+        "brotli_quality": int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4")),
+        "enabled": os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    }
+
+class _Encoder:
+    """Incremental gzip or brotli compressor that can flush after every chunk"""
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits 31: deflate with a gzip header and trailer
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False, final: bool = False) -> bytes:
+        if self.encoding == "br":
+            output = self._compressor.process(data)
+            if final:
+                return output + self._compressor.finish()
+            return output + self._compressor.flush() if flush else output
+        output = self._compressor.compress(data)
+        if final:
+            return output + self._compressor.flush()
+        return output + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else output
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing responses with brotli or gzip, whichever
+    the client's Accept-Encoding rates highest. Complete bodies below
+    minimum_size are sent as they are. Streamed bodies (SSE) are compressed
+    chunk by chunk with a sync flush after each, so every event reaches the
+    client as soon as it is sent rather than when the compressor's buffer fills.
+    """
+    def __init__(
+        self,
+        app,
+        minimum_size: int = DEFAULT_MINIMUM_SIZE,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        enabled: bool = True
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, encoder, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether and how to compress
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                content_type = headers.get("content-type", "")
+                if (
+                    "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or start_message["status"] in (204, 304)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                encoder = _Encoder(encoding, self.gzip_level, self.brotli_quality)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    # Streamed: the compressed length is not known up front
+                    del headers["content-length"]
+                else:
+                    body = encoder.compress(body, final=True)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start_message)
+
+            await send({
+                "type": "http.response.body",
+                "body": encoder.compress(body, flush=more_body, final=not more_body),
+                "more_body": more_body
+            })
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,101 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.datastructures import MutableHeaders
+import asyncio
+import logging
+import os
+import secrets
+from typing import Optional
+from .models import timing
+from .models.profiler import ProfilerBusy, profiler
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+# Bearer token for /debug routes; unset, they answer 404 as if they did not exist
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+
+# off, request (only requests sending X-Server-Timing) or all
+SERVER_TIMING = os.getenv("SERVER_TIMING", "off").lower()
+
+def require_admin(authorization: Optional[str] = Header(default=None)):
+    """Admit only requests carrying `Authorization: Bearer <DEBUG_TOKEN>`"""
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if authorization is None:
+        raise HTTPException(status_code=401, detail="Admin token required", headers={"WWW-Authenticate": "Bearer"})
+    if not secrets.compare_digest(authorization.encode("utf-8"), f"Bearer {DEBUG_TOKEN}".encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware timing requests span by span and reporting the
+    breakdown in a Server-Timing header: queue (waiting for the fair
+    scheduler), parse (routing, reading and validating the body), engine and
+    serialize, in milliseconds, then the total up to the response headers.
+    Spans a request does not go through are left out, and a streamed
+    response only reports what happened before its first chunk. Requests it
+    does not time pay nothing beyond a context variable lookup per span.
+    """
+    def __init__(self, app, mode: str = "all"):
+        self.app = app
+        self.mode = mode
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (
+            self.mode == "request" and not any(name == b"x-server-timing" for name, _ in scope["headers"])
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        timer = timing.RequestTimer()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", timer.header())
+            await send(message)
+
+        token = timing.begin(timer)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            timing.end(token)
+
+# Sampling profiler endpoint
+@router.get("/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(10.0, gt=0.0),
+    tasks: bool = Query(True)
+):
+    """
+    Sample every thread of this process for `seconds` and return collapsed stacks
+
+    - seconds: How long to sample (capped at PROFILE_MAX_SECONDS)
+    - tasks: Also sample the await chains of suspended asyncio tasks
+
+    Each line is `root;frame;...;frame count`, ready for flamegraph.pl or
+    speedscope. Thread stacks are rooted at `thread:<name>`, suspended tasks
+    at `tasks`. The profile covers this worker process only. The request is
+    answered once sampling ends; one profile runs at a time.
+    """
+    if profiler.busy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    logger.info(f"Profiling for {min(seconds, profiler.max_seconds):.1f}s")
+    try:
+        result = await asyncio.to_thread(profiler.profile, seconds, asyncio.get_running_loop(), tasks)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(result["collapsed"], headers={
+        "X-Profile-Samples": str(result["samples"]),
+        "X-Profile-Seconds": f"{result['seconds']:.3f}",
+        "X-Profile-Overhead": f"{result['overhead']:.4f}"
+    })
+
+# Profiler statistics endpoint
+@router.get("/stats", dependencies=[Depends(require_admin)])
+async def debug_stats():
+    """Report profiler counters and the Server-Timing mode"""
+    return {"profiler": profiler.stats(), "server_timing": SERVER_TIMING}
@@ -1,21 +1,84 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
 import uvicorn
+import asyncio
 import logging
+import os
+import time
 from typing import List, Optional
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Model engines are cheap to import; their weights load in the lifespan hook below
+from .models import load_mistral, eval_prometheus
+from .models.workers import worker_pool
+from .models.attempts import attempt_log
+from .models.analytics import rollups
+
+# Leaderboards and card analytics update as each scored attempt is logged
+attempt_log.add_listener(rollups.observe)
+
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() in ("1", "true", "yes")
+
+async def load_model(name: str, engine, remote):
+    """Load one engine in the background and optionally warm it up"""
+    if remote is not None:
+        # Served by a remote model service; nothing to load here
+        engine.load_state.mark_remote()
+        return
+    try:
+        await engine.ensure_loaded()
+        if MODEL_WARMUP:
+            await engine.warmup()
+            if worker_pool is not None:
+                # Start a worker so its engines are loaded before the first request
+                await worker_pool.submit(name, "warmup")
+    except Exception as e:
+        logger.error(f"Background load of {name} failed: {str(e)}")
+
+async def load_models():
+    await asyncio.gather(
+        load_model("mistral", load_mistral.generator, load_mistral.remote),
+        load_model("prometheus", eval_prometheus.evaluator, eval_prometheus.remote)
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load in the background so uvicorn binds and /health answers immediately
+    loader = asyncio.create_task(load_models())
+    await attempt_log.start()
+    # Replay attempts from earlier runs; ones logged from now on reach the rollups live
+    rebuild = asyncio.create_task(rollups.rebuild(attempt_log.path if attempt_log.enabled else "", time.time()))
+    yield
+    loader.cancel()
+    rebuild.cancel()
+    # Write out attempts still queued before the process exits
+    await attempt_log.close()
+    for remote in (load_mistral.remote, eval_prometheus.remote):
+        if remote is not None:
+            await remote.aclose()
+    if worker_pool is not None:
+        worker_pool.shutdown()
+
 # Create FastAPI app
 app = FastAPI(
     title="Promptcraft Guild API",
     description="API for the Promptcraft Guild game - handles prompt evaluation and generation",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
+    # orjson for every JSON response; hot routes also return their typed results as responses directly
+    default_response_class=ORJSONResponse
 )
 
+# Admit model requests through the fair scheduler (added before CORS so rejections still carry CORS headers)
+from .scheduler import SchedulerMiddleware
+app.add_middleware(SchedulerMiddleware)
+
 # Set up CORS for frontend communication
 app.add_middleware(
     CORSMiddleware,
@@ -25,26 +88,89 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Record request metrics (served at /metrics)
+from .metrics import MetricsMiddleware
+app.add_middleware(MetricsMiddleware)
+
+# Break request time down into a Server-Timing header (opt-in; skipped entirely when off)
+from .debug import ServerTimingMiddleware, SERVER_TIMING
+if SERVER_TIMING in ("request", "all"):
+    app.add_middleware(ServerTimingMiddleware, mode=SERVER_TIMING)
+
+# Compress responses and SSE streams (outermost, so it sees the final headers and body)
+from .compression import CompressionMiddleware, settings_from_env
+app.add_middleware(CompressionMiddleware, **settings_from_env())
+
 # Import routers
 from .prometheus import router as prometheus_router
 from .mistral import router as mistral_router
+from .play import router as play_router
+from .tokenize import router as tokenize_router
+from .cards import router as cards_router
+from .metrics import router as metrics_router
+from .scheduler import router as scheduler_router
+from .session import router as session_router
+from .analytics import router as analytics_router
+from .debug import router as debug_router
 
 # Include routers
 app.include_router(prometheus_router, prefix="/api/evaluate", tags=["evaluation"])
 app.include_router(mistral_router, prefix="/api/generate", tags=["generation"])
+app.include_router(play_router, prefix="/api/play", tags=["play"])
+app.include_router(tokenize_router, prefix="/api/tokenize", tags=["tokenize"])
+app.include_router(cards_router, prefix="/api/cards", tags=["cards"])
+app.include_router(metrics_router, tags=["metrics"])
+app.include_router(scheduler_router, prefix="/api/scheduler", tags=["scheduler"])
+app.include_router(session_router, tags=["session"])
+app.include_router(analytics_router, prefix="/api/analytics", tags=["analytics"])
+app.include_router(debug_router, prefix="/debug", tags=["debug"])
+
+# Backend availability errors
+from .models.errors import ServiceUnavailable
+from .models.remote import RemoteServiceError
+
+@app.exception_handler(ServiceUnavailable)
+async def service_unavailable_handler(request: Request, exc: ServiceUnavailable):
+    logger.error(f"Service unavailable: {str(exc)}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))}
+    )
 
-# Health check endpoint
+@app.exception_handler(RemoteServiceError)
+async def remote_error_handler(request: Request, exc: RemoteServiceError):
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)})
+
+# Health check endpoint (liveness: the process is up, whether or not models are loaded)
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "services": {"api": "up"}}
 
+# Readiness endpoint: 503 until every model is loaded or served remotely
+@app.get("/ready")
+async def readiness_check():
+    states = {
+        "mistral": load_mistral.generator.load_state,
+        "prometheus": eval_prometheus.evaluator.load_state
+    }
+    ready = all(state.is_ready for state in states.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "loading",
+            "models": {name: state.as_dict() for name, state in states.items()}
+        }
+    )
+
 # Root endpoint
 @app.get("/")
 async def root():
     return {
         "message": "Welcome to Promptcraft Guild API",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "ready": "/ready"
     }
 
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+import logging
+import time
+from typing import Iterable
+from .models.metrics import (
+    metrics, MetricFamily, http_requests, http_request_duration, http_requests_in_flight
+)
+from .models.workers import worker_pool
+from .models.tokenizer import tokenizer
+from .models.simulation import generation_simulator, evaluation_simulator
+from .models.scheduler import scheduler
+from .models.cascade import cascade
+from .models.drafts import drafts
+from .models.attempts import attempt_log
+from .models import load_mistral, eval_prometheus
+from .session import active_sessions
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency, status counts and in-flight
+    requests. Routes are labelled by their path template to keep cardinality fixed.
+    Streaming responses are timed until their last chunk is sent.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            http_requests.inc(scope["method"], route_path, str(status_code))
+            http_request_duration.observe(time.perf_counter() - start_time, scope["method"], route_path)
+
+def _collect_backends() -> Iterable[MetricFamily]:
+    """Expose queue, batching, cache, worker and model state tracked by other components"""
+    batch = load_mistral.batcher.stats()
+    queued = [({"queue": "mistral_batcher"}, batch["pending"])]
+    queued.extend(({"queue": simulator.name}, simulator.queued) for simulator in (generation_simulator, evaluation_simulator))
+    if worker_pool is not None:
+        workers = worker_pool.stats()
+        queued.append(({"queue": "inference_workers"}, workers["queued"]))
+        yield ("promptcraft_inference_workers_outstanding", "gauge", "Calls running or queued in worker processes",
+               [("", {}, workers["outstanding"])])
+        yield ("promptcraft_inference_worker_events", "counter", "Worker pool completions, failures, rejections and restarts",
+               [("_total", {"event": event}, workers[event]) for event in ("completed", "failed", "rejected", "restarts", "recycles")])
+    yield ("promptcraft_queued_requests", "gauge", "Requests waiting for an engine", [("", labels, value) for labels, value in queued])
+
+    yield ("promptcraft_batches", "counter", "Generation batches dispatched", [("_total", {}, batch["batches_run"])])
+    yield ("promptcraft_batched_requests", "counter", "Requests dispatched in batches", [("_total", {}, batch["requests_batched"])])
+    yield ("promptcraft_batch_size_avg", "gauge", "Average generation batch size", [("", {}, batch["avg_batch_size"])])
+    yield ("promptcraft_batch_wait_seconds_avg", "gauge", "Average time a batch waited to fill", [("", {}, batch["avg_wait_ms"] / 1000.0)])
+
+    caches = [load_mistral.generation_cache.stats(), eval_prometheus.evaluation_cache.stats()]
+    for field, kind, help in (
+        ("hits", "counter", "Response cache hits"),
+        ("misses", "counter", "Response cache misses"),
+        ("bypasses", "counter", "Requests that skipped the response cache"),
+        ("evictions", "counter", "Response cache evictions"),
+        ("entries", "gauge", "Entries held in the response cache"),
+        ("bytes", "gauge", "Bytes held in the response cache")
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        yield (f"promptcraft_cache_{field}", kind, help, [(suffix, {"cache": cache["name"]}, cache[field]) for cache in caches])
+
+    admission = scheduler.stats()
+    yield ("promptcraft_scheduler_running", "gauge", "Model requests holding a scheduler slot", [("", {}, admission["running"])])
+    yield ("promptcraft_scheduler_queued", "gauge", "Model requests waiting for a scheduler slot", [("", {}, admission["queued"])])
+    yield ("promptcraft_scheduler_rejections", "counter", "Requests the scheduler rejected or cancelled, by reason", [
+        ("_total", {"reason": reason}, admission[reason]) for reason in ("rate_limited", "overloaded", "expired", "shed", "timed_out")
+    ])
+
+    tiers = cascade.stats()
+    yield ("promptcraft_cascade_decisions", "counter", "Evaluation cascade outcomes: answered as pass/fail by the heuristic, or escalated", [
+        ("_total", {"decision": decision}, tiers[decision]) for decision in ("passed", "failed", "escalated")
+    ])
+    yield ("promptcraft_cascade_escalation_rate", "gauge", "Share of evaluations sent on to the full evaluator", [("", {}, tiers["escalation_rate"])])
+
+    flights = [load_mistral.generation_flight.stats(), eval_prometheus.evaluation_flight.stats()]
+    yield ("promptcraft_coalesced_requests", "counter", "Requests that shared an identical in-flight computation",
+           [("_total", {"flight": flight["name"]}, flight["coalesced"]) for flight in flights])
+
+    sessions = list(active_sessions.values())
+    yield ("promptcraft_sessions", "gauge", "Open game session WebSockets", [("", {}, len(sessions))])
+    yield ("promptcraft_session_requests_in_flight", "gauge", "Requests running across game sessions",
+           [("", {}, sum(len(session.tasks) for session in sessions))])
+
+    draft_stats = drafts.stats()
+    yield ("promptcraft_drafts_open", "gauge", "Drafts being scored live over HTTP", [("", {}, draft_stats["open"])])
+    yield ("promptcraft_draft_updates", "counter", "Draft edit batches scored", [("_total", {}, draft_stats["updates"])])
+
+    attempts = attempt_log.stats()
+    yield ("promptcraft_attempt_log_queued", "gauge", "Attempts waiting to be written to the attempt log", [("", {}, attempts["queued"])])
+    yield ("promptcraft_attempt_log_attempts", "counter", "Attempts written, dropped because the queue was full, or failed to write", [
+        ("_total", {"outcome": outcome}, attempts[outcome]) for outcome in ("written", "dropped", "failed")
+    ])
+
+    tokens = tokenizer.stats()
+    yield ("promptcraft_tokenizer_cache_hits", "counter", "Token count cache hits", [("_total", {}, tokens["cache_hits"])])
+    yield ("promptcraft_tokenizer_cache_misses", "counter", "Token count cache misses", [("_total", {}, tokens["cache_misses"])])
+
+    yield ("promptcraft_model_ready", "gauge", "Whether a model is loaded (or served remotely)", [
+        ("", {"model": "mistral"}, float(load_mistral.generator.load_state.is_ready)),
+        ("", {"model": "prometheus"}, float(eval_prometheus.evaluator.load_state.is_ready))
+    ])
+
+    remotes = [remote for remote in (load_mistral.remote, eval_prometheus.remote) if remote is not None]
+    if remotes:
+        remote_stats = [(remote.name, remote.stats()) for remote in remotes]
+        yield ("promptcraft_remote_requests", "counter", "Requests sent to a remote model service",
+               [("_total", {"service": name}, stats["requests"]) for name, stats in remote_stats])
+        yield ("promptcraft_remote_failures", "counter", "Remote requests that failed after retries",
+               [("_total", {"service": name}, stats["failures"]) for name, stats in remote_stats])
+        yield ("promptcraft_remote_replica_open", "gauge", "Whether a replica's circuit breaker is open",
+               [("", {"service": name, "replica": url}, float(state == "open"))
+                for name, stats in remote_stats for url, state in stats["replicas"].items()])
+
+metrics.register_collector(_collect_backends)
+
+# Metrics endpoint
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Expose request, engine and cache metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,9 +1,24 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Header
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import AsyncIterator, List, Optional, Dict, Any
 import logging
 import asyncio
-from .models.load_mistral import generate_response
+import orjson
+import random
+import time
+from .models.errors import ServiceUnavailable
+from .models.remote import RemoteServiceError
+from .models.workers import worker_pool
+from .models.tokenizer import tokenizer, count_text_tokens, MAX_TEXT_CHARS
+from .models.simulation import generation_simulator
+from .models.cards import registry
+from .models.metrics import record_generation
+from .models.attempts import attempt_log
+from .models.scheduler import scheduler
+from .models.results import GenerationResult
+from .models import timing
+from .models.load_mistral import generate_response, stream_response, generator, batcher, generation_cache, generation_flight, remote
 
 # Initialize logging
 logger = logging.getLogger(__name__)
@@ -13,12 +28,15 @@ router = APIRouter()
 
 # Define models
 class GenerationRequest(BaseModel):
-    prompt: str
+    prompt: str = Field(max_length=MAX_TEXT_CHARS)
     temperature: float = 0.7
     max_tokens: int = 256
     mentor_type: Optional[str] = None
     method_type: Optional[str] = None
     modifiers: Optional[List[str]] = None
+    seed: Optional[int] = None
+    no_cache: bool = False
+    level: Optional[int] = None
 
 class GenerationResponse(BaseModel):
     output: str
@@ -28,7 +46,7 @@ class GenerationResponse(BaseModel):
 
 # Generation endpoint
 @router.post("/", response_model=GenerationResponse)
-async def generate(request: GenerationRequest, background_tasks: BackgroundTasks):
+async def generate(request: GenerationRequest, background_tasks: BackgroundTasks, x_client_id: Optional[str] = Header(default=None)):
     """
     Generate a response to a prompt using Mistral-7B
     
@@ -38,78 +56,121 @@ async def generate(request: GenerationRequest, background_tasks: BackgroundTasks
     - mentor_type: The selected mentor card (e.g., "The Archivist")
     - method_type: The selected method card (e.g., "Chain-of-Thought")
     - modifiers: List of modifier constraints (e.g., ["Use Metaphor", "Token Limit"])
+    - seed: Makes the output reproducible and cacheable (optional)
+    - no_cache: Skip the response cache
+    - level: The player's current level, stored with the attempt (optional)
     """
+    timing.mark("parse")
     logger.info(f"Received generation request for prompt: {request.prompt[:30]}...")
     
     try:
         # In a production environment, this would call the actual Mistral model
         # For now, we'll use a mock implementation
-        result = await generate_response(
-            prompt=request.prompt,
-            temperature=request.temperature,
-            max_tokens=request.max_tokens,
-            mentor_type=request.mentor_type,
-            method_type=request.method_type,
-            modifiers=request.modifiers
-        )
+        with timing.span("engine"):
+            result = await generate_response(
+                prompt=request.prompt,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens,
+                mentor_type=request.mentor_type,
+                method_type=request.method_type,
+                modifiers=request.modifiers,
+                seed=request.seed,
+                use_cache=not request.no_cache
+            )
         
-        return result
+        attempt_log.record(
+            "generate", request.prompt, request.mentor_type, request.method_type, request.modifiers,
+            player_id=scheduler.verified_client_id(x_client_id), level=request.level, output=result["output"],
+            token_count=result["token_count"], latency=result.get("generation_time")
+        )
+        # The engine's typed result is encoded as is rather than re-validated against GenerationResponse
+        with timing.span("serialize"):
+            response = ORJSONResponse(result)
+        return response
+    except (ServiceUnavailable, RemoteServiceError):
+        # Handled by the app-level handlers in main.py
+        raise
     except Exception as e:
         logger.error(f"Error generating response: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Generation error: {str(e)}")
 
-# Mock generation endpoint for testing without model
-@router.post("/mock", response_model=GenerationResponse)
-async def mock_generate(request: GenerationRequest):
-    """Mock generation endpoint for testing without the Mistral model"""
-    logger.info(f"Received mock generation request for prompt: {request.prompt[:30]}...")
-    
-    # Simulate processing time
-    await asyncio.sleep(2)
-    
-    # Generate mock response based on input
-    mentor_styles = {
-        "The Archivist": "In examining the historical context and precedent, we observe a pattern of logical progression that leads to a formal conclusion.",
-        "The Sage": "Consider, if you will, the deeper implications. When we look beyond the surface, we find connections that transcend the obvious.",
-        "The Guide": "Let me walk you through this step by step. First, we need to establish our goal, then identify the path forward.",
-        "The Inventor": "What if we approach this from an entirely different angle? Let's reimagine the constraints as opportunities.",
-        "The Storyteller": "Imagine a world where this problem has already been solved. What tale would we tell about how it happened?",
-    }
-    
-    method_patterns = {
-        "SCAMPER": "We could substitute X with Y, combine it with Z, adapt it by..., modify the core idea, put it to another use, eliminate the unnecessary, and reverse the traditional approach.",
-        "First Principles": "Breaking this down to its fundamental truths: First, we know that... Second, it follows that... Therefore...",
-        "Chain-of-Thought": "Let's reason through this sequentially. Initially, we observe... This leads us to consider... Which implies... Resulting in...",
-        "SWOT Analysis": "Strengths: clear advantage in... Weaknesses: potential gaps in... Opportunities: emerging possibilities for... Threats: challenges from...",
-        "Socratic Method": "What would happen if...? How does this relate to...? Why might this be the case? What evidence supports this conclusion?",
-    }
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format a single Server-Sent Events message"""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+async def _stream_events(tokens: AsyncIterator[str], model_used: str, source: str = "stream") -> AsyncIterator[str]:
+    """Relay generated tokens as SSE messages and finish with a summary event"""
+    start_time = time.time()
+    time_to_first_token = None
+    token_count = 0
     
-    modifier_effects = {
-        "Token Limit": "Concisely stated, the core concept is...",
-        "Use Metaphor": "This is like a garden where ideas bloom with proper nurturing.",
-        "Concrete Examples": "Consider these three examples: First, when Tesla designed the Model S... Second, when SpaceX developed reusable rockets... Third, when Apple created the iPhone...",
-        "Data Driven": "According to recent studies, 78% of users prefer... The data shows a 42% increase in...",
-        "Opposing Views": "Some argue that... However, others maintain that... A middle ground might be...",
-    }
+    try:
+        async for token in tokens:
+            if time_to_first_token is None:
+                time_to_first_token = time.time() - start_time
+            yield _sse_event("token", {"index": token_count, "token": token})
+            token_count += 1
+    except Exception as e:
+        logger.error(f"Error streaming response: {str(e)}")
+        yield _sse_event("error", {"detail": f"Generation error: {str(e)}"})
+        return
     
-    # Build a response based on selected cards
-    response_parts = []
+    elapsed_time = time.time() - start_time
+    record_generation({"token_count": token_count, "generation_time": elapsed_time}, source, elapsed_time)
+    logger.info(f"Streamed {token_count} tokens in {elapsed_time:.2f}s (first token after {time_to_first_token or 0.0:.3f}s)")
     
-    # Add mentor style if specified
-    if request.mentor_type and request.mentor_type in mentor_styles:
-        response_parts.append(mentor_styles[request.mentor_type])
-    else:
-        response_parts.append("Here's a thoughtful response to your query.")
+    yield _sse_event("done", {
+        "token_count": token_count,
+        "time_to_first_token": time_to_first_token or 0.0,
+        "generation_time": elapsed_time,
+        "model_used": model_used
+    })
+
+# Streaming generation endpoint
+@router.post("/stream")
+async def generate_stream(request: GenerationRequest):
+    """
+    Stream a response to a prompt token by token as Server-Sent Events
     
-    # Add method pattern if specified
-    if request.method_type and request.method_type in method_patterns:
-        response_parts.append(method_patterns[request.method_type])
+    Emits a `token` event per generated token and a final `done` event carrying
+    token_count, time_to_first_token, generation_time and model_used. Generation
+    stops as soon as max_tokens have been produced. Answers 501 when generation
+    is served by a remote mistral service.
+    """
+    logger.info(f"Received streaming generation request for prompt: {request.prompt[:30]}...")
     
-    # Add modifier effects if specified
-    if request.modifiers:
-        for modifier in request.modifiers:
-            if modifier in modifier_effects:
-                response_parts.append(modifier_effects[modifier])
+    tokens = stream_response(
+        prompt=request.prompt,
+        temperature=request.temperature,
+        max_tokens=request.max_tokens,
+        mentor_type=request.mentor_type,
+        method_type=request.method_type,
+        modifiers=request.modifiers,
+        seed=request.seed
+    )
+    return StreamingResponse(
+        _stream_events(tokens, generator.model_name),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Batching and cache statistics endpoint
+@router.get("/stats")
+async def generation_stats():
+    """Report how generation requests are being batched and cached"""
+    return {
+        "batching": batcher.stats(),
+        "cache": generation_cache.stats(),
+        "coalescing": generation_flight.stats(),
+        "remote": remote.stats() if remote else None,
+        "workers": worker_pool.stats() if worker_pool else None,
+        "simulation": generation_simulator.stats()
+    }
+
+def _mock_output(request: GenerationRequest) -> List[str]:
+    """Build the mock response for a request, one text piece per token, up to max_tokens"""
+    # Build a response based on selected cards, pre-assembled by the card registry
+    response_parts = list(registry.preamble(request.mentor_type, request.method_type, request.modifiers).mock_fragments)
     
     # Add some content based on the prompt
     key_terms = [word for word in request.prompt.split() if len(word) > 4]
@@ -120,15 +181,55 @@ async def mock_generate(request: GenerationRequest):
     # Add a conclusion
     response_parts.append("In conclusion, this approach offers a balanced perspective that addresses the core concerns while maintaining analytical rigor.")
     
-    # Join all parts
-    output = " ".join(response_parts)
+    # Join all parts and split into tokens
+    return tokenizer.tokenize(" ".join(response_parts))[:max(0, request.max_tokens)]
+
+# Mock generation endpoint for testing without model
+@router.post("/mock", response_model=GenerationResponse)
+async def mock_generate(request: GenerationRequest, x_client_id: Optional[str] = Header(default=None)):
+    """
+    Mock generation endpoint for testing without the Mistral model
     
-    # Calculate token count (simple approximation)
-    token_count = len(output.split())
+    Response time follows the simulated serving profile (time to first token,
+    prefill and per-token decode, limited slots), configured by MOCK_GENERATE_* settings.
+    """
+    logger.info(f"Received mock generation request for prompt: {request.prompt[:30]}...")
+    
+    try:
+        pieces = _mock_output(request)
+        
+        # Simulate processing time
+        rng = random.Random(request.seed) if request.seed is not None else None
+        elapsed_time = await generation_simulator.run(count_text_tokens(request.prompt), len(pieces), rng)
+        
+        attempt_log.record(
+            "generate", request.prompt, request.mentor_type, request.method_type, request.modifiers,
+            player_id=scheduler.verified_client_id(x_client_id), level=request.level, output="".join(pieces), tier="mock",
+            token_count=len(pieces), latency=elapsed_time
+        )
+        return ORJSONResponse(GenerationResult(
+            output="".join(pieces),
+            token_count=len(pieces),
+            generation_time=elapsed_time,
+            model_used="mistral-7b-instruct-mock"
+        ))
+    except ServiceUnavailable:
+        raise
+    except Exception as e:
+        logger.error(f"Error in mock generation: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Generation error: {str(e)}")
+
+# Mock streaming generation endpoint
+@router.post("/mock/stream")
+async def mock_generate_stream(request: GenerationRequest):
+    """Stream the mock response as Server-Sent Events at the simulated decode rate"""
+    logger.info(f"Received mock streaming request for prompt: {request.prompt[:30]}...")
     
-    return GenerationResponse(
-        output=output,
-        token_count=token_count,
-        generation_time=2.0,
-        model_used="mistral-7b-instruct-mock"
-    ) 
\ No newline at end of file
+    pieces = _mock_output(request)
+    rng = random.Random(request.seed) if request.seed is not None else None
+    tokens = generation_simulator.stream(count_text_tokens(request.prompt), pieces, rng)
+    return StreamingResponse(
+        _stream_events(tokens, "mistral-7b-instruct-mock", source="mock_stream"),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,360 @@
+import logging
+import os
+import json
+import sqlite3
+import asyncio
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+from .attempts import UNRANKED_KINDS, combination_key
+from .cards import registry
+
+logger = logging.getLogger(__name__)
+
+# Rows read per chunk when rebuilding from the attempt log
+REBUILD_CHUNK = 5000
+# Rows applied between yields to the event loop while rebuilding (about 10ms of work)
+REBUILD_SLICE = 200
+
+# Stands in for card names the registry does not know, so free-form names cannot grow the rollups
+OTHER_CARD = "(other)"
+
+# Random scores from the /mock routes stay out of the boards and distributions
+EXCLUDED_TIERS = ("mock",)
+
+# (mentor_type, method_type, sorted modifiers)
+Combination = Tuple[Optional[str], Optional[str], Tuple[str, ...]]
+
+def combination_of(mentor_type: Optional[str], method_type: Optional[str], modifiers: Optional[List[str]]) -> Combination:
+    """The key a combination is tallied under: modifiers sorted and deduplicated"""
+    return (mentor_type or None, method_type or None, tuple(sorted(set(modifiers or []))))
+
+def catalogued(mentor_type: Optional[str], method_type: Optional[str], modifiers: Optional[List[str]]) -> Combination:
+    """Like combination_of, with every card the registry does not list folded into OTHER_CARD"""
+    return combination_of(
+        mentor_type if not mentor_type or registry.mentor(mentor_type) else OTHER_CARD,
+        method_type if not method_type or registry.method(method_type) else OTHER_CARD,
+        [modifier if registry.modifier(modifier) else OTHER_CARD for modifier in modifiers or []]
+    )
+
+class ScoreHistogram:
+    """
+    Counts of scores in equal-width bins over [0, 1]. A Fenwick tree over the
+    bins keeps "how many scored below this" at O(log bins), so percentile
+    ranks never scan the attempts.
+    """
+    def __init__(self, bins: int = 100):
+        self.bins = bins
+        self.counts = [0] * bins
+        self._tree = [0] * (bins + 1)
+        self.total = 0
+
+    def _bin(self, score: float) -> int:
+        return min(self.bins - 1, max(0, int(score * self.bins)))
+
+    def add(self, score: float):
+        index = self._bin(score)
+        self.counts[index] += 1
+        self.total += 1
+        position = index + 1
+        while position <= self.bins:
+            self._tree[position] += 1
+            position += position & -position
+
+    def below(self, index: int) -> int:
+        """Scores in bins before `index`"""
+        count = 0
+        while index > 0:
+            count += self._tree[index]
+            index -= index & -index
+        return count
+
+    def percentile_rank(self, score: float) -> float:
+        """Share of scores below this one (counting half of its own bin), as a percentage"""
+        if not self.total:
+            return 0.0
+        index = self._bin(score)
+        return 100.0 * (self.below(index) + 0.5 * self.counts[index]) / self.total
+
+    def buckets(self) -> List[Dict[str, Any]]:
+        width = 1.0 / self.bins
+        return [
+            {"low": round(index * width, 4), "high": round((index + 1) * width, 4), "count": count}
+            for index, count in enumerate(self.counts)
+        ]
+
+class Leaderboard:
+    """Each player's best value, kept sorted so top-N is a slice and a rank is a bisect"""
+    def __init__(self):
+        self.best: Dict[str, Tuple[float, float]] = {}
+        # (-value, achieved_at, player_id): best first, earlier achievers first on ties
+        self._order: List[Tuple[float, float, str]] = []
+
+    def offer(self, player_id: str, value: float, achieved_at: float) -> bool:
+        """Record a value for a player; returns True if it is their new best"""
+        previous = self.best.get(player_id)
+        if previous is not None:
+            if value <= previous[0]:
+                return False
+            del self._order[bisect_left(self._order, (-previous[0], previous[1], player_id))]
+        self.best[player_id] = (value, achieved_at)
+        insort(self._order, (-value, achieved_at, player_id))
+        return True
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        return [
+            {"rank": rank, "player_id": player_id, "value": -negative, "achieved_at": achieved_at}
+            for rank, (negative, achieved_at, player_id) in enumerate(self._order[:max(0, limit)], start=1)
+        ]
+
+    def rank(self, player_id: str) -> Optional[int]:
+        previous = self.best.get(player_id)
+        if previous is None:
+            return None
+        return bisect_left(self._order, (-previous[0], previous[1], player_id)) + 1
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+class CombinationStats:
+    """Running totals for one mentor x method x modifiers combination"""
+    def __init__(self, combination: Combination, bins: int):
+        self.mentor_type, self.method_type, self.modifiers = combination
+        self.attempts = 0
+        self.score_sum = 0.0
+        self.passed = 0
+        self.metric_sums: Dict[str, float] = {}
+        self.metric_counts: Dict[str, int] = {}
+        self.histogram = ScoreHistogram(bins)
+
+    def add(self, score: float, metrics: Optional[Dict[str, float]], passed: bool):
+        self.attempts += 1
+        self.score_sum += score
+        self.passed += passed
+        self.histogram.add(score)
+        for name, value in (metrics or {}).items():
+            self.metric_sums[name] = self.metric_sums.get(name, 0.0) + value
+            self.metric_counts[name] = self.metric_counts.get(name, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "combination": combination_key(self.mentor_type, self.method_type, list(self.modifiers)),
+            "mentor_type": self.mentor_type,
+            "method_type": self.method_type,
+            "modifiers": list(self.modifiers),
+            "attempts": self.attempts,
+            "avg_score": self.score_sum / self.attempts if self.attempts else 0.0,
+            "pass_rate": self.passed / self.attempts if self.attempts else 0.0,
+            "avg_metrics": {name: total / self.metric_counts[name] for name, total in self.metric_sums.items()}
+        }
+
+class AnalyticsRollups:
+    """
+    Leaderboards and card analytics maintained one scored attempt at a time.
+    Every update and query is O(1) or O(log n) in the number of players or
+    attempts (sorted inserts are a bisect plus a memmove). Combinations are
+    bounded by the card catalogue, since names it does not list are counted
+    as OTHER_CARD, and levels by max_level; attempts on a level outside
+    0..max_level still count everywhere except the per-level rollups.
+    Attempts from the mock tier are ignored.
+
+    On startup the rollups are rebuilt from the attempt log in the background.
+    Attempts observed meanwhile are held back and applied after the replay,
+    so per-player streaks still see attempts in order.
+    """
+    def __init__(self, pass_score: float = 0.6, percentile_bins: int = 1000, combination_bins: int = 10, max_level: int = 100):
+        self.pass_score = pass_score
+        self.max_level = max_level
+        self.percentile_bins = percentile_bins
+        self.combination_bins = combination_bins
+        self.rebuilding = False
+        self.rebuilt = 0
+        self._held: List[Tuple] = []
+        self.clear()
+
+    @classmethod
+    def from_env(cls) -> "AnalyticsRollups":
+        return cls(
+            pass_score=float(os.getenv("ANALYTICS_PASS_SCORE", "0.6")),
+            max_level=int(os.getenv("ANALYTICS_MAX_LEVEL", "100"))
+        )
+
+    def clear(self):
+        """Drop every rollup (a rebuild starts from here)"""
+        self.scores = ScoreHistogram(self.percentile_bins)
+        self.level_scores: Dict[Optional[int], ScoreHistogram] = {}
+        self.level_boards: Dict[Optional[int], Leaderboard] = {}
+        self.streaks: Dict[str, int] = {}
+        self.streak_board = Leaderboard()
+        self.combinations: Dict[Combination, CombinationStats] = {}
+
+        self.attempts = 0
+
+    def observe(
+        self,
+        created_at: float,
+        player_id: Optional[str],
+        level: Optional[int],
+        mentor_type: Optional[str],
+        method_type: Optional[str],
+        modifiers: Optional[List[str]],
+        score: float,
+        metrics: Optional[Dict[str, float]] = None,
+        tier: Optional[str] = None
+    ):
+        """Fold one scored attempt into every rollup"""
+        if tier in EXCLUDED_TIERS:
+            return
+        if self.rebuilding:
+            self._held.append((created_at, player_id, level, mentor_type, method_type, modifiers, score, metrics))
+            return
+        self._apply(created_at, player_id, level, mentor_type, method_type, modifiers, score, metrics)
+
+    def _apply(
+        self,
+        created_at: float,
+        player_id: Optional[str],
+        level: Optional[int],
+        mentor_type: Optional[str],
+        method_type: Optional[str],
+        modifiers: Optional[List[str]],
+        score: float,
+        metrics: Optional[Dict[str, float]]
+    ):
+        self.attempts += 1
+        passed = score >= self.pass_score
+        self.scores.add(score)
+        ranked_level = level is None or 0 <= level <= self.max_level
+
+        if ranked_level:
+            level_scores = self.level_scores.get(level)
+            if level_scores is None:
+                level_scores = self.level_scores[level] = ScoreHistogram(self.percentile_bins)
+            level_scores.add(score)
+
+        combination = catalogued(mentor_type, method_type, modifiers)
+        stats = self.combinations.get(combination)
+        if stats is None:
+            stats = self.combinations[combination] = CombinationStats(combination, self.combination_bins)
+        stats.add(score, metrics, passed)
+
+        # Anonymous attempts count towards the distributions but not the boards
+        if player_id is None:
+            return
+        if ranked_level:
+            board = self.level_boards.get(level)
+            if board is None:
+                board = self.level_boards[level] = Leaderboard()
+            board.offer(player_id, score, created_at)
+
+        streak = self.streaks.get(player_id, 0) + 1 if passed else 0
+        self.streaks[player_id] = streak
+        if streak:
+            self.streak_board.offer(player_id, streak, created_at)
+
+    async def rebuild(self, path: str, before: float):
+        """Replay scored attempts logged before `before` (epoch seconds), then apply the ones held back"""
+        self.rebuilding = True
+        self.rebuilt = 0
+        self.clear()
+        try:
+            if path and os.path.exists(path):
+                connection = sqlite3.connect(path, check_same_thread=False)
+                try:
+                    cursor = await asyncio.to_thread(
+                        connection.execute,
+                        "SELECT created_at, player_id, level, mentor_type, method_type, modifiers, score, metrics FROM attempts "
+                        "WHERE score IS NOT NULL AND (tier IS NULL OR tier NOT IN (%s)) AND kind NOT IN (%s) AND created_at < ? ORDER BY id"
+                        % (", ".join("?" * len(EXCLUDED_TIERS)), ", ".join("?" * len(UNRANKED_KINDS))),
+                        (*EXCLUDED_TIERS, *UNRANKED_KINDS, before)
+                    )
+                    while True:
+                        rows = await asyncio.to_thread(_read_chunk, cursor)
+                        if not rows:
+                            break
+                        for start in range(0, len(rows), REBUILD_SLICE):
+                            for row in rows[start:start + REBUILD_SLICE]:
+                                self._apply(*row)
+                            # A whole chunk would hold up every request for a quarter of a second
+                            await asyncio.sleep(0)
+                        self.rebuilt += len(rows)
+                finally:
+                    connection.close()
+            logger.info(f"Analytics rebuilt from {self.rebuilt} logged attempts")
+        except Exception as e:
+            logger.error(f"Analytics rebuild failed: {str(e)}")
+        finally:
+            held, self._held = self._held, []
+            for row in held:
+                self._apply(*row)
+            self.rebuilding = False
+
+    def leaderboard(self, level: Optional[int], limit: int = 10) -> Dict[str, Any]:
+        board = self.level_boards.get(level)
+        return {
+            "level": level,
+            "players": len(board) if board else 0,
+            "entries": board.top(limit) if board else []
+        }
+
+    def streak_leaderboard(self, limit: int = 10) -> Dict[str, Any]:
+        entries = self.streak_board.top(limit)
+        for entry in entries:
+            entry["current"] = self.streaks.get(entry["player_id"], 0)
+        return {"pass_score": self.pass_score, "entries": entries}
+
+    def player(self, player_id: str) -> Dict[str, Any]:
+        best = self.streak_board.best.get(player_id)
+        return {
+            "player_id": player_id,
+            "current_streak": self.streaks.get(player_id, 0),
+            "best_streak": int(best[0]) if best else 0,
+            "levels": {
+                level: {"best_score": board.best[player_id][0], "rank": board.rank(player_id)}
+                for level, board in self.level_boards.items() if player_id in board.best
+            }
+        }
+
+    def combination_summaries(self, limit: int = 20, min_attempts: int = 1, sort: str = "avg_score") -> List[Dict[str, Any]]:
+        summaries = [stats.summary() for stats in self.combinations.values() if stats.attempts >= min_attempts]
+        summaries.sort(key=lambda summary: summary[sort], reverse=True)
+        return summaries[:max(0, limit)]
+
+    def combination(self, mentor_type: Optional[str], method_type: Optional[str], modifiers: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        stats = self.combinations.get(catalogued(mentor_type, method_type, modifiers))
+        if stats is None:
+            return None
+        return {**stats.summary(), "histogram": stats.histogram.buckets()}
+
+    def percentile(self, score: float, level: Optional[int] = None) -> Dict[str, Any]:
+        histogram = self.scores if level is None else self.level_scores.get(level)
+        return {
+            "score": score,
+            "level": level,
+            "attempts": histogram.total if histogram else 0,
+            "percentile": histogram.percentile_rank(score) if histogram else 0.0
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "rebuilding": self.rebuilding,
+            "rebuilt": self.rebuilt,
+            "held": len(self._held),
+            "players": len(self.streaks),
+            "levels": len(self.level_boards),
+            "combinations": len(self.combinations)
+        }
+
+def _read_chunk(cursor: sqlite3.Cursor) -> List[Tuple]:
+    """Fetch and decode the next chunk of attempts on a worker thread"""
+    return [
+        (
+            created_at, player_id, level, mentor_type, method_type,
+            json.loads(modifiers) if modifiers else None, score, json.loads(metrics) if metrics else None
+        )
+        for created_at, player_id, level, mentor_type, method_type, modifiers, score, metrics in cursor.fetchmany(REBUILD_CHUNK)
+    ]
+
+# Fed by the attempt log as each scored attempt is recorded
+rollups = AnalyticsRollups.from_env()
@@ -0,0 +1,248 @@
+import logging
+import os
+import json
+import time
+import sqlite3
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS attempts (
+        id INTEGER PRIMARY KEY,
+        created_at REAL NOT NULL,
+        kind TEXT NOT NULL,
+        player_id TEXT,
+        level INTEGER,
+        mentor_type TEXT,
+        method_type TEXT,
+        modifiers TEXT,
+        combination TEXT NOT NULL,
+        prompt TEXT NOT NULL,
+        output TEXT,
+        score REAL,
+        tier TEXT,
+        token_count INTEGER,
+        metrics TEXT,
+        latency_ms REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS attempts_player ON attempts (player_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS attempts_level ON attempts (level, created_at)",
+    "CREATE INDEX IF NOT EXISTS attempts_combination ON attempts (combination, created_at)",
+    "CREATE INDEX IF NOT EXISTS attempts_created ON attempts (created_at)"
+)
+
+INSERT = """
+    INSERT INTO attempts (
+        created_at, kind, player_id, level, mentor_type, method_type, modifiers, combination,
+        prompt, output, score, tier, token_count, metrics, latency_ms
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Kinds logged for the record only: re-scoring a level or grading a class is not a player's attempt,
+# so these never reach the leaderboards, streaks or card analytics
+UNRANKED_KINDS = ("rescore",)
+
+def combination_key(mentor_type: Optional[str], method_type: Optional[str], modifiers: Optional[List[str]]) -> str:
+    """One string per card combination, independent of modifier order"""
+    return f"{mentor_type or '-'}|{method_type or '-'}|{'+'.join(sorted(modifiers or [])) or '-'}"
+
+class AttemptLog:
+    """
+    Write-behind log of every round played. record() only appends a row to a
+    bounded in-memory queue, so the request path never touches the database;
+    a background task drains the queue in batches into SQLite (WAL mode) on a
+    worker thread. When the queue is full new attempts are dropped and counted
+    rather than slowing requests down. close() writes whatever is still queued.
+    Until start() runs nothing is queued, so an app serving the routes without
+    the api-core lifespan (the standalone model services) does not fill a
+    queue nobody drains.
+    """
+    def __init__(
+        self,
+        path: str = "data/attempts.db",
+        max_queue: int = 10000,
+        batch_size: int = 256,
+        flush_interval_ms: float = 500.0
+    ):
+        self.path = path
+        self.enabled = bool(path)
+        self.max_queue = max(1, max_queue)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval_ms) / 1000.0
+
+        self._pending: Deque[Tuple] = deque()
+        self._ready: Optional[asyncio.Event] = None
+        self._drainer: Optional[asyncio.Task] = None
+        self._closing = False
+        self._connection: Optional[sqlite3.Connection] = None
+        # Called with (created_at, player_id, level, mentor_type, method_type, modifiers, score, metrics, tier) for each scored attempt
+        self._listeners: List[Callable] = []
+
+        self.recorded = 0
+        self.dropped = 0
+        self.unstarted = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.write_time = 0.0
+
+    @classmethod
+    def from_env(cls) -> "AttemptLog":
+        return cls(
+            path=os.getenv("ATTEMPT_LOG_PATH", "data/attempts.db"),
+            max_queue=int(os.getenv("ATTEMPT_LOG_MAX_QUEUE", "10000")),
+            batch_size=int(os.getenv("ATTEMPT_LOG_BATCH_SIZE", "256")),
+            flush_interval_ms=float(os.getenv("ATTEMPT_LOG_FLUSH_MS", "500"))
+        )
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a connection to the log with the schema in place"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.commit()
+        return connection
+
+    async def start(self):
+        """Open the database and start draining; called from the app lifespan"""
+        if not self.enabled:
+            logger.info("Attempt log disabled (ATTEMPT_LOG_PATH is empty)")
+            return
+        self._connection = await asyncio.to_thread(self.connect)
+        self._ready = asyncio.Event()
+        self._closing = False
+        self._drainer = asyncio.create_task(self._drain())
+        logger.info(f"Logging attempts to {self.path}")
+
+    async def close(self):
+        """Stop draining and write everything still queued"""
+        if self._drainer is not None:
+            # Let the drainer finish its current batch rather than cancelling a write mid-flight
+            self._closing = True
+            self._ready.set()
+            await self._drainer
+            self._drainer = None
+        if self._connection is not None:
+            while self._pending:
+                await self._flush()
+            self._connection.close()
+            self._connection = None
+            logger.info(f"Attempt log closed after writing {self.written} attempts ({self.dropped} dropped)")
+
+    def add_listener(self, listener: Callable):
+        """Have a rollup told about every scored attempt as it is recorded"""
+        self._listeners.append(listener)
+
+    def record(
+        self,
+        kind: str,
+        prompt: str,
+        mentor_type: Optional[str] = None,
+        method_type: Optional[str] = None,
+        modifiers: Optional[List[str]] = None,
+        player_id: Optional[str] = None,
+        level: Optional[int] = None,
+        output: Optional[str] = None,
+        score: Optional[float] = None,
+        tier: Optional[str] = None,
+        token_count: Optional[int] = None,
+        metrics: Optional[Dict[str, float]] = None,
+        latency: Optional[float] = None
+    ) -> bool:
+        """Queue one attempt without blocking; returns False if it was dropped"""
+        created_at = time.time()
+        combination = combination_key(mentor_type, method_type, modifiers)
+        if score is not None and kind not in UNRANKED_KINDS:
+            for listener in self._listeners:
+                listener(created_at, player_id, level, mentor_type, method_type, modifiers, score, metrics, tier)
+
+        if not self.enabled:
+            return False
+        if self._connection is None:
+            if not self.unstarted:
+                logger.warning("Attempt log was never started (no app lifespan); attempts are not being logged")
+            self.unstarted += 1
+            return False
+        if len(self._pending) >= self.max_queue:
+            self.dropped += 1
+            return False
+
+        # Serialization happens on the writer thread
+        self._pending.append((
+            created_at, kind, player_id, level, mentor_type, method_type, modifiers, combination,
+            prompt, output, score, tier, token_count, metrics,
+            latency * 1000.0 if latency is not None else None
+        ))
+        self.recorded += 1
+        if self._ready is not None and (len(self._pending) == 1 or len(self._pending) >= self.batch_size):
+            self._ready.set()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "queued": len(self._pending),
+            "max_queue": self.max_queue,
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "unstarted": self.unstarted,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch_ms": 1000.0 * self.write_time / self.batches if self.batches else 0.0
+        }
+
+    async def _drain(self):
+        while not self._closing:
+            await self._ready.wait()
+            self._ready.clear()
+            if len(self._pending) < self.batch_size and not self._closing:
+                # Give a partial batch a moment to fill
+                try:
+                    await asyncio.wait_for(self._ready.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._ready.clear()
+            while self._pending:
+                await self._flush()
+
+    async def _flush(self):
+        batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+        start_time = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} attempts: {str(e)}")
+            return
+        self.write_time += time.perf_counter() - start_time
+        self.batches += 1
+        self.written += len(batch)
+
+    def _write(self, batch: List[Tuple]):
+        rows = []
+        for created_at, kind, player_id, level, mentor_type, method_type, modifiers, combination, prompt, output, score, tier, token_count, metrics, latency_ms in batch:
+            rows.append((
+                created_at, kind, player_id, level, mentor_type, method_type,
+                json.dumps(modifiers) if modifiers else None,
+                combination,
+                prompt, output, score, tier, token_count,
+                json.dumps(metrics) if metrics else None,
+                latency_ms
+            ))
+        with self._connection:
+            self._connection.executemany(INSERT, rows)
+
+# Shared by the generation, evaluation and play routes
+attempt_log = AttemptLog.from_env()
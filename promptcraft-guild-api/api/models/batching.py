@@ -0,0 +1,136 @@
+import logging
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A batch runner takes the keyword arguments of each pending request and returns
+# one result per request, in order. An item may be an Exception to fail only that caller.
+BatchRunner = Callable[[List[Dict[str, Any]]], Awaitable[List[Any]]]
+
+class MicroBatcher:
+    """
+    Collects concurrent requests into batches for a single engine.
+    A batch is dispatched once it reaches max_batch_size or once the oldest
+    request has waited max_wait_ms, whichever comes first.
+    """
+    def __init__(
+        self,
+        run_batch: BatchRunner,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        name: str = "batcher"
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Per-batch statistics
+        self.batches_run = 0
+        self.requests_batched = 0
+        self.max_observed_batch = 0
+        self.last_batch_size = 0
+        self.last_wait_time = 0.0
+        self.total_wait_time = 0.0
+        self.total_run_time = 0.0
+
+    async def submit(self, **kwargs) -> Any:
+        """Queue a request and wait for its share of the batched result"""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((kwargs, future, time.monotonic()))
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters describing how requests have been batched so far"""
+        batches = self.batches_run or 1
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "batches_run": self.batches_run,
+            "requests_batched": self.requests_batched,
+            "avg_batch_size": self.requests_batched / batches,
+            "max_observed_batch_size": self.max_observed_batch,
+            "last_batch_size": self.last_batch_size,
+            "last_wait_ms": self.last_wait_time * 1000.0,
+            "avg_wait_ms": (self.total_wait_time / batches) * 1000.0,
+            "avg_run_ms": (self.total_run_time / batches) * 1000.0
+        }
+
+    def _ensure_worker(self):
+        """Start the dispatch task on the running loop, restarting it if the loop changed"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._dispatch())
+
+    async def _collect(self) -> List[Tuple[Dict[str, Any], asyncio.Future, float]]:
+        """Wait for the first request, then gather more until the batch is full or the window closes"""
+        batch = [await self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # Still take whatever is already queued without waiting
+                if self._queue.empty():
+                    break
+                batch.append(self._queue.get_nowait())
+                continue
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _dispatch(self):
+        """Run batches forever, fanning results back out to the waiting callers"""
+        while True:
+            batch = await self._collect()
+
+            # Callers that gave up while queued don't need to be computed
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+
+            dispatch_time = time.monotonic()
+            wait_time = dispatch_time - batch[0][2]
+
+            try:
+                results = await self.run_batch([kwargs for kwargs, _, _ in batch])
+            except Exception as e:
+                logger.error(f"{self.name}: batch of {len(batch)} failed: {str(e)}")
+                results = [e] * len(batch)
+
+            run_time = time.monotonic() - dispatch_time
+            self._record(len(batch), wait_time, run_time)
+
+            for (_, future, _), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _record(self, batch_size: int, wait_time: float, run_time: float):
+        """Update per-batch statistics"""
+        self.batches_run += 1
+        self.requests_batched += batch_size
+        self.max_observed_batch = max(self.max_observed_batch, batch_size)
+        self.last_batch_size = batch_size
+        self.last_wait_time = wait_time
+        self.total_wait_time += wait_time
+        self.total_run_time += run_time
+
+        logger.debug(f"{self.name}: ran batch of {batch_size} after waiting {wait_time * 1000:.1f}ms")
@@ -0,0 +1,155 @@
+import logging
+import time
+import json
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .shared_cache import SharedMemoryStore, cache_tag
+
+logger = logging.getLogger(__name__)
+
+# Temperatures closer together than this share a cache entry
+TEMPERATURE_BUCKET = 0.05
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse runs of whitespace so copy-pasted prompts hash identically"""
+    return " ".join(prompt.split())
+
+def normalize_modifiers(modifiers: Optional[List[str]]) -> Optional[List[str]]:
+    """Sort modifiers so card order does not change the key"""
+    return sorted(modifiers) if modifiers else None
+
+def bucket_temperature(temperature: float) -> float:
+    """Round a temperature to the nearest cache bucket"""
+    return round(round(temperature / TEMPERATURE_BUCKET) * TEMPERATURE_BUCKET, 4)
+
+def canonical_key(namespace: str, **fields: Any) -> str:
+    """Hash the already-normalized request fields into a content address"""
+    payload = json.dumps(fields, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+class ResponseCache:
+    """
+    In-memory LRU cache for engine results with TTL expiry and a byte-size cap.
+    Values are assumed to be JSON-serializable dicts; their encoded size is
+    what counts against max_bytes.
+
+    Given a SharedMemoryStore, entries live there instead, shared with every
+    worker process on the host; max_entries and max_bytes then come from the
+    store's size, and hit/miss counters remain this process's own.
+    """
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl_seconds: float = 600.0,
+        name: str = "cache",
+        shared: Optional[SharedMemoryStore] = None
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.name = name
+        self.shared = shared
+        self.tag = cache_tag(name)
+
+        # key -> (expires_at, size, value), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached value, or None on a miss"""
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(value)
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """Store a value, evicting least recently used entries to stay within limits"""
+        if self.shared is not None:
+            self.shared.set(key, value, self.ttl, self.tag)
+            return
+
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (time.monotonic() + self.ttl, size, dict(value))
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def bypass(self):
+        """Count a request that skipped the cache"""
+        self.bypasses += 1
+
+    def clear(self):
+        """Drop every entry"""
+        if self.shared is not None:
+            self.shared.clear(self.tag)
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current occupancy"""
+        lookups = self.hits + self.misses
+        if self.shared is not None:
+            occupancy = self.shared.occupancy(self.tag)
+            entries, size = occupancy["entries"], occupancy["bytes"]
+            max_entries, max_bytes = self.shared.slots, self.shared.slots * self.shared.value_capacity
+            evictions = self.shared.evictions
+        else:
+            entries, size = len(self._entries), self._bytes
+            max_entries, max_bytes = self.max_entries, self.max_bytes
+            evictions = self.evictions
+        return {
+            "name": self.name,
+            "backend": "shared" if self.shared is not None else "local",
+            "entries": entries,
+            "bytes": size,
+            "max_entries": max_entries,
+            "max_bytes": max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "evictions": evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
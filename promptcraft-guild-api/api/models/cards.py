@@ -0,0 +1,261 @@
+import logging
+import sys
+import json
+import hashlib
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MENTOR = "mentor"
+METHOD = "method"
+MODIFIER = "modifier"
+CARD_TYPES = (MENTOR, METHOD, MODIFIER)
+
+DEFAULT_MENTOR_INTRO = "Here's a thoughtful response to your query. "
+DEFAULT_METHOD_INTRO = "Let's explore this topic systematically. "
+DEFAULT_MOCK_INTRO = "Here's a thoughtful response to your query."
+
+# Card definitions shared with the frontend (served from /api/cards).
+# `style` shapes generation, `feedback` is the evaluator's advice for the card
+# and `mock_text` is what the mock generation endpoint writes for it.
+CARD_DEFINITIONS: Tuple[Dict[str, Any], ...] = (
+    {
+        "id": "mentor-1", "type": MENTOR, "title": "The Archivist", "token_cost": 20, "icon": "BookOpenText",
+        "content": "Formal and precise. Presents information with scholarly detachment and historical context.",
+        "style": "formal and detached, with historical references",
+        "feedback": "Consider a more formal structure with clear citations of precedent.",
+        "mock_text": "In examining the historical context and precedent, we observe a pattern of logical progression that leads to a formal conclusion."
+    },
+    {
+        "id": "mentor-2", "type": MENTOR, "title": "The Sage", "token_cost": 25, "icon": "Lamp",
+        "content": "Wise and contemplative. Presents ideas with depth, making connections across disciplines.",
+        "style": "contemplative and wise, with cross-disciplinary insights",
+        "feedback": "Deepen your connections across disciplines for more profound insights.",
+        "mock_text": "Consider, if you will, the deeper implications. When we look beyond the surface, we find connections that transcend the obvious."
+    },
+    {
+        "id": "mentor-3", "type": MENTOR, "title": "The Guide", "token_cost": 15, "icon": "Compass",
+        "content": "Supportive and instructive. Leads through concepts with clear pathways and examples.",
+        "style": "supportive and instructive, with clear examples",
+        "feedback": "Provide clearer pathways and examples to lead the reader.",
+        "mock_text": "Let me walk you through this step by step. First, we need to establish our goal, then identify the path forward."
+    },
+    {
+        "id": "mentor-4", "type": MENTOR, "title": "The Inventor", "token_cost": 30, "icon": "Lightbulb",
+        "content": "Creative and unconventional. Approaches problems with fresh perspectives and innovative solutions.",
+        "style": "creative and unconventional, with innovative perspectives",
+        "feedback": "Explore more unconventional perspectives and innovative solutions.",
+        "mock_text": "What if we approach this from an entirely different angle? Let's reimagine the constraints as opportunities."
+    },
+    {
+        "id": "mentor-5", "type": MENTOR, "title": "The Storyteller", "token_cost": 35, "icon": "BookOpen",
+        "content": "Narrative-focused and engaging. Presents concepts through compelling stories and analogies.",
+        "style": "narrative and engaging, with compelling analogies",
+        "feedback": "Develop a stronger narrative arc to engage the reader.",
+        "mock_text": "Imagine a world where this problem has already been solved. What tale would we tell about how it happened?"
+    },
+    {
+        "id": "method-1", "type": METHOD, "title": "SCAMPER", "token_cost": 15, "icon": "Recycle",
+        "content": "Substitute, Combine, Adapt, Modify, Put to other use, Eliminate, Reverse.",
+        "style": "using substitution, combination, adaptation, modification, repurposing, elimination, and reversal",
+        "feedback": "Apply more substitution and combination techniques.",
+        "mock_text": "We could substitute X with Y, combine it with Z, adapt it by..., modify the core idea, put it to another use, eliminate the unnecessary, and reverse the traditional approach."
+    },
+    {
+        "id": "method-2", "type": METHOD, "title": "First Principles", "token_cost": 20, "icon": "AlignLeft",
+        "content": "Break down complex problems into basic elements then reassemble from ground up.",
+        "style": "breaking down concepts to fundamental truths and building up from there",
+        "feedback": "Break down your reasoning to more fundamental elements.",
+        "mock_text": "Breaking this down to its fundamental truths: First, we know that... Second, it follows that... Therefore..."
+    },
+    {
+        "id": "method-3", "type": METHOD, "title": "Chain-of-Thought", "token_cost": 25, "icon": "Link",
+        "content": "Walk through reasoning step by step, making each logical connection explicit.",
+        "style": "reasoning step by step through logical connections",
+        "feedback": "Make each logical step more explicit in your reasoning.",
+        "mock_text": "Let's reason through this sequentially. Initially, we observe... This leads us to consider... Which implies... Resulting in..."
+    },
+    {
+        "id": "method-4", "type": METHOD, "title": "SWOT Analysis", "token_cost": 20, "icon": "LayoutGrid",
+        "content": "Evaluate Strengths, Weaknesses, Opportunities, and Threats.",
+        "style": "evaluating strengths, weaknesses, opportunities, and threats",
+        "feedback": "Balance your analysis across all four SWOT quadrants.",
+        "mock_text": "Strengths: clear advantage in... Weaknesses: potential gaps in... Opportunities: emerging possibilities for... Threats: challenges from..."
+    },
+    {
+        "id": "method-5", "type": METHOD, "title": "Socratic Method", "token_cost": 30, "icon": "HelpCircle",
+        "content": "Examine through progressive questioning to stimulate critical thinking.",
+        "style": "examining through progressive questioning to stimulate critical thinking",
+        "feedback": "Deepen your questioning to stimulate critical thinking.",
+        "mock_text": "What would happen if...? How does this relate to...? Why might this be the case? What evidence supports this conclusion?"
+    },
+    {
+        "id": "modifier-1", "type": MODIFIER, "title": "Token Limit", "token_cost": 0, "icon": "Ruler",
+        "content": "Maximum 150 tokens allowed for the prompt.",
+        "style": "being concise and direct",
+        "feedback": None,
+        "mock_text": "Concisely stated, the core concept is..."
+    },
+    {
+        "id": "modifier-2", "type": MODIFIER, "title": "Use Metaphor", "token_cost": 10, "icon": "Sparkles",
+        "content": "Include at least one extended metaphor in your response.",
+        "style": "incorporating extended metaphors",
+        "feedback": None,
+        "mock_text": "This is like a garden where ideas bloom with proper nurturing."
+    },
+    {
+        "id": "modifier-3", "type": MODIFIER, "title": "Concrete Examples", "token_cost": 15, "icon": "ListTodo",
+        "content": "Provide at least 3 specific examples to illustrate your point.",
+        "style": "providing specific examples",
+        "feedback": None,
+        "mock_text": "Consider these three examples: First, when Tesla designed the Model S... Second, when SpaceX developed reusable rockets... Third, when Apple created the iPhone..."
+    },
+    {
+        "id": "modifier-4", "type": MODIFIER, "title": "Data Driven", "token_cost": 15, "icon": "LineChart",
+        "content": "Include numerical data or statistics to support your argument.",
+        "style": "including numerical data and statistics",
+        "feedback": None,
+        "mock_text": "According to recent studies, 78% of users prefer... The data shows a 42% increase in..."
+    },
+    {
+        "id": "modifier-5", "type": MODIFIER, "title": "Opposing Views", "token_cost": 20, "icon": "Split",
+        "content": "Present multiple perspectives on the topic.",
+        "style": "presenting multiple perspectives",
+        "feedback": None,
+        "mock_text": "Some argue that... However, others maintain that... A middle ground might be..."
+    },
+)
+
+@dataclass(frozen=True)
+class Card:
+    """An immutable card with its prompt fragment pre-rendered"""
+    id: str
+    type: str
+    title: str
+    content: str
+    token_cost: int
+    icon: Optional[str]
+    style: str
+    feedback: Optional[str]
+    mock_text: str
+    fragment: str
+
+    def to_frontend(self) -> Dict[str, Any]:
+        """Render the card in the shape the frontend's Card type expects"""
+        return {
+            "id": self.id,
+            "type": self.type,
+            "title": self.title,
+            "content": self.content,
+            "tokenCost": self.token_cost,
+            "icon": self.icon
+        }
+
+@dataclass(frozen=True)
+class Preamble:
+    """Fully assembled card text for one (mentor, method, modifiers) combination"""
+    mentor_intro: str
+    method_intro: str
+    modifier_fragments: Tuple[str, ...]
+    mock_fragments: Tuple[str, ...]
+
+def _render_fragment(card_type: str, title: str, style: str) -> str:
+    """Pre-render the sentence a card contributes to a generated response"""
+    if card_type == MENTOR:
+        return f"As {title}, I'll approach this {style}. "
+    if card_type == METHOD:
+        return f"I'll analyze this by {style}. "
+    return f"I'll address this by {style}. "
+
+class CardRegistry:
+    """
+    Read-only registry of every card, built once at import.
+    Lookups are by (type, title) since requests name cards by title.
+    """
+    def __init__(self, definitions: Tuple[Dict[str, Any], ...] = CARD_DEFINITIONS):
+        cards = []
+        for definition in definitions:
+            card_type = sys.intern(definition["type"])
+            title = sys.intern(definition["title"])
+            cards.append(Card(
+                id=sys.intern(definition["id"]),
+                type=card_type,
+                title=title,
+                content=definition["content"],
+                token_cost=definition["token_cost"],
+                icon=definition.get("icon"),
+                style=definition["style"],
+                feedback=definition.get("feedback"),
+                mock_text=definition["mock_text"],
+                fragment=_render_fragment(card_type, title, definition["style"])
+            ))
+
+        self.cards: Tuple[Card, ...] = tuple(cards)
+        self.by_id: Mapping[str, Card] = MappingProxyType({card.id: card for card in cards})
+        self._by_type: Mapping[str, Mapping[str, Card]] = MappingProxyType({
+            card_type: MappingProxyType({card.title: card for card in cards if card.type == card_type})
+            for card_type in CARD_TYPES
+        })
+
+        # Serialized once so /api/cards never re-encodes
+        self.payload = json.dumps({
+            "mentors": [card.to_frontend() for card in cards if card.type == MENTOR],
+            "methods": [card.to_frontend() for card in cards if card.type == METHOD],
+            "modifiers": [card.to_frontend() for card in cards if card.type == MODIFIER]
+        }, separators=(",", ":")).encode("utf-8")
+        self.etag = f'"{hashlib.sha256(self.payload).hexdigest()[:32]}"'
+
+        logger.info(f"Card registry loaded with {len(self.cards)} cards")
+
+    def find(self, card_type: str, title: Optional[str]) -> Optional[Card]:
+        """Return the card of the given type with this title, if any"""
+        if not title:
+            return None
+        return self._by_type[card_type].get(title)
+
+    def mentor(self, title: Optional[str]) -> Optional[Card]:
+        return self.find(MENTOR, title)
+
+    def method(self, title: Optional[str]) -> Optional[Card]:
+        return self.find(METHOD, title)
+
+    def modifier(self, title: Optional[str]) -> Optional[Card]:
+        return self.find(MODIFIER, title)
+
+    def preamble(
+        self,
+        mentor_type: Optional[str],
+        method_type: Optional[str],
+        modifiers: Optional[List[str]]
+    ) -> Preamble:
+        """Return the assembled card text for a combination, cached per combination"""
+        return self._preamble(mentor_type, method_type, tuple(modifiers) if modifiers else ())
+
+    @lru_cache(maxsize=2048)
+    def _preamble(
+        self,
+        mentor_type: Optional[str],
+        method_type: Optional[str],
+        modifiers: Tuple[str, ...]
+    ) -> Preamble:
+        mentor = self.mentor(mentor_type)
+        method = self.method(method_type)
+        modifier_cards = [card for card in (self.modifier(title) for title in modifiers) if card]
+
+        mock_fragments = [mentor.mock_text if mentor else DEFAULT_MOCK_INTRO]
+        if method:
+            mock_fragments.append(method.mock_text)
+        mock_fragments.extend(card.mock_text for card in modifier_cards)
+
+        return Preamble(
+            mentor_intro=mentor.fragment if mentor else DEFAULT_MENTOR_INTRO,
+            method_intro=method.fragment if method else DEFAULT_METHOD_INTRO,
+            modifier_fragments=tuple(card.fragment for card in modifier_cards),
+            mock_fragments=tuple(mock_fragments)
+        )
+
+# Initialize the shared registry
+registry = CardRegistry()
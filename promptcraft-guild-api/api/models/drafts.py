@@ -0,0 +1,323 @@
+import logging
+import os
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .tokenizer import tokenizer, PRETOKENIZE_PATTERN, MAX_TEXT_CHARS
+from .cascade import cascade, MIN_PROMPT_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# Extra pre-tokens re-lexed before an edit, since a piece's extent depends on the character after it
+RELEX_MARGIN = 1
+
+# Words that suggest a modifier card is being followed; "#" stands for any number
+MODIFIER_CUES = {
+    "Use Metaphor": frozenset(("like", "metaphor", "imagine", "picture", "resembles")),
+    "Concrete Examples": frozenset(("example", "examples", "instance", "specifically", "case")),
+    "Data Driven": frozenset(("#", "%", "percent", "data", "statistics")),
+    "Opposing Views": frozenset(("however", "although", "whereas", "others", "critics", "opposing", "but"))
+}
+
+class DraftEditError(ValueError):
+    """Raised when an edit does not fit the current draft text"""
+
+def _word(piece: str) -> str:
+    """The key a pre-token is tallied under for modifier cues"""
+    word = piece.strip().lower()
+    return "#" if word.isdigit() else word
+
+class DraftDocument:
+    """
+    A prompt being composed, kept as its pre-tokens with a token count each.
+    An edit re-lexes from just before the changed span until the new pieces
+    line up with an old boundary again, so only the touched words go through
+    BPE; the token total, word tallies for modifier cues and the constraint
+    checks are adjusted from the removed and added pieces.
+    """
+    def __init__(
+        self,
+        text: str = "",
+        mentor_type: Optional[str] = None,
+        method_type: Optional[str] = None,
+        modifiers: Optional[List[str]] = None,
+        token_limit: int = 150
+    ):
+        self.text = ""
+        self.pieces: List[str] = []
+        self.counts: List[int] = []
+        self.starts: List[int] = []
+        self.token_count = 0
+        self.words: Counter = Counter()
+        self.version = 0
+        # What the client was last sent, so updates only carry what changed
+        self._reported: Dict[str, Any] = {}
+        self.configure(mentor_type, method_type, modifiers, token_limit)
+        if text:
+            self.splice(0, 0, text)
+
+    def configure(
+        self,
+        mentor_type: Optional[str] = None,
+        method_type: Optional[str] = None,
+        modifiers: Optional[List[str]] = None,
+        token_limit: int = 150
+    ):
+        """Set the cards the draft is checked against"""
+        self.mentor_type = mentor_type
+        self.method_type = method_type
+        self.modifiers = list(modifiers or [])
+        self.token_limit = token_limit
+
+    def cards(self) -> Dict[str, Any]:
+        """The cards the draft is checked against, as configure() takes them"""
+        return {
+            "mentor_type": self.mentor_type,
+            "method_type": self.method_type,
+            "modifiers": self.modifiers,
+            "token_limit": self.token_limit
+        }
+
+    def splice(self, start: int, end: int, replacement: str = ""):
+        """Replace text[start:end] (character offsets) with replacement"""
+        if not 0 <= start <= end <= len(self.text):
+            raise DraftEditError(f"Edit span [{start}, {end}) is outside the draft (length {len(self.text)})")
+
+        text = self.text[:start] + replacement + self.text[end:]
+        shift = len(replacement) - (end - start)
+
+        # First piece to re-lex: the one holding the character before the edit, plus a margin.
+        # Whitespace runs are split by what follows them, so step back over those too.
+        first = max(0, bisect_right(self.starts, start - 1) - 1 - RELEX_MARGIN)
+        while first > 0 and self.pieces[first - 1].isspace():
+            first -= 1
+        position = self.starts[first] if self.pieces else 0
+
+        # Old pieces starting at or after the edit's end see the same suffix, so once the
+        # new lexing reaches one of their boundaries the rest of the pieces are unchanged
+        resync = bisect_left(self.starts, end)
+        added = []
+        while position < len(text):
+            while resync < len(self.starts) and self.starts[resync] + shift < position:
+                resync += 1
+            if resync < len(self.starts) and self.starts[resync] + shift == position:
+                break
+            match = PRETOKENIZE_PATTERN.match(text, position)
+            piece = match.group() if match else text[position]
+            added.append(piece)
+            position += len(piece)
+        else:
+            resync = len(self.starts)
+
+        removed = self.pieces[first:resync]
+        added_counts = [tokenizer.count_piece(piece) for piece in added]
+        self.token_count += sum(added_counts) - sum(self.counts[first:resync])
+        for piece in removed:
+            word = _word(piece)
+            self.words[word] -= 1
+            if not self.words[word]:
+                del self.words[word]
+        self.words.update(_word(piece) for piece in added)
+
+        added_starts = []
+        offset = self.starts[first] if self.pieces else 0
+        for piece in added:
+            added_starts.append(offset)
+            offset += len(piece)
+
+        self.pieces[first:resync] = added
+        self.counts[first:resync] = added_counts
+        self.starts[first:resync] = added_starts
+        for index in range(first + len(added), len(self.starts)):
+            self.starts[index] += shift
+        self.text = text
+
+    def apply(self, edits: List[Dict[str, Any]]):
+        """
+        Apply edits in order; each is {"start", "end", "text"} against the text left by the previous one.
+        All spans, and the length of the result, are checked first, so a bad edit leaves the draft untouched.
+        """
+        spans = []
+        length = len(self.text)
+        for edit in edits:
+            start = edit.get("start", 0)
+            end = edit.get("end", start)
+            replacement = edit.get("text") or ""
+            if not 0 <= start <= end <= length:
+                raise DraftEditError(f"Edit span [{start}, {end}) is outside the draft (length {length})")
+            length += len(replacement) - (end - start)
+            spans.append((start, end, replacement))
+        if length > MAX_TEXT_CHARS:
+            raise DraftEditError(f"Edits would make the draft {length} characters long (at most {MAX_TEXT_CHARS})")
+
+        for start, end, replacement in spans:
+            self.splice(start, end, replacement)
+        self.version += 1
+
+    def checks(self) -> Dict[str, bool]:
+        """Constraint checks for the current text and cards"""
+        within_limit = self.token_count <= self.token_limit
+        checks = {
+            "within_limit": within_limit,
+            "min_length": self.token_count >= MIN_PROMPT_TOKENS,
+            "cards_complete": bool(self.mentor_type and self.method_type and self.modifiers)
+        }
+        for modifier in self.modifiers:
+            cues = MODIFIER_CUES.get(modifier)
+            checks[modifier] = within_limit if cues is None else any(self.words[cue] > 0 for cue in cues)
+        return checks
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The draft's full scoring state"""
+        checks = self.checks()
+        filled = sum(1 for card in (self.mentor_type, self.method_type, self.modifiers) if card)
+        if self.token_count <= self.token_limit:
+            budget = min(1.0, self.token_count / (0.4 * self.token_limit)) if self.token_limit else 0.0
+        else:
+            budget = max(0.0, 1.0 - (self.token_count - self.token_limit) / self.token_limit)
+        satisfied = [checks[modifier] for modifier in self.modifiers]
+
+        return {
+            "token_count": self.token_count,
+            "tokens_remaining": self.token_limit - self.token_count,
+            "score": round(cascade.heuristic_score(
+                self.token_count, self.mentor_type, self.method_type, self.modifiers, self.token_limit
+            ), 4),
+            "checks": checks,
+            "subscores": {
+                "cards": round(filled / 3, 4),
+                "budget": round(budget, 4),
+                "modifiers": round(sum(satisfied) / len(satisfied), 4) if satisfied else 0.0
+            }
+        }
+
+    def delta(self) -> Dict[str, Any]:
+        """Only the fields that changed since the last delta (everything, the first time)"""
+        current = self.snapshot()
+        changes: Dict[str, Any] = {"version": self.version}
+        for field, value in current.items():
+            previous = self._reported.get(field)
+            if isinstance(value, dict):
+                changed = {key: item for key, item in value.items() if previous is None or previous.get(key) != item}
+                removed = [key for key in (previous or {}) if key not in value]
+                if changed:
+                    changes[field] = changed
+                if removed:
+                    changes.setdefault("removed", {})[field] = removed
+            elif previous != value or field not in self._reported:
+                changes[field] = value
+        self._reported = current
+        return changes
+
+@dataclass
+class _OpenDraft:
+    draft: DraftDocument
+    owner: str
+    touched: float
+
+class DraftStore:
+    """
+    Open drafts by id, least recently used evicted first. A draft left
+    untouched for ttl_seconds expires, and a client opening more than
+    max_per_client loses its own least recently used one, so no single
+    client can fill the store.
+    """
+    def __init__(self, max_drafts: int = 10000, max_per_client: int = 8, ttl_seconds: float = 1800.0):
+        self.max_drafts = max_drafts
+        self.max_per_client = max(1, max_per_client)
+        self.ttl = ttl_seconds
+        self._drafts: "OrderedDict[str, _OpenDraft]" = OrderedDict()
+        self._owned: Counter = Counter()
+
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+        self.updates = 0
+        self.update_time = 0.0
+
+    @classmethod
+    def from_env(cls) -> "DraftStore":
+        return cls(
+            max_drafts=int(os.getenv("DRAFT_MAX_OPEN", "10000")),
+            max_per_client=int(os.getenv("DRAFT_MAX_PER_CLIENT", "8")),
+            ttl_seconds=float(os.getenv("DRAFT_TTL_SECONDS", "1800"))
+        )
+
+    def create(self, owner: str = "anonymous", **fields) -> Tuple[str, DraftDocument]:
+        now = time.monotonic()
+        self._expire(now)
+        if self._owned[owner] >= self.max_per_client:
+            self._remove(next(draft_id for draft_id, entry in self._drafts.items() if entry.owner == owner))
+            self.evicted += 1
+
+        draft_id = uuid.uuid4().hex
+        draft = DraftDocument(**fields)
+        self._drafts[draft_id] = _OpenDraft(draft, owner, now)
+        self._owned[owner] += 1
+        self.created += 1
+        if len(self._drafts) > self.max_drafts:
+            self._remove(next(iter(self._drafts)))
+            self.evicted += 1
+        return draft_id, draft
+
+    def get(self, draft_id: str) -> Optional[DraftDocument]:
+        entry = self._drafts.get(draft_id)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if now - entry.touched > self.ttl:
+            self._remove(draft_id)
+            self.expired += 1
+            return None
+        entry.touched = now
+        self._drafts.move_to_end(draft_id)
+        return entry.draft
+
+    def discard(self, draft_id: str) -> bool:
+        if draft_id not in self._drafts:
+            return False
+        self._remove(draft_id)
+        return True
+
+    def update(self, draft: DraftDocument, edits: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply edits to a draft and return its delta, timing the work"""
+        start_time = time.perf_counter()
+        draft.apply(edits)
+        changes = draft.delta()
+        self.updates += 1
+        self.update_time += time.perf_counter() - start_time
+        return changes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open": len(self._drafts),
+            "max_open": self.max_drafts,
+            "max_per_client": self.max_per_client,
+            "created": self.created,
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "updates": self.updates,
+            "avg_update_ms": 1000.0 * self.update_time / self.updates if self.updates else 0.0
+        }
+
+    def _expire(self, now: float):
+        """Drop drafts idle past the TTL; the least recently used come first"""
+        while self._drafts:
+            draft_id, entry = next(iter(self._drafts.items()))
+            if now - entry.touched <= self.ttl:
+                break
+            self._remove(draft_id)
+            self.expired += 1
+
+    def _remove(self, draft_id: str):
+        entry = self._drafts.pop(draft_id)
+        self._owned[entry.owner] -= 1
+        if not self._owned[entry.owner]:
+            del self._owned[entry.owner]
+
+# Drafts opened over HTTP; WebSocket sessions keep their own
+drafts = DraftStore.from_env()
@@ -0,0 +1,11 @@
+class ServiceUnavailable(Exception):
+    """
+    Raised when a backend cannot take the request right now.
+    The API turns it into `status_code` (503 unless a subclass says otherwise)
+    with a Retry-After header.
+    """
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -1,7 +1,21 @@
 import logging
 import time
 import random
-from typing import Dict, List, Optional, Any
+import os
+import asyncio
+from typing import Dict, List, Optional, Tuple, Any
+from .tokenizer import count_tokens
+from .cards import registry
+from .remote import RemoteServiceClient
+from .workers import worker_pool
+from .loading import ModelLoadState, map_weights
+from .metrics import record_evaluation
+from .singleflight import SingleFlight
+from .cascade import cascade
+from .shared_cache import shared_store
+from .cache import ResponseCache, canonical_key, normalize_modifiers, normalize_prompt
+from .similarity import similarity_index, with_similarity, with_target_similarity
+from .results import EvaluationResult
 
 logger = logging.getLogger(__name__)
 
@@ -11,11 +25,39 @@ class PrometheusEvaluator:
     In a production environment, this would be replaced with the actual model integration.
     """
     def __init__(self):
-        logger.info("Initializing PrometheusEvaluator")
         self.model_name = "prometheus-2-mock"
-        self.is_initialized = True
+        self.weights_path = os.getenv("PROMETHEUS_WEIGHTS_PATH")
+        self.weights = None
+        # Construction is cheap; weights load in load(), from the app lifespan or on first use
+        self.load_state = ModelLoadState("prometheus")
+    
+    @property
+    def is_initialized(self) -> bool:
+        return self.load_state.status == "ready"
+    
+    def load(self):
+        """Load the model weights; safe to call repeatedly and from several threads"""
+        self.load_state.run(self._load_weights)
+    
+    def _load_weights(self):
+        logger.info("Initializing PrometheusEvaluator")
+        if self.weights_path:
+            self.weights = map_weights(self.weights_path)
         logger.info(f"PrometheusEvaluator initialized, model: {self.model_name}")
     
+    async def ensure_loaded(self):
+        """Load the model off the event loop if the lifespan hook has not already"""
+        if not self.is_initialized:
+            await asyncio.to_thread(self.load)
+    
+    async def warmup(self) -> float:
+        """Run one evaluation so the first real request avoids cold-start costs; returns seconds"""
+        start_time = time.time()
+        await self.evaluate(prompt="Warm up the evaluator.", seed=0)
+        self.load_state.warmup_latency = time.time() - start_time
+        logger.info(f"PrometheusEvaluator warmed up in {self.load_state.warmup_latency:.2f}s")
+        return self.load_state.warmup_latency
+    
     async def evaluate(
         self,
         prompt: str,
@@ -24,18 +66,93 @@ class PrometheusEvaluator:
         method_type: Optional[str] = None,
         modifiers: Optional[List[str]] = None,
         token_limit: int = 150,
-        criteria: Optional[Dict[str, bool]] = None
-    ):
-        """Evaluate a prompt based on the selected criteria"""
+        criteria: Optional[Dict[str, bool]] = None,
+        seed: Optional[int] = None
+    ) -> EvaluationResult:
+        """Evaluate a prompt based on the selected criteria; a seed makes the result reproducible"""
         logger.info(f"Evaluating prompt with Prometheus: {prompt[:30]}...")
         
+        await self.ensure_loaded()
+        start_time = time.time()
+        
+        result = self._evaluate_one(
+            prompt=prompt,
+            token_count=self.count_tokens([prompt])[0],
+            mentor_type=mentor_type,
+            method_type=method_type,
+            modifiers=modifiers,
+            token_limit=token_limit,
+            seed=seed
+        )
+        
+        # Calculate elapsed time
+        elapsed_time = time.time() - start_time
+        
+        logger.info(f"Evaluation completed in {elapsed_time:.2f}s. Score: {result['score']:.2f}")
+        
+        return result
+    
+    async def evaluate_many(self, requests: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Evaluate a batch of prompts, sharing token counting across the batch.
+        Results come back in request order; a failing item is returned as its
+        Exception so the rest of the batch is unaffected.
+        """
+        logger.info(f"Evaluating batch of {len(requests)} prompts with Prometheus")
+        
+        await self.ensure_loaded()
         start_time = time.time()
         
+        token_counts = self.count_tokens([request["prompt"] for request in requests])
+        
+        results = []
+        for request, token_count in zip(requests, token_counts):
+            try:
+                results.append(self._evaluate_one(
+                    prompt=request["prompt"],
+                    token_count=token_count,
+                    mentor_type=request.get("mentor_type"),
+                    method_type=request.get("method_type"),
+                    modifiers=request.get("modifiers"),
+                    token_limit=request.get("token_limit", 150),
+                    seed=request.get("seed")
+                ))
+            except Exception as e:
+                logger.error(f"Error evaluating batch item: {str(e)}")
+                results.append(e)
+        
+        elapsed_time = time.time() - start_time
+        
+        logger.info(f"Batch evaluation of {len(requests)} prompts completed in {elapsed_time:.2f}s")
+        
+        return results
+    
+    def count_tokens(self, prompts: List[str]) -> List[int]:
+        """Count the tokens of each prompt with the shared BPE tokenizer"""
+        return count_tokens(prompts)
+    
+    def _evaluate_one(
+        self,
+        prompt: str,
+        token_count: int,
+        mentor_type: Optional[str] = None,
+        method_type: Optional[str] = None,
+        modifiers: Optional[List[str]] = None,
+        token_limit: int = 150,
+        seed: Optional[int] = None
+    ) -> EvaluationResult:
+        """Score a single prompt whose token count is already known"""
+        # A per-request generator keeps seeded runs independent of other requests
+        rng = random.Random(seed) if seed is not None else random
+        
         # Check if all required cards are present
         is_complete = all([mentor_type, method_type, modifiers])
         
+        # Look up the selected cards in the shared registry
+        mentor = registry.mentor(mentor_type)
+        method = registry.method(method_type)
+        
         # Check token limit
-        token_count = len(prompt.split())
         is_within_limit = token_count <= token_limit
         
         # Calculate base score
@@ -46,38 +163,21 @@ class PrometheusEvaluator:
             base_score -= (min(token_count - token_limit, token_limit) / token_limit) * 0.5
         
         # Add random variation to make it more realistic
-        score = max(0.0, min(1.0, base_score + random.uniform(-0.1, 0.1)))
-        
-        # Generate feedback
-        mentors_feedback = {
-            "The Archivist": "Consider a more formal structure with clear citations of precedent.",
-            "The Sage": "Deepen your connections across disciplines for more profound insights.",
-            "The Guide": "Provide clearer pathways and examples to lead the reader.",
-            "The Inventor": "Explore more unconventional perspectives and innovative solutions.",
-            "The Storyteller": "Develop a stronger narrative arc to engage the reader."
-        }
-        
-        methods_feedback = {
-            "SCAMPER": "Apply more substitution and combination techniques.",
-            "First Principles": "Break down your reasoning to more fundamental elements.",
-            "Chain-of-Thought": "Make each logical step more explicit in your reasoning.",
-            "SWOT Analysis": "Balance your analysis across all four SWOT quadrants.",
-            "Socratic Method": "Deepen your questioning to stimulate critical thinking."
-        }
+        score = max(0.0, min(1.0, base_score + rng.uniform(-0.1, 0.1)))
         
         # Generate appropriate feedback
         if score > 0.8:
             feedback = "Your prompt shows excellent mastery of the selected constraints."
-            if mentor_type in mentors_feedback:
+            if mentor:
                 feedback += f" The voice of {mentor_type} comes through clearly."
-            if method_type in methods_feedback:
+            if method:
                 feedback += f" Your use of {method_type} is well-executed."
         elif score > 0.5:
             feedback = "Your prompt is satisfactory but could be improved."
-            if mentor_type in mentors_feedback:
-                feedback += f" {mentors_feedback[mentor_type]}"
-            if method_type in methods_feedback:
-                feedback += f" {methods_feedback[method_type]}"
+            if mentor:
+                feedback += f" {mentor.feedback}"
+            if method:
+                feedback += f" {method.feedback}"
         else:
             feedback = "Your prompt needs significant improvement to meet the constraints."
             if not is_complete:
@@ -89,14 +189,14 @@ class PrometheusEvaluator:
         reasoning_elements = []
         
         if mentor_type:
-            mentor_presence = random.uniform(0.4, 1.0)
+            mentor_presence = rng.uniform(0.4, 1.0)
             if mentor_presence > 0.7:
                 reasoning_elements.append(f"The voice of {mentor_type} is evident in your writing style.")
             else:
                 reasoning_elements.append(f"The voice of {mentor_type} could be strengthened.")
         
         if method_type:
-            method_presence = random.uniform(0.4, 1.0)
+            method_presence = rng.uniform(0.4, 1.0)
             if method_presence > 0.7:
                 reasoning_elements.append(f"You've effectively applied the {method_type} approach.")
             else:
@@ -104,7 +204,7 @@ class PrometheusEvaluator:
         
         if modifiers:
             for modifier in modifiers:
-                modifier_presence = random.uniform(0.4, 1.0)
+                modifier_presence = rng.uniform(0.4, 1.0)
                 if modifier_presence > 0.7:
                     reasoning_elements.append(f"You've successfully implemented the '{modifier}' constraint.")
                 else:
@@ -119,16 +219,16 @@ class PrometheusEvaluator:
         words = prompt.split()
         highlighted_tokens = []
         for i in range(min(5, len(words))):
-            if random.random() > 0.7 and len(words[i]) > 3:
+            if rng.random() > 0.7 and len(words[i]) > 3:
                 highlighted_tokens.append(words[i])
         
         # Generate suggestions
         suggestions = []
         if score < 0.9:
-            if mentor_type and random.random() > 0.5:
-                suggestions.append(mentors_feedback[mentor_type] if mentor_type in mentors_feedback else "Consider the mentor's voice more carefully.")
-            if method_type and random.random() > 0.5:
-                suggestions.append(methods_feedback[method_type] if method_type in methods_feedback else "Apply the method more systematically.")
+            if mentor_type and rng.random() > 0.5:
+                suggestions.append(mentor.feedback if mentor else "Consider the mentor's voice more carefully.")
+            if method_type and rng.random() > 0.5:
+                suggestions.append(method.feedback if method else "Apply the method more systematically.")
             if not is_within_limit:
                 suggestions.append("Make your prompt more concise to fit within the token limit.")
         
@@ -141,29 +241,93 @@ class PrometheusEvaluator:
         
         # Create metrics
         metrics = {
-            "clarity": random.uniform(0.5, 1.0),
-            "tone": random.uniform(0.5, 1.0) if mentor_type else random.uniform(0.3, 0.7),
-            "coherence": random.uniform(0.5, 1.0) if method_type else random.uniform(0.3, 0.7),
-            "constraint_adherence": 1.0 if is_within_limit else random.uniform(0.1, 0.5)
+            "clarity": rng.uniform(0.5, 1.0),
+            "tone": rng.uniform(0.5, 1.0) if mentor_type else rng.uniform(0.3, 0.7),
+            "coherence": rng.uniform(0.5, 1.0) if method_type else rng.uniform(0.3, 0.7),
+            "constraint_adherence": 1.0 if is_within_limit else rng.uniform(0.1, 0.5)
         }
         
-        # Calculate elapsed time
-        elapsed_time = time.time() - start_time
-        
-        logger.info(f"Evaluation completed in {elapsed_time:.2f}s. Score: {score:.2f}")
-        
         return {
             "score": score,
             "feedback": feedback,
             "reasoning": reasoning,
             "highlighted_tokens": highlighted_tokens,
             "suggestions": suggestions,
-            "metrics": metrics
+            "metrics": metrics,
+            "tier": "model"
         }
 
 # Initialize the evaluator
 evaluator = PrometheusEvaluator()
 
+# Cache deterministic (seeded) results
+evaluation_cache = ResponseCache(
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("CACHE_TTL_SECONDS", "600")),
+    name="evaluation",
+    shared=shared_store
+)
+
+# Share one in-flight evaluation between identical concurrent requests
+evaluation_flight = SingleFlight("evaluation")
+
+# Forward to the separate prometheus-service when PROMETHEUS_SERVICE_URL is set
+remote = RemoteServiceClient.from_env("prometheus", "PROMETHEUS_SERVICE_URL")
+
+async def _run_evaluation(**request):
+    """Send an evaluation request to the remote service, a worker process, or the local evaluator"""
+    if remote is not None:
+        return await remote.post("/", request)
+    if worker_pool is not None:
+        return await worker_pool.submit("prometheus", "evaluate", **request)
+    return await evaluator.evaluate(**request)
+
+async def _run_evaluation_batch(requests: List[Dict[str, Any]]) -> List[Any]:
+    """Send a batch to the remote service, a worker process, or the local evaluator; item errors come back as Exceptions"""
+    if remote is None:
+        if worker_pool is not None:
+            return await worker_pool.submit("prometheus", "evaluate_many", requests=requests)
+        return await evaluator.evaluate_many(requests)
+    
+    response = await remote.post("/batch", {"items": requests, "no_cache": True})
+    return [
+        item["result"] if item.get("error") is None else Exception(item["error"])
+        for item in response["results"]
+    ]
+
+async def _evaluate_once(key: str, work) -> Tuple[EvaluationResult, bool]:
+    """
+    Run work() through evaluation_flight when it waits on another process. The
+    in-process evaluator finishes within one loop step, so nothing could join
+    it in flight and a task per call would only add a scheduling hop.
+    """
+    if remote is None and worker_pool is None:
+        return await work(), False
+    return await evaluation_flight.do(key, work)
+
+def _normalized_request(
+    prompt: str,
+    target_output: Optional[str] = None,
+    mentor_type: Optional[str] = None,
+    method_type: Optional[str] = None,
+    modifiers: Optional[List[str]] = None,
+    token_limit: int = 150,
+    criteria: Optional[Dict[str, bool]] = None,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """Normalize an evaluation request into the form used for its cache key"""
+    return {
+        "prompt": normalize_prompt(prompt),
+        "target_output": target_output,
+        "mentor_type": mentor_type,
+        "method_type": method_type,
+        "modifiers": normalize_modifiers(modifiers),
+        "token_limit": token_limit,
+        "criteria": criteria,
+        "seed": seed
+    }
+
 async def evaluate_prompt(
     prompt: str,
     target_output: Optional[str] = None,
@@ -171,15 +335,144 @@ async def evaluate_prompt(
     method_type: Optional[str] = None,
     modifiers: Optional[List[str]] = None,
     token_limit: int = 150,
-    criteria: Optional[Dict[str, bool]] = None
-):
-    """Wrapper function to evaluate a prompt using the Prometheus model"""
-    return await evaluator.evaluate(
+    criteria: Optional[Dict[str, bool]] = None,
+    seed: Optional[int] = None,
+    use_cache: bool = True,
+    output: Optional[str] = None
+) -> EvaluationResult:
+    """
+    Wrapper function to evaluate a prompt using the Prometheus model.
+    Clear passes and failures are answered by the heuristic tier of the cascade.
+    Only seeded requests are deterministic, so only those are cached. Identical
+    concurrent requests, seeded or not, share one in-flight evaluation when it
+    runs out of process.
+    When the generated output is given, its similarity to target_output is
+    added to the metrics after any of these tiers, so it never reaches the cache.
+    """
+    start_time = time.perf_counter()
+    heuristic = cascade.answer(
+        prompt=prompt,
+        token_count=count_tokens([prompt])[0],
+        mentor_type=mentor_type,
+        method_type=method_type,
+        modifiers=modifiers,
+        token_limit=token_limit
+    )
+    if heuristic is not None:
+        record_evaluation(heuristic, "heuristic", time.perf_counter() - start_time)
+        return with_target_similarity(heuristic, output, target_output)
+    
+    if seed is None:
+        evaluation_cache.bypass()
+        request = {
+            "prompt": prompt,
+            "target_output": target_output,
+            "mentor_type": mentor_type,
+            "method_type": method_type,
+            "modifiers": modifiers,
+            "token_limit": token_limit,
+            "criteria": criteria,
+            "seed": seed
+        }
+        result, shared = await _evaluate_once(
+            canonical_key("evaluate-unseeded", **request),
+            lambda: _run_evaluation(**request)
+        )
+        record_evaluation(result, "coalesced" if shared else "model", time.perf_counter() - start_time)
+        return with_target_similarity(dict(result) if shared else result, output, target_output)
+    
+    request = _normalized_request(
         prompt=prompt,
         target_output=target_output,
         mentor_type=mentor_type,
         method_type=method_type,
         modifiers=modifiers,
         token_limit=token_limit,
-        criteria=criteria
-    ) 
\ No newline at end of file
+        criteria=criteria,
+        seed=seed
+    )
+    key = canonical_key("evaluate", **request)
+    
+    if use_cache:
+        cached = evaluation_cache.get(key)
+        if cached is not None:
+            record_evaluation(cached, "cache", time.perf_counter() - start_time)
+            return with_target_similarity(cached, output, target_output)
+    else:
+        evaluation_cache.bypass()
+    
+    async def evaluate_and_cache():
+        result = await _run_evaluation(**request)
+        evaluation_cache.set(key, result)
+        return result
+    
+    result, shared = await _evaluate_once(key, evaluate_and_cache)
+    record_evaluation(result, "coalesced" if shared else "model", time.perf_counter() - start_time)
+    return with_target_similarity(dict(result) if shared else result, output, target_output)
+
+async def evaluate_prompts(
+    requests: List[Dict[str, Any]],
+    use_cache: bool = True,
+    outputs: Optional[List[Optional[str]]] = None
+) -> List[Any]:
+    """
+    Wrapper function to evaluate a batch of prompts, serving clear cases from the heuristic tier and seeded items from the cache.
+    outputs, when given, holds each item's generated output; items with a target_output get their
+    similarity scores from one vectorized pass over the batch.
+    """
+    start_time = time.perf_counter()
+    results: List[Any] = [None] * len(requests)
+    pending = []
+    token_counts = count_tokens([request["prompt"] for request in requests])
+    
+    for index, request in enumerate(requests):
+        heuristic = cascade.answer(
+            prompt=request["prompt"],
+            token_count=token_counts[index],
+            mentor_type=request.get("mentor_type"),
+            method_type=request.get("method_type"),
+            modifiers=request.get("modifiers"),
+            token_limit=request.get("token_limit", 150)
+        )
+        if heuristic is not None:
+            results[index] = heuristic
+            record_evaluation(heuristic, "heuristic", time.perf_counter() - start_time)
+            continue
+        
+        if not use_cache or request.get("seed") is None:
+            evaluation_cache.bypass()
+            pending.append((index, None, request))
+            continue
+        
+        normalized = _normalized_request(**request)
+        key = canonical_key("evaluate", **normalized)
+        cached = evaluation_cache.get(key)
+        if cached is not None:
+            results[index] = cached
+            record_evaluation(cached, "cache", time.perf_counter() - start_time)
+        else:
+            pending.append((index, key, normalized))
+    
+    if pending:
+        outcomes = await _run_evaluation_batch([request for _, _, request in pending])
+        elapsed_time = time.perf_counter() - start_time
+        for (index, key, _), outcome in zip(pending, outcomes):
+            results[index] = outcome
+            record_evaluation(outcome, "model", elapsed_time)
+            if key is not None and not isinstance(outcome, Exception):
+                evaluation_cache.set(key, outcome)
+    
+    if outputs:
+        compared = [
+            index for index, result in enumerate(results)
+            if outputs[index] and requests[index].get("target_output") and not isinstance(result, Exception)
+        ]
+        if compared:
+            similarities = similarity_index.score_pairs(
+                [outputs[index] for index in compared],
+                [requests[index]["target_output"] for index in compared]
+            )
+            for index, similarity in zip(compared, similarities):
+                results[index] = with_similarity(results[index], similarity)
+    
+    return results
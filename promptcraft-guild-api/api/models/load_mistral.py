@@ -2,28 +2,85 @@ import logging
 import time
 import random
 import asyncio
-from typing import Dict, List, Optional, Any
+import os
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Any
+from .batching import MicroBatcher
+from .tokenizer import tokenizer
+from .cards import registry
+from .errors import ServiceUnavailable
+from .remote import RemoteServiceClient
+from .workers import worker_pool
+from .loading import ModelLoadState, map_weights
+from .metrics import record_generation
+from .singleflight import SingleFlight
+from .shared_cache import shared_store
+from .cache import ResponseCache, bucket_temperature, canonical_key, normalize_modifiers, normalize_prompt
+from .results import GenerationResult
 
 logger = logging.getLogger(__name__)
 
+# Body sentences for the mock response, sampled according to temperature
+RESPONSE_SENTENCES = (
+    "This approach allows us to see beyond the obvious implications.",
+    "By examining the underlying patterns, we can derive meaningful insights.",
+    "The interconnected nature of these elements reveals a cohesive framework.",
+    "When we consider the broader context, new possibilities emerge.",
+    "A careful analysis shows multiple dimensions worth exploring.",
+    "The evidence suggests a nuanced interpretation is necessary.",
+    "Looking at historical precedents helps illuminate current challenges.",
+    "By reframing the question, we discover alternative solutions.",
+    "The intersection of these ideas creates a fertile ground for innovation.",
+    "A balanced perspective requires acknowledging competing viewpoints."
+)
+
+RESPONSE_CONCLUSION = "In conclusion, this approach offers valuable insights while acknowledging the complexity of the subject."
+
 class MistralGenerator:
     """
     Mock implementation of the Mistral 7B generator.
     In a production environment, this would be replaced with the actual model integration.
     """
     def __init__(self):
-        logger.info("Initializing MistralGenerator")
         self.model_name = "mistral-7b-instruct-mock"
-        self.is_initialized = True
+        self.weights_path = os.getenv("MISTRAL_WEIGHTS_PATH")
+        self.weights = None
+        # Construction is cheap; weights load in load(), from the app lifespan or on first use
+        self.load_state = ModelLoadState("mistral")
+    
+    @property
+    def is_initialized(self) -> bool:
+        return self.load_state.status == "ready"
+    
+    def load(self):
+        """Load the model weights; safe to call repeatedly and from several threads"""
+        self.load_state.run(self._load_weights)
+    
+    def _load_weights(self):
+        logger.info("Initializing MistralGenerator")
+        if self.weights_path:
+            self.weights = map_weights(self.weights_path)
         
         # For a real implementation, we'd load the Mistral model here
-        # Example with transformers:
+        # Example with transformers, reading the memory-mapped safetensors in place:
         # from transformers import AutoModelForCausalLM, AutoTokenizer
         # self.tokenizer = AutoTokenizer.from_pretrained("mistralai/Mistral-7B-Instruct-v0.1")
-        # self.model = AutoModelForCausalLM.from_pretrained("mistralai/Mistral-7B-Instruct-v0.1")
+        # self.model = AutoModelForCausalLM.from_pretrained("mistralai/Mistral-7B-Instruct-v0.1", low_cpu_mem_usage=True)
         
         logger.info(f"MistralGenerator initialized, model: {self.model_name}")
     
+    async def ensure_loaded(self):
+        """Load the model off the event loop if the lifespan hook has not already"""
+        if not self.is_initialized:
+            await asyncio.to_thread(self.load)
+    
+    async def warmup(self) -> float:
+        """Run one short generation so the first real request avoids cold-start costs; returns seconds"""
+        start_time = time.time()
+        await self.generate(prompt="Warm up the generator.", max_tokens=16, seed=0)
+        self.load_state.warmup_latency = time.time() - start_time
+        logger.info(f"MistralGenerator warmed up in {self.load_state.warmup_latency:.2f}s")
+        return self.load_state.warmup_latency
+    
     async def generate(
         self,
         prompt: str,
@@ -31,125 +88,245 @@ class MistralGenerator:
         max_tokens: int = 256,
         mentor_type: Optional[str] = None,
         method_type: Optional[str] = None,
-        modifiers: Optional[List[str]] = None
-    ):
-        """Generate a response based on the prompt and parameters"""
+        modifiers: Optional[List[str]] = None,
+        seed: Optional[int] = None
+    ) -> GenerationResult:
+        """Generate a response based on the prompt and parameters; a seed makes the output reproducible"""
         logger.info(f"Generating with Mistral: {prompt[:30]}...")
         
         start_time = time.time()
         
-        # Get mentor tone
-        mentor_tones = {
-            "The Archivist": "formal and detached, with historical references",
-            "The Sage": "contemplative and wise, with cross-disciplinary insights",
-            "The Guide": "supportive and instructive, with clear examples",
-            "The Inventor": "creative and unconventional, with innovative perspectives",
-            "The Storyteller": "narrative and engaging, with compelling analogies"
-        }
+        # Collect the streamed tokens; the stream stops at max_tokens itself
+        tokens = []
+        async for token in self.generate_stream(
+            prompt=prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            mentor_type=mentor_type,
+            method_type=method_type,
+            modifiers=modifiers,
+            seed=seed
+        ):
+            tokens.append(token)
         
-        # Get method structure
-        method_structures = {
-            "SCAMPER": "using substitution, combination, adaptation, modification, repurposing, elimination, and reversal",
-            "First Principles": "breaking down concepts to fundamental truths and building up from there",
-            "Chain-of-Thought": "reasoning step by step through logical connections",
-            "SWOT Analysis": "evaluating strengths, weaknesses, opportunities, and threats",
-            "Socratic Method": "examining through progressive questioning to stimulate critical thinking"
-        }
+        token_count = len(tokens)
         
-        # Get modifier effects
-        modifier_effects = {
-            "Token Limit": "being concise and direct",
-            "Use Metaphor": "incorporating extended metaphors",
-            "Concrete Examples": "providing specific examples",
-            "Data Driven": "including numerical data and statistics",
-            "Opposing Views": "presenting multiple perspectives"
+        # Calculate elapsed time
+        elapsed_time = time.time() - start_time
+        
+        logger.info(f"Generation completed in {elapsed_time:.2f}s. Generated {token_count} tokens.")
+        
+        return {
+            "output": "".join(tokens),
+            "token_count": token_count,
+            "generation_time": elapsed_time,
+            "model_used": self.model_name
         }
+    
+    async def generate_batch(self, requests: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Generate responses for a batch of requests.
+        With a real model the prompts would be padded into a single forward pass;
+        the mock runs them together and returns per-request errors in place.
+        """
+        logger.info(f"Generating batch of {len(requests)} with Mistral")
         
+        return await asyncio.gather(
+            *(self.generate(**request) for request in requests),
+            return_exceptions=True
+        )
+    
+    async def generate_stream(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 256,
+        mentor_type: Optional[str] = None,
+        method_type: Optional[str] = None,
+        modifiers: Optional[List[str]] = None,
+        seed: Optional[int] = None
+    ) -> AsyncIterator[str]:
+        """Yield the response token by token, stopping once max_tokens have been produced"""
+        await self.ensure_loaded()
+        if max_tokens <= 0:
+            return
+        
+        # A per-request generator keeps seeded runs independent of other requests
+        rng = random.Random(seed) if seed is not None else random
+        
+        token_count = 0
+        for part in self._response_parts(prompt, temperature, mentor_type, method_type, modifiers, rng):
+            text = " ".join(part.split())
+            if not text:
+                continue
+            # Parts after the first carry their leading separator
+            if token_count:
+                text = f" {text}"
+            for piece in tokenizer.tokenize(text):
+                yield piece
+                token_count += 1
+                if token_count >= max_tokens:
+                    return
+    
+    def _response_parts(
+        self,
+        prompt: str,
+        temperature: float,
+        mentor_type: Optional[str],
+        method_type: Optional[str],
+        modifiers: Optional[List[str]],
+        rng: Any = random
+    ) -> Iterator[str]:
+        """Lazily produce the sections of the mock response in output order"""
         # In a real implementation, we'd format the prompt for Mistral and generate a response
         # For now, create a mock response based on parameters
         
-        # Craft a response intro based on mentor type
-        if mentor_type and mentor_type in mentor_tones:
-            response_intro = f"As {mentor_type}, I'll approach this {mentor_tones[mentor_type]}. "
-        else:
-            response_intro = "Here's a thoughtful response to your query. "
-        
-        # Add method approach
-        if method_type and method_type in method_structures:
-            method_intro = f"I'll analyze this by {method_structures[method_type]}. "
-        else:
-            method_intro = "Let's explore this topic systematically. "
+        # Card text for this combination comes pre-assembled from the registry
+        preamble = registry.preamble(mentor_type, method_type, modifiers)
+        yield preamble.mentor_intro
+        yield preamble.method_intro
         
         # Craft content based on the prompt
         key_terms = [word for word in prompt.split() if len(word) > 4][:5]
         content = f"Regarding {', '.join(key_terms) if key_terms else 'this topic'}, "
+        yield content
         
         # Add modifier-specific content
-        modifier_content = ""
-        if modifiers:
-            for modifier in modifiers:
-                if modifier in modifier_effects:
-                    modifier_content += f"I'll address this by {modifier_effects[modifier]}. "
-        
-        # Add a more sophisticated response based on the prompt
-        sentences = [
-            "This approach allows us to see beyond the obvious implications.",
-            "By examining the underlying patterns, we can derive meaningful insights.",
-            "The interconnected nature of these elements reveals a cohesive framework.",
-            "When we consider the broader context, new possibilities emerge.",
-            "A careful analysis shows multiple dimensions worth exploring.",
-            "The evidence suggests a nuanced interpretation is necessary.",
-            "Looking at historical precedents helps illuminate current challenges.",
-            "By reframing the question, we discover alternative solutions.",
-            "The intersection of these ideas creates a fertile ground for innovation.",
-            "A balanced perspective requires acknowledging competing viewpoints."
-        ]
+        yield from preamble.modifier_fragments
         
         # Select random sentences based on temperature
         num_sentences = max(3, int(10 * temperature))
-        selected_sentences = random.sample(sentences, min(num_sentences, len(sentences)))
+        selected_sentences = rng.sample(RESPONSE_SENTENCES, min(num_sentences, len(RESPONSE_SENTENCES)))
         
-        main_content = " ".join(selected_sentences)
+        for sentence in selected_sentences:
+            yield sentence
         
         # Create a conclusion
-        conclusion = "In conclusion, this approach offers valuable insights while acknowledging the complexity of the subject."
-        
-        # Combine all parts
-        full_response = f"{response_intro}{method_intro}{content}{modifier_content}{main_content} {conclusion}"
-        
-        # Simulate token generation by limiting the response length
-        token_count = min(len(full_response.split()), max_tokens)
-        truncated_response = " ".join(full_response.split()[:token_count])
-        
-        # Calculate elapsed time
-        elapsed_time = time.time() - start_time
-        
-        logger.info(f"Generation completed in {elapsed_time:.2f}s. Generated {token_count} tokens.")
-        
-        return {
-            "output": truncated_response,
-            "token_count": token_count,
-            "generation_time": elapsed_time,
-            "model_used": self.model_name
-        }
+        yield RESPONSE_CONCLUSION
 
 # Initialize the generator
 generator = MistralGenerator()
 
+async def _run_batch(requests: List[Dict[str, Any]]) -> List[Any]:
+    """Run a batch in an inference worker process if a pool is configured, otherwise in-process"""
+    if worker_pool is not None:
+        return await worker_pool.submit("mistral", "generate_batch", requests=requests)
+    return await generator.generate_batch(requests)
+
+# Batch concurrent requests in front of the generator
+batcher = MicroBatcher(
+    _run_batch,
+    max_batch_size=int(os.getenv("MISTRAL_MAX_BATCH_SIZE", "8")),
+    max_wait_ms=float(os.getenv("MISTRAL_BATCH_WAIT_MS", "5")),
+    name="mistral"
+)
+
+# Cache deterministic (seeded) results
+generation_cache = ResponseCache(
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("CACHE_TTL_SECONDS", "600")),
+    name="generation",
+    shared=shared_store
+)
+
+class StreamingUnsupported(ServiceUnavailable):
+    """Raised when a stream is requested but generation runs on a remote service without a streaming endpoint"""
+    status_code = 501
+
+# Share one in-flight generation between identical concurrent seeded requests
+generation_flight = SingleFlight("generation")
+
+# Forward to the separate mistral-service when MISTRAL_SERVICE_URL is set
+remote = RemoteServiceClient.from_env("mistral", "MISTRAL_SERVICE_URL")
+
+async def _run_generation(**request):
+    """Send a generation request to the remote service if configured, otherwise to the local batcher"""
+    if remote is not None:
+        return await remote.post("/", request)
+    return await batcher.submit(**request)
+
 async def generate_response(
     prompt: str,
     temperature: float = 0.7,
     max_tokens: int = 256,
     mentor_type: Optional[str] = None,
     method_type: Optional[str] = None,
-    modifiers: Optional[List[str]] = None
-):
-    """Wrapper function to generate a response using the Mistral model"""
-    return await generator.generate(
+    modifiers: Optional[List[str]] = None,
+    seed: Optional[int] = None,
+    use_cache: bool = True
+) -> GenerationResult:
+    """
+    Wrapper function to generate a response using the Mistral model.
+    Only seeded requests are deterministic, so only those are cached and only
+    those share an identical in-flight generation; their temperature and
+    modifier order are normalized to match the cache key.
+    """
+    start_time = time.perf_counter()
+    if seed is None:
+        generation_cache.bypass()
+        result = await _run_generation(
+            prompt=prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            mentor_type=mentor_type,
+            method_type=method_type,
+            modifiers=modifiers,
+            seed=seed
+        )
+        record_generation(result, "model", time.perf_counter() - start_time)
+        return result
+    
+    request = {
+        "prompt": normalize_prompt(prompt),
+        "temperature": bucket_temperature(temperature),
+        "max_tokens": max_tokens,
+        "mentor_type": mentor_type,
+        "method_type": method_type,
+        "modifiers": normalize_modifiers(modifiers),
+        "seed": seed
+    }
+    key = canonical_key("generate", **request)
+    
+    if use_cache:
+        cached = generation_cache.get(key)
+        if cached is not None:
+            record_generation(cached, "cache", time.perf_counter() - start_time)
+            return cached
+    else:
+        generation_cache.bypass()
+    
+    async def generate_and_cache():
+        result = await _run_generation(**request)
+        generation_cache.set(key, result)
+        return result
+    
+    result, shared = await generation_flight.do(key, generate_and_cache)
+    record_generation(result, "coalesced" if shared else "model", time.perf_counter() - start_time)
+    return dict(result) if shared else result
+
+def stream_response(
+    prompt: str,
+    temperature: float = 0.7,
+    max_tokens: int = 256,
+    mentor_type: Optional[str] = None,
+    method_type: Optional[str] = None,
+    modifiers: Optional[List[str]] = None,
+    seed: Optional[int] = None
+) -> AsyncIterator[str]:
+    """
+    Wrapper function to stream a response token by token using the Mistral model.
+    The remote mistral-service has no streaming endpoint, so with one configured
+    this raises StreamingUnsupported rather than loading the model in-process.
+    """
+    if remote is not None:
+        raise StreamingUnsupported("Streaming is not available while generation runs on a remote mistral service")
+    return generator.generate_stream(
         prompt=prompt,
         temperature=temperature,
         max_tokens=max_tokens,
         mentor_type=mentor_type,
         method_type=method_type,
-        modifiers=modifiers
-    ) 
\ No newline at end of file
+        modifiers=modifiers,
+        seed=seed
+    )
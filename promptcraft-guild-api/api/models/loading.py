@@ -0,0 +1,76 @@
+import logging
+import os
+import time
+import mmap
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from .errors import ServiceUnavailable
+
+logger = logging.getLogger(__name__)
+
+class ModelNotReady(ServiceUnavailable):
+    """Raised when a model failed to load"""
+
+class ModelLoadState:
+    """
+    Tracks one model's load lifecycle: pending -> loading -> ready (or failed),
+    or remote when another service hosts the model. Loading runs at most once
+    even when several threads ask for it at the same time.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.load_time: Optional[float] = None
+        self.warmup_latency: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status in ("ready", "remote")
+
+    def run(self, load: Callable[[], None]):
+        """Call load() unless the model is already loaded, recording timing and errors"""
+        with self._lock:
+            if self.status == "ready":
+                return
+
+            logger.info(f"Loading {self.name}")
+            self.status = "loading"
+            start_time = time.time()
+            try:
+                load()
+            except Exception as e:
+                self.status = "failed"
+                self.error = str(e)
+                logger.error(f"Failed to load {self.name}: {str(e)}")
+                raise ModelNotReady(f"{self.name} failed to load: {str(e)}", retry_after=30.0)
+
+            self.load_time = time.time() - start_time
+            self.status = "ready"
+            self.error = None
+            logger.info(f"{self.name} loaded in {self.load_time:.2f}s")
+
+    def mark_remote(self):
+        """Record that the model is served by a remote service"""
+        self.status = "remote"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "load_time": self.load_time,
+            "warmup_latency": self.warmup_latency,
+            "error": self.error
+        }
+
+def map_weights(path: str) -> mmap.mmap:
+    """
+    Memory-map a weights file read-only. Pages are faulted in on first touch and
+    shared between processes mapping the same file, so loading is near-instant and
+    extra workers do not duplicate the weights in memory.
+    """
+    with open(path, "rb") as weights_file:
+        size = os.fstat(weights_file.fileno()).st_size
+        logger.info(f"Memory-mapping {size / (1024 * 1024):.1f}MB of weights from {path}")
+        return mmap.mmap(weights_file.fileno(), 0, access=mmap.ACCESS_READ)
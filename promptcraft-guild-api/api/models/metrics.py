@@ -0,0 +1,230 @@
+import logging
+import math
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans a cached lookup through a slow generation
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKENS_PER_SECOND_BUCKETS = (5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0, 10000.0)
+SCORE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+# One collected sample: (suffix, labels, value)
+Sample = Tuple[str, Dict[str, str], float]
+# A family produced by a collector at scrape time: (name, type, help, samples)
+MetricFamily = Tuple[str, str, str, List[Sample]]
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    """Base for metrics keyed by a tuple of label values"""
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, values: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    def samples(self) -> List[Sample]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """A monotonically increasing value per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[Sample]:
+        return [("_total", self._labels(labels), value) for labels, value in list(self._values.items())]
+
+class Gauge(_Metric):
+    """A value that can go up and down per label set"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def samples(self) -> List[Sample]:
+        return [("", self._labels(labels), value) for labels, value in list(self._values.items())]
+
+class Histogram(_Metric):
+    """
+    Fixed-bucket histogram per label set. Observations land in a single bucket;
+    the cumulative counts the exposition format expects are built at scrape time.
+    """
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        for labels, (counts, total, count) in list(self._series.items()):
+            base = self._labels(labels)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", {**base, "le": _format_value(bound)}, cumulative))
+            samples.append(("_sum", base, total))
+            samples.append(("_count", base, count))
+        return samples
+
+class MetricsRegistry:
+    """
+    Holds the process's metrics and renders them in the Prometheus text format.
+    Updates are plain dict and float operations with no locking: every recording
+    site runs on the event loop thread, so there is nothing to contend on.
+    Collectors are called at scrape time for values other components already track.
+    """
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, collect: Callable[[], Iterable[MetricFamily]]):
+        """Add a callable that yields (name, type, help, samples) families at scrape time"""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        """Render every metric in the text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            self._render_family(lines, metric.name, metric.kind, metric.help, metric.samples())
+        for collect in self._collectors:
+            try:
+                for name, kind, help, samples in collect():
+                    self._render_family(lines, name, kind, help, samples)
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {str(e)}")
+        lines.append("")
+        return "\n".join(lines)
+
+    def _add(self, metric: _Metric) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    @staticmethod
+    def _render_family(lines: List[str], name: str, kind: str, help: str, samples: List[Sample]):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+
+# Initialize the shared registry
+metrics = MetricsRegistry()
+
+http_requests = metrics.counter(
+    "promptcraft_http_requests", "HTTP requests by method, route and status", ("method", "route", "status")
+)
+http_request_duration = metrics.histogram(
+    "promptcraft_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+http_requests_in_flight = metrics.gauge(
+    "promptcraft_http_requests_in_flight", "HTTP requests currently being served"
+)
+
+generation_requests = metrics.counter(
+    "promptcraft_generation_requests", "Generation requests by where the result came from", ("source",)
+)
+generation_tokens = metrics.counter(
+    "promptcraft_generation_tokens", "Tokens generated by the model (cache hits excluded)", ("source",)
+)
+generation_duration = metrics.histogram(
+    "promptcraft_generation_duration_seconds", "Generation latency including queueing", ("source",)
+)
+generation_tokens_per_second = metrics.histogram(
+    "promptcraft_generation_tokens_per_second", "Per-request decode throughput", ("source",),
+    buckets=TOKENS_PER_SECOND_BUCKETS
+)
+
+evaluation_requests = metrics.counter(
+    "promptcraft_evaluation_requests", "Evaluation requests by where the result came from", ("source",)
+)
+evaluation_duration = metrics.histogram(
+    "promptcraft_evaluation_duration_seconds", "Evaluation latency including queueing", ("source",)
+)
+evaluation_score = metrics.histogram(
+    "promptcraft_evaluation_score", "Distribution of evaluation scores", buckets=SCORE_BUCKETS
+)
+
+def record_generation(result: Optional[Dict[str, Any]], source: str, elapsed: float):
+    """Record one generation; source is "cache", "coalesced", "model" or "stream"."""
+    generation_requests.inc(source)
+    generation_duration.observe(elapsed, source)
+    if source in ("cache", "coalesced") or not result:
+        return
+    token_count = result.get("token_count") or 0
+    generation_time = result.get("generation_time") or elapsed
+    generation_tokens.inc(source, amount=token_count)
+    if token_count and generation_time > 0:
+        generation_tokens_per_second.observe(token_count / generation_time, source)
+
+def record_evaluation(result: Any, source: str, elapsed: float):
+    """Record one evaluation; source is "cache", "coalesced", "heuristic" or "model"."""
+    evaluation_requests.inc(source)
+    evaluation_duration.observe(elapsed, source)
+    if isinstance(result, dict) and result.get("score") is not None:
+        evaluation_score.observe(result["score"])
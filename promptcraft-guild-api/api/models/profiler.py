@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Frames kept per stack, innermost first; deeper stacks are cut at the root end
+MAX_DEPTH = 128
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another is still running"""
+
+@lru_cache(maxsize=4096)
+def _short_path(path: str) -> str:
+    """Path relative to the longest sys.path entry containing it, so frames read as module paths"""
+    for prefix in sorted((entry for entry in sys.path if entry), key=len, reverse=True):
+        if path.startswith(prefix.rstrip(os.sep) + os.sep):
+            return path[len(prefix.rstrip(os.sep)) + 1:]
+    return path
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({_short_path(code.co_filename)}:{frame.f_lineno})"
+
+def thread_stack(frame) -> List[str]:
+    """Labels from the thread's root frame down to the one running"""
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+def await_stack(task: asyncio.Task) -> List[str]:
+    """Labels from a suspended task's coroutine down the await chain to what it is waiting on"""
+    labels = []
+    awaitable = task.get_coro()
+    while awaitable is not None and len(labels) < MAX_DEPTH:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None) or getattr(awaitable, "ag_frame", None)
+        if frame is None:
+            # A future or other awaitable without a frame: the end of the chain
+            if labels:
+                labels.append(f"<{type(awaitable).__name__}>")
+            break
+        labels.append(_label(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None) or getattr(awaitable, "ag_await", None)
+    return labels
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the running process. A background thread wakes
+    every `interval` seconds and records the stack of every other thread
+    (sys._current_frames) and, given the event loop, the await chain of every
+    task suspended on it, so time spent waiting (on the scheduler, a worker
+    process, a remote service) shows up next to time spent running. Stacks
+    are counted as collapsed stacks, one "root;...;leaf count" line each,
+    ready for flamegraph.pl or speedscope. Nothing runs between profiles.
+    """
+    def __init__(self, interval: float = 0.01, max_seconds: float = 60.0):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self.profiles = 0
+        self.samples = 0
+        self.last_overhead = 0.0
+
+    @classmethod
+    def from_env(cls) -> "SamplingProfiler":
+        return cls(
+            interval=float(os.getenv("PROFILE_INTERVAL_MS", "10")) / 1000.0,
+            max_seconds=float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+        )
+
+    def profile(
+        self,
+        seconds: float,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        include_tasks: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Sample for `seconds` (capped at max_seconds), blocking the calling
+        thread; run it off the event loop. Returns the collapsed stacks,
+        most frequent first, with the sample count and the fraction of the
+        wall time spent sampling.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            return self._sample(min(seconds, self.max_seconds), loop, include_tasks)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, loop: Optional[asyncio.AbstractEventLoop], include_tasks: bool) -> Dict[str, Any]:
+        own_ident = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        sampling_time = 0.0
+        start_time = time.perf_counter()
+        deadline = start_time + seconds
+        next_sample = start_time
+
+        while next_sample < deadline:
+            sample_start = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+                stacks[";".join([f"thread:{names.get(ident, ident)}", *thread_stack(frame)])] += 1
+            # Let go of the sampled frames so they are not kept alive until the next tick
+            frames = frame = None
+            if include_tasks and loop is not None and not loop.is_closed():
+                running = asyncio.current_task(loop)
+                for task in asyncio.all_tasks(loop):
+                    # The running task is already on the loop thread's stack
+                    if task is running:
+                        continue
+                    chain = await_stack(task)
+                    if chain:
+                        stacks[";".join(["tasks", *chain])] += 1
+            samples += 1
+            sampling_time += time.perf_counter() - sample_start
+
+            next_sample += self.interval
+            delay = next_sample - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind (a busy GIL); carry on from now instead of catching up on the missed ticks
+                next_sample = time.perf_counter()
+
+        elapsed_time = time.perf_counter() - start_time
+        self.profiles += 1
+        self.samples += samples
+        self.last_overhead = sampling_time / elapsed_time if elapsed_time else 0.0
+        logger.info(f"Profiled {samples} samples over {elapsed_time:.1f}s ({self.last_overhead:.2%} spent sampling)")
+        return {
+            "collapsed": "".join(f"{stack} {count}\n" for stack, count in stacks.most_common()),
+            "samples": samples,
+            "seconds": elapsed_time,
+            "overhead": self.last_overhead
+        }
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "busy": self.busy,
+            "interval_ms": self.interval * 1000.0,
+            "max_seconds": self.max_seconds,
+            "profiles": self.profiles,
+            "samples": self.samples,
+            "last_overhead": self.last_overhead
+        }
+
+profiler = SamplingProfiler.from_env()
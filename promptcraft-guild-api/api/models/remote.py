@@ -0,0 +1,274 @@
+import logging
+import os
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .errors import ServiceUnavailable
+
+logger = logging.getLogger(__name__)
+
+class RemoteServiceUnavailable(ServiceUnavailable):
+    """Raised when no replica of a remote service can take the request"""
+
+class RemoteServiceError(Exception):
+    """Raised when a remote service rejects the request itself (4xx)"""
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+class CircuitBreaker:
+    """
+    Stops sending traffic to a replica after consecutive failures.
+    After reset_timeout one trial request is let through (half-open); its
+    outcome closes the breaker again or re-opens it.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def available(self) -> bool:
+        """Whether allow() would let a request through now, without claiming the trial"""
+        state = self.state
+        return state == "closed" or (state == "half-open" and not self.trial_in_flight)
+
+    def allow(self) -> bool:
+        """Return whether a request may be sent now; in half-open state this claims the one trial"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will let a trial request through"""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def release_trial(self):
+        """Give up a trial that ended without a verdict on the replica, so another can be sent"""
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+class RemoteServiceClient:
+    """
+    Calls a model service over HTTP through one long-lived pooled client.
+    Transport errors and 5xx responses are retried with backoff up to `retries`
+    times. Each replica has its own circuit breaker. With several replicas and a
+    hedge delay, a second replica is tried if the first has not answered in time,
+    and the first response wins. A replica's breaker is consulted only when a
+    request is actually sent to it; a request that is cancelled (a hedge that
+    lost, a caller that went away) or shed with a 503 counts as neither success
+    nor failure.
+    """
+    def __init__(
+        self,
+        name: str,
+        base_urls: List[str],
+        timeout: float = 30.0,
+        retries: int = 2,
+        hedge_delay_ms: float = 0.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0
+    ):
+        self.name = name
+        self.base_urls = [url.rstrip("/") for url in base_urls]
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.hedge_delay = max(0.0, hedge_delay_ms) / 1000.0
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self.breakers = {url: CircuitBreaker(failure_threshold, reset_timeout) for url in self.base_urls}
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._next_replica = 0
+
+        self.requests = 0
+        self.retried = 0
+        self.hedged = 0
+        self.failures = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls, name: str, url_variable: str) -> Optional["RemoteServiceClient"]:
+        """Build a client from a comma-separated replica list, or None when it is unset"""
+        urls = [url.strip() for url in os.getenv(url_variable, "").split(",") if url.strip()]
+        if not urls:
+            return None
+
+        logger.info(f"Using remote {name} service at {', '.join(urls)}")
+        return cls(
+            name=name,
+            base_urls=urls,
+            timeout=float(os.getenv("REMOTE_TIMEOUT_SECONDS", "30")),
+            retries=int(os.getenv("REMOTE_RETRIES", "2")),
+            hedge_delay_ms=float(os.getenv("REMOTE_HEDGE_DELAY_MS", "0")),
+            max_connections=int(os.getenv("REMOTE_MAX_CONNECTIONS", "100"))
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled client for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self._client
+
+    async def post(self, path: str, payload: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """POST JSON to the service and return the decoded response"""
+        self.requests += 1
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.retried += 1
+                await asyncio.sleep(min(0.05 * (2 ** (attempt - 1)), 1.0))
+
+            replicas = self._pick_replicas()
+            if not replicas:
+                self.rejected += 1
+                retry_after = min(self.breakers[url].retry_after() for url in self.base_urls)
+                raise RemoteServiceUnavailable(f"All {self.name} replicas are unavailable", retry_after=max(retry_after, 1.0))
+
+            try:
+                return await self._hedged_post(replicas, path, payload, timeout)
+            except RemoteServiceError:
+                raise
+            except Exception as e:
+                last_error = e
+                logger.warning(f"{self.name} request to {path} failed (attempt {attempt + 1}): {str(e)}")
+
+        self.failures += 1
+        raise RemoteServiceUnavailable(f"{self.name} service failed after {self.retries + 1} attempts: {str(last_error)}")
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "replicas": {url: breaker.state for url, breaker in self.breakers.items()},
+            "requests": self.requests,
+            "retried": self.retried,
+            "hedged": self.hedged,
+            "failures": self.failures,
+            "rejected": self.rejected
+        }
+
+    def _pick_replicas(self) -> List[str]:
+        """Return replicas whose breakers would allow traffic, rotating the starting point"""
+        count = len(self.base_urls)
+        start = self._next_replica
+        self._next_replica = (start + 1) % count
+        ordered = [self.base_urls[(start + offset) % count] for offset in range(count)]
+        return [url for url in ordered if self.breakers[url].available()]
+
+    async def _send(self, url: str, path: str, payload: Dict[str, Any], timeout: Optional[float]) -> Any:
+        """Send one request to one replica, updating its breaker"""
+        breaker = self.breakers[url]
+        # Claimed here rather than when the replica is picked, so a hedge that never starts claims nothing
+        if not breaker.allow():
+            raise RemoteServiceUnavailable(f"{self.name} replica {url} is unavailable", retry_after=max(breaker.retry_after(), 1.0))
+        trial = breaker.opened_at is not None
+        try:
+            response = await self.client.post(
+                f"{url}{path}",
+                json=payload,
+                timeout=timeout if timeout is not None else self.timeout
+            )
+        except asyncio.CancelledError:
+            if trial:
+                breaker.release_trial()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+
+        if response.status_code == 503:
+            # Shedding load: the replica is up and answering, so this is no mark against it
+            if trial:
+                breaker.release_trial()
+            raise httpx.HTTPStatusError(
+                f"{self.name} replica {url} is overloaded",
+                request=response.request,
+                response=response
+            )
+        if response.status_code >= 500:
+            breaker.record_failure()
+            raise httpx.HTTPStatusError(
+                f"{self.name} replica {url} returned {response.status_code}",
+                request=response.request,
+                response=response
+            )
+
+        breaker.record_success()
+        if response.status_code >= 400:
+            raise RemoteServiceError(f"{self.name} rejected the request: {response.text}", response.status_code)
+        return response.json()
+
+    async def _hedged_post(self, replicas: List[str], path: str, payload: Dict[str, Any], timeout: Optional[float]) -> Any:
+        """Start on the first replica and add one more each hedge delay until one succeeds"""
+        if not self.hedge_delay or len(replicas) == 1:
+            return await self._send(replicas[0], path, payload, timeout)
+
+        pending = set()
+        errors = []
+        remaining = list(replicas)
+        try:
+            while remaining or pending:
+                if remaining:
+                    if pending:
+                        self.hedged += 1
+                    pending.add(asyncio.ensure_future(self._send(remaining.pop(0), path, payload, timeout)))
+
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    if isinstance(task.exception(), RemoteServiceError):
+                        raise task.exception()
+                    errors.append(task.exception())
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise errors[-1]
@@ -0,0 +1,23 @@
+from typing import Dict, List, TypedDict
+
+class GenerationResult(TypedDict):
+    """
+    What the generator returns, field for field the generation response.
+    Results stay plain dicts so the cache, worker processes and remote
+    services pass them through unchanged; routes encode them directly
+    instead of re-validating them against the response model.
+    """
+    output: str
+    token_count: int
+    generation_time: float
+    model_used: str
+
+class EvaluationResult(TypedDict):
+    """What every evaluation tier returns, field for field the evaluation response"""
+    score: float
+    feedback: str
+    reasoning: str
+    highlighted_tokens: List[str]
+    suggestions: List[str]
+    metrics: Dict[str, float]
+    tier: str
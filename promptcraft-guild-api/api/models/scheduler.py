@@ -0,0 +1,288 @@
+import logging
+import os
+import time
+import heapq
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .errors import ServiceUnavailable
+
+logger = logging.getLogger(__name__)
+
+class RateLimited(ServiceUnavailable):
+    """Raised when a client exceeds its request rate or queue share"""
+    status_code = 429
+
+class SchedulerOverloaded(ServiceUnavailable):
+    """Raised when the shared queue is full"""
+
+class DeadlineExceeded(ServiceUnavailable):
+    """Raised when a request's deadline passes (or cannot be met) before it runs"""
+    status_code = 504
+
+class TokenBucket:
+    """Allows `burst` requests at once, refilling at `rate` per second"""
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> float:
+        """Take one token; returns 0 on success or the seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+@dataclass
+class _ClientState:
+    weight: float
+    bucket: Optional[TokenBucket]
+    last_finish: float = 0.0
+    queued: int = 0
+
+@dataclass(order=True)
+class _Ticket:
+    finish_tag: float
+    sequence: int
+    start_tag: float = field(compare=False)
+    client: _ClientState = field(compare=False)
+    deadline: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    dropped: bool = field(default=False, compare=False)
+
+class FairScheduler:
+    """
+    Admission control in front of the model endpoints.
+    At most max_concurrent requests run at once. Waiting requests are served by
+    weighted fair queueing: each client's requests get virtual finish tags
+    spaced 1/weight apart, and the smallest tag runs next, so a client sending
+    a burst only delays its own later requests. Each client also has a token
+    bucket (off unless client_rate is set). Queued requests are dropped once
+    their deadline (or the max_queue_ms cap) passes, and requests whose
+    deadline cannot be met given the current queue are shed on arrival.
+
+    Clients are told apart by peer address. A client ID the caller claims for
+    itself (X-Client-Id, the session's client_id) is only used when
+    trust_client_id is set, i.e. when a proxy or login in front of the API sets
+    it; otherwise anyone could pick a fresh ID per request to dodge their
+    limits or take a heavier weight.
+    """
+    def __init__(
+        self,
+        max_concurrent: int = 64,
+        max_queue: int = 1024,
+        client_max_queue: int = 16,
+        client_rate: float = 0.0,
+        client_burst: float = 20.0,
+        max_queue_ms: float = 10000.0,
+        weights: Optional[Dict[str, float]] = None,
+        max_clients: int = 10000,
+        trust_client_id: bool = False
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.client_max_queue = max(1, client_max_queue)
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_queue_wait = max(0.0, max_queue_ms) / 1000.0
+        self.weights = dict(weights or {})
+        self.max_clients = max_clients
+        self.trust_client_id = trust_client_id
+
+        self.running = 0
+        self.virtual_time = 0.0
+        self._queue: List[_Ticket] = []
+        self._queued = 0
+        self._sequence = 0
+        self._clients: Dict[str, _ClientState] = {}
+        self.avg_service_time = 0.0
+
+        self.admitted = 0
+        self.rate_limited = 0
+        self.overloaded = 0
+        self.expired = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    @classmethod
+    def from_env(cls) -> "FairScheduler":
+        weights = {}
+        for item in os.getenv("SCHEDULER_CLIENT_WEIGHTS", "").split(","):
+            if ":" in item:
+                client_id, weight = item.rsplit(":", 1)
+                weights[client_id.strip()] = float(weight)
+        return cls(
+            max_concurrent=int(os.getenv("SCHEDULER_MAX_CONCURRENT", "64")),
+            max_queue=int(os.getenv("SCHEDULER_MAX_QUEUE", "1024")),
+            client_max_queue=int(os.getenv("SCHEDULER_CLIENT_MAX_QUEUE", "16")),
+            client_rate=float(os.getenv("SCHEDULER_CLIENT_RATE", "0")),
+            client_burst=float(os.getenv("SCHEDULER_CLIENT_BURST", "20")),
+            max_queue_ms=float(os.getenv("SCHEDULER_MAX_QUEUE_MS", "10000")),
+            weights=weights,
+            trust_client_id=os.getenv("SCHEDULER_TRUST_CLIENT_ID", "false").lower() in ("1", "true", "yes")
+        )
+
+    def verified_client_id(self, claimed_id: Optional[str]) -> Optional[str]:
+        """The claimed client ID when it is trusted, else None (anonymous); used as the player id for attempts"""
+        return claimed_id if self.trust_client_id and claimed_id else None
+
+    def client_key(self, claimed_id: Optional[str], peer: Optional[str]) -> str:
+        """The identity queueing and limits apply to: the claimed client ID only when it is trusted"""
+        if self.trust_client_id and claimed_id:
+            return claimed_id
+        return peer or "anonymous"
+
+    async def acquire(self, client_id: str, deadline: Optional[float] = None):
+        """
+        Wait for an execution slot. deadline is an absolute time.monotonic() value.
+        Raises RateLimited, SchedulerOverloaded or DeadlineExceeded instead of waiting when
+        the request should not run; every successful acquire must be paired with release().
+        """
+        now = time.monotonic()
+        if deadline is not None and deadline <= now:
+            self.expired += 1
+            raise DeadlineExceeded("Request deadline has already passed")
+
+        client = self._client(client_id)
+        if client.bucket is not None:
+            wait = client.bucket.take(now)
+            if wait:
+                self.rate_limited += 1
+                raise RateLimited(f"Rate limit exceeded for client {client_id}", retry_after=wait)
+
+        if self.running < self.max_concurrent and not self._queued:
+            self.running += 1
+            self.admitted += 1
+            return
+
+        if self._queued >= self.max_queue:
+            self.overloaded += 1
+            raise SchedulerOverloaded(f"Request queue is full ({self._queued} waiting)", retry_after=self._estimated_wait(self._queued))
+        if client.queued >= self.client_max_queue:
+            self.rate_limited += 1
+            raise RateLimited(f"Too many queued requests for client {client_id}", retry_after=self._estimated_wait(self._queued))
+
+        queue_deadline = now + self.max_queue_wait
+        if deadline is not None:
+            if self.avg_service_time and now + self._expected_wait(self._queued + 1) > deadline:
+                # Would only be dropped later; shed it now
+                self.shed += 1
+                raise DeadlineExceeded("Request cannot be served before its deadline", retry_after=self._estimated_wait(self._queued))
+            queue_deadline = min(queue_deadline, deadline)
+
+        start_tag = max(self.virtual_time, client.last_finish)
+        client.last_finish = start_tag + 1.0 / client.weight
+        self._sequence += 1
+        ticket = _Ticket(
+            finish_tag=client.last_finish,
+            sequence=self._sequence,
+            start_tag=start_tag,
+            client=client,
+            deadline=queue_deadline,
+            future=asyncio.get_running_loop().create_future()
+        )
+        heapq.heappush(self._queue, ticket)
+        self._queued += 1
+        client.queued += 1
+
+        try:
+            await asyncio.wait({ticket.future}, timeout=max(0.0, queue_deadline - now))
+        except asyncio.CancelledError:
+            if ticket.future.done():
+                # Granted just as the caller went away; hand the slot on
+                self.release(0.0)
+            else:
+                self._drop(ticket)
+            raise
+
+        if not ticket.future.done():
+            self._drop(ticket)
+            self.expired += 1
+            raise DeadlineExceeded("Request deadline passed while queued", retry_after=self._estimated_wait(self._queued))
+        self.admitted += 1
+
+    def release(self, service_time: float):
+        """Free a slot and start the next queued request by finish tag"""
+        if service_time:
+            self.avg_service_time = service_time if not self.avg_service_time else 0.9 * self.avg_service_time + 0.1 * service_time
+        self.running -= 1
+
+        now = time.monotonic()
+        while self._queue and self.running < self.max_concurrent:
+            ticket = heapq.heappop(self._queue)
+            if ticket.dropped:
+                continue
+            if ticket.deadline <= now or ticket.future.done():
+                # Its waiter wakes up at the deadline and reports it
+                self._drop(ticket)
+                continue
+            self._queued -= 1
+            ticket.client.queued -= 1
+            ticket.dropped = True
+            self.virtual_time = ticket.start_tag
+            self.running += 1
+            ticket.future.set_result(True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self._queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "clients": len(self._clients),
+            "trust_client_id": self.trust_client_id,
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "overloaded": self.overloaded,
+            "expired": self.expired,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+            "avg_service_ms": self.avg_service_time * 1000.0
+        }
+
+    def _client(self, client_id: str) -> _ClientState:
+        client = self._clients.get(client_id)
+        if client is None:
+            if len(self._clients) >= self.max_clients:
+                self._prune()
+            client = self._clients[client_id] = _ClientState(
+                weight=max(0.01, self.weights.get(client_id, 1.0)),
+                bucket=TokenBucket(self.client_rate, self.client_burst) if self.client_rate > 0 else None
+            )
+        return client
+
+    def _prune(self):
+        """Forget idle clients whose state would be recreated identically"""
+        now = time.monotonic()
+        for client_id, client in list(self._clients.items()):
+            if (
+                not client.queued
+                and client.last_finish <= self.virtual_time
+                and (client.bucket is None or client.bucket.is_full(now))
+            ):
+                del self._clients[client_id]
+
+    def _drop(self, ticket: _Ticket):
+        if not ticket.dropped:
+            ticket.dropped = True
+            self._queued -= 1
+            ticket.client.queued -= 1
+
+    def _expected_wait(self, position: int) -> float:
+        """Rough seconds until a request at this queue position starts"""
+        return self.avg_service_time * position / self.max_concurrent
+
+    def _estimated_wait(self, position: int) -> float:
+        """Retry-After for a rejected request, at least a second"""
+        return max(1.0, self._expected_wait(position))
+
+# Shared by the generation, evaluation and play routes
+scheduler = FairScheduler.from_env()
@@ -0,0 +1,266 @@
+import logging
+import os
+import mmap
+import time
+import zlib
+import fcntl
+import struct
+import hashlib
+from typing import Any, Dict, Optional
+
+import numpy as np
+import orjson
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PCCACHE1"
+PAGE = mmap.PAGESIZE
+
+# magic, slot bytes, sets, ways
+HEADER = struct.Struct("<8sIII")
+# key digest, expires_at, last_used (epoch seconds), value length, cache tag
+SLOT_HEADER = struct.Struct("<16sddIH2x")
+LAST_USED = struct.Struct("<d")
+EMPTY_DIGEST = bytes(16)
+
+# Byte-range locks in the file: one to serialize attaching, one every attached process holds shared, then the stripes
+INIT_LOCK = 0
+ATTACHED_LOCK = 1
+STRIPE_LOCKS = 2
+
+# Seqlock reads retried this many times before a lookup counts as a miss
+READ_RETRIES = 4
+
+def _round_up(value: int, multiple: int) -> int:
+    return -(-value // multiple) * multiple
+
+def cache_tag(name: str) -> int:
+    """Small id stored with each entry so occupancy can be reported per cache"""
+    return zlib.crc32(name.encode("utf-8")) & 0xFFFF
+
+class SharedMemoryStore:
+    """
+    Hash table in a memory-mapped file (normally under /dev/shm) that every
+    worker process on a host reads and writes directly, so they share one warm
+    cache and memory stays flat as workers are added.
+
+    The table is set-associative: a key's digest picks a set of `ways`
+    fixed-size slots, and a full set evicts the slot used least recently, an
+    approximation of LRU over the whole table. Writers hold an fcntl lock on
+    the set's stripe; readers take no lock and instead check the set's
+    sequence number (odd while a write is in progress) before and after
+    copying a slot, retrying if it moved. A process that dies mid-write leaves
+    its set odd; the next writer to lock the stripe clears that set.
+
+    The file is laid out when the first process attaches. A process finding a
+    different layout re-creates it only if no other process has it mapped.
+    """
+    def __init__(
+        self,
+        path: str,
+        size_mb: float = 32.0,
+        slot_bytes: int = 4096,
+        ways: int = 8,
+        lock_stripes: int = 64
+    ):
+        self.path = path
+        self.slot_bytes = max(SLOT_HEADER.size + 64, slot_bytes)
+        self.ways = max(1, ways)
+        self.lock_stripes = max(1, lock_stripes)
+        self.sets = max(1, int(size_mb * 1024 * 1024) // (self.slot_bytes * self.ways))
+        self.slots = self.sets * self.ways
+        self.value_capacity = self.slot_bytes - SLOT_HEADER.size
+
+        self._sequences_offset = PAGE
+        self._slots_offset = PAGE + _round_up(self.sets * 8, PAGE)
+        self.size = self._slots_offset + self.slots * self.slot_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.too_large = 0
+        self.contended = 0
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            self._attach()
+            self._map = mmap.mmap(self._fd, self.size)
+        except Exception:
+            os.close(self._fd)
+            raise
+        self._sequences = memoryview(self._map)[self._sequences_offset:self._sequences_offset + self.sets * 8].cast("Q")
+        logger.info(f"Attached shared cache {path}: {self.slots} slots of {self.slot_bytes} bytes in {self.sets} sets")
+
+    @classmethod
+    def from_env(cls) -> Optional["SharedMemoryStore"]:
+        """Attach to SHARED_CACHE_PATH, or None to keep caches in-process (also when attaching fails)"""
+        path = os.getenv("SHARED_CACHE_PATH", "")
+        if not path:
+            return None
+        try:
+            return cls(
+                path,
+                size_mb=float(os.getenv("SHARED_CACHE_SIZE_MB", "32")),
+                slot_bytes=int(os.getenv("SHARED_CACHE_SLOT_BYTES", "4096")),
+                ways=int(os.getenv("SHARED_CACHE_WAYS", "8")),
+                lock_stripes=int(os.getenv("SHARED_CACHE_LOCK_STRIPES", "64"))
+            )
+        except (OSError, ValueError) as e:
+            logger.error(f"Shared cache unavailable, caching in-process instead: {str(e)}")
+            return None
+
+    def _attach(self):
+        header = HEADER.pack(MAGIC, self.slot_bytes, self.sets, self.ways)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, INIT_LOCK)
+        try:
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, ATTACHED_LOCK)
+                alone = True
+            except OSError:
+                alone = False
+            if os.fstat(self._fd).st_size != self.size or os.pread(self._fd, HEADER.size, 0) != header:
+                if not alone:
+                    raise ValueError(f"{self.path} is in use with a different layout")
+                # Truncating first zeroes every slot and sequence number
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self.size)
+                os.pwrite(self._fd, header, 0)
+                logger.info(f"Created shared cache {self.path} ({self.size / (1024 * 1024):.1f}MB)")
+            # Held for the life of the process, so others know the file is mapped
+            fcntl.lockf(self._fd, fcntl.LOCK_SH, 1, ATTACHED_LOCK)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, INIT_LOCK)
+
+    def _locate(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        set_index = int.from_bytes(digest[:8], "little") % self.sets
+        return digest, set_index, self._slots_offset + set_index * self.ways * self.slot_bytes
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh copy of the value stored under key, or None"""
+        digest, set_index, base = self._locate(key)
+        found = None
+        for _ in range(READ_RETRIES):
+            before = self._sequences[set_index]
+            if before & 1:
+                continue
+            found = None
+            for offset in range(base, base + self.ways * self.slot_bytes, self.slot_bytes):
+                slot_digest, expires_at, _, length, _ = SLOT_HEADER.unpack_from(self._map, offset)
+                if slot_digest == digest:
+                    found = (offset, expires_at, self._map[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + length])
+                    break
+            if self._sequences[set_index] == before:
+                break
+        else:
+            self.contended += 1
+            self.misses += 1
+            return None
+
+        now = time.time()
+        if found is None or found[1] <= now:
+            self.misses += 1
+            return None
+        offset, _, data = found
+        # Unlocked and racy by design: a lost update only makes eviction slightly less exact
+        LAST_USED.pack_into(self._map, offset + 24, now)
+        self.hits += 1
+        return orjson.loads(data)
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float, tag: int = 0) -> bool:
+        """Store value under key for ttl seconds; returns False if it does not fit a slot"""
+        data = orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+        if len(data) > self.value_capacity:
+            self.too_large += 1
+            return False
+
+        digest, set_index, base = self._locate(key)
+        stripe = STRIPE_LOCKS + set_index % self.lock_stripes
+        now = time.time()
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, stripe)
+        try:
+            if self._sequences[set_index] & 1:
+                # A writer died holding this set; its slots may be torn
+                self._map[base:base + self.ways * self.slot_bytes] = bytes(self.ways * self.slot_bytes)
+                self._sequences[set_index] += 1
+
+            # The key's own slot, else a free or expired one, else the least recently used
+            target = None
+            free = None
+            oldest = None
+            for offset in range(base, base + self.ways * self.slot_bytes, self.slot_bytes):
+                slot_digest, expires_at, last_used, _, _ = SLOT_HEADER.unpack_from(self._map, offset)
+                if slot_digest == digest:
+                    target = offset
+                    break
+                if free is None and (slot_digest == EMPTY_DIGEST or expires_at <= now):
+                    free = offset
+                if oldest is None or last_used < oldest[1]:
+                    oldest = (offset, last_used)
+            if target is None:
+                target = free
+            if target is None:
+                target = oldest[0]
+                self.evictions += 1
+
+            self._sequences[set_index] += 1
+            self._map[target + SLOT_HEADER.size:target + SLOT_HEADER.size + len(data)] = data
+            SLOT_HEADER.pack_into(self._map, target, digest, now + ttl, now, len(data), tag)
+            self._sequences[set_index] += 1
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, stripe)
+        return True
+
+    def clear(self, tag: Optional[int] = None):
+        """Drop every entry, or only those stored with tag"""
+        for stripe in range(self.lock_stripes):
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, STRIPE_LOCKS + stripe)
+        try:
+            for set_index in range(self.sets):
+                base = self._slots_offset + set_index * self.ways * self.slot_bytes
+                self._sequences[set_index] += 1
+                for offset in range(base, base + self.ways * self.slot_bytes, self.slot_bytes):
+                    if tag is None or SLOT_HEADER.unpack_from(self._map, offset)[4] == tag:
+                        SLOT_HEADER.pack_into(self._map, offset, EMPTY_DIGEST, 0.0, 0.0, 0, 0)
+                self._sequences[set_index] += 1
+        finally:
+            for stripe in range(self.lock_stripes):
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, STRIPE_LOCKS + stripe)
+
+    def occupancy(self, tag: Optional[int] = None) -> Dict[str, int]:
+        """Live entries and value bytes across all processes, read as one strided array over the slot headers"""
+        layout = np.dtype({
+            "names": ["expires_at", "length", "tag"],
+            "formats": ["<f8", "<u4", "<u2"],
+            "offsets": [16, 32, 36],
+            "itemsize": self.slot_bytes
+        })
+        table = np.frombuffer(self._map, dtype=layout, count=self.slots, offset=self._slots_offset)
+        live = (table["length"] > 0) & (table["expires_at"] > time.time())
+        if tag is not None:
+            live &= table["tag"] == tag
+        entries, size = int(live.sum()), int(table["length"][live].sum())
+        del table
+        return {"entries": entries, "bytes": size}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "slots": self.slots,
+            "slot_bytes": self.slot_bytes,
+            "ways": self.ways,
+            **self.occupancy(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "too_large": self.too_large,
+            "contended": self.contended
+        }
+
+    def close(self):
+        self._sequences.release()
+        self._map.close()
+        os.close(self._fd)
+
+# One table per host, shared by the generation and evaluation caches; None keeps them in-process
+shared_store = SharedMemoryStore.from_env()
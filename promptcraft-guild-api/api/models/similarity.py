@@ -0,0 +1,183 @@
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# The frontend's target responses (targetResponses in useGameState.ts), indexed at startup
+TARGET_RESPONSES = (
+    "The concept of recursive thinking involves a function calling itself until a specific condition is met. It's like Russian nesting dolls where each doll contains a smaller version of itself, until you reach the smallest one. In programming, this is used for problems that can be broken down into simpler versions of the same problem.",
+    "Machine learning algorithms learn from data by identifying patterns. Think of them as students who study countless examples to understand a subject. For instance, to recognize cats, they analyze thousands of cat pictures, gradually improving their ability to distinguish cats from other animals.",
+    "Object-oriented programming organizes code around 'objects' rather than functions. Imagine a car factory where each department focuses on a specific component—engine, transmission, etc. In OOP, each object has its own properties and behaviors, keeping related functionality bundled together."
+)
+
+# Polynomial rolling hash over code points, then a multiplicative mix before bucketing
+HASH_BASE = np.uint32(1000003)
+HASH_MIX = np.uint32(0x9E3779B1)
+
+# Texts vectorized together; bounds the n-gram arrays for very large batches
+VECTORIZE_CHUNK = 256
+
+class SimilarityIndex:
+    """
+    Hashed character n-gram vectors for comparing generated text with a target.
+    Text is lowercased and whitespace-collapsed; its n-grams are hashed with
+    NumPy over the whole batch at once, into signed buckets, with sublinear
+    term frequency and L2 normalization, so similarity is a dot product.
+    The target responses are vectorized once at startup into a dense matrix;
+    other targets are cached as they are seen. Candidates stay sparse and are
+    scored against their target rows with one gather and one bincount.
+    """
+    def __init__(
+        self,
+        targets: Sequence[str] = TARGET_RESPONSES,
+        dimensions: int = 4096,
+        ngram_sizes: Sequence[int] = (3, 4, 5),
+        cache_size: int = 256
+    ):
+        self.dimensions = dimensions
+        self.ngram_sizes = tuple(ngram_sizes)
+        self.cache_size = cache_size
+
+        self.targets = list(targets)
+        self.matrix = self.vectorize(self.targets)
+        self._rows: Dict[str, int] = {text: row for row, text in enumerate(self.targets)}
+        # Targets outside the index, least recently used first
+        self._extra: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+        self.scored = 0
+        self.extra_misses = 0
+        logger.info(f"Similarity index built for {len(self.targets)} targets ({self.dimensions} dimensions)")
+
+    @classmethod
+    def from_env(cls) -> "SimilarityIndex":
+        return cls(
+            dimensions=int(os.getenv("SIMILARITY_DIMENSIONS", "4096")),
+            ngram_sizes=tuple(int(size) for size in os.getenv("SIMILARITY_NGRAM_SIZES", "3,4,5").split(","))
+        )
+
+    def vectorize(self, texts: Sequence[str]) -> np.ndarray:
+        """Return one L2-normalized float32 row per text"""
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for start in range(0, len(texts), VECTORIZE_CHUNK):
+            rows, buckets, weights = self._features(texts[start:start + VECTORIZE_CHUNK])
+            vectors[rows + start, buckets] = weights
+        return vectors
+
+    def _features(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Sparse vectors for a chunk of texts: (row, bucket, weight) for every
+        non-zero bucket, with weights L2-normalized per row. Work is linear in
+        the number of n-grams; nothing is sized texts x dimensions.
+        """
+        dimensions = self.dimensions
+        normalized = [" ".join(text.replace("\x00", " ").lower().split()) for text in texts]
+
+        # All texts in one array of code points, separated by 0 so no n-gram spans two texts
+        codes = np.frombuffer("\x00".join(normalized).encode("utf-32-le"), dtype=np.uint32)
+        lengths = np.fromiter((len(text) + 1 for text in normalized), dtype=np.int64, count=len(normalized))
+        row_of = np.repeat(np.arange(len(normalized), dtype=np.int64), lengths)[:len(codes)]
+        separators = np.concatenate(([0], np.cumsum(codes == 0, dtype=np.int32)))
+
+        # One key per n-gram: (row * dimensions + bucket) * 2 + negative sign
+        keys = []
+        for size in self.ngram_sizes:
+            windows = len(codes) - size + 1
+            if windows <= 0:
+                continue
+            # 32-bit arithmetic wraps, which is all a hash needs and halves the memory traffic
+            hashes = codes[:windows].copy()
+            for offset in range(1, size):
+                hashes *= HASH_BASE
+                hashes += codes[offset:offset + windows]
+            valid = separators[size:size + windows] == separators[:windows]
+            hashes = hashes[valid]
+            hashes ^= np.uint32(size)
+            hashes *= HASH_MIX
+            # The top bit is the sign, the bits below it pick the bucket
+            keys.append((row_of[:windows][valid] * dimensions + (hashes >> np.uint32(8)) % np.uint32(dimensions)) * 2 + (hashes >> np.uint32(31)))
+
+        if not keys:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0, dtype=np.float64)
+
+        # Sorting groups each text's n-grams by bucket, so counts are sums over runs rather than a dense array
+        keys = np.sort(np.concatenate(keys))
+        signs = 1.0 - 2.0 * (keys & 1)
+        keys >>= 1
+        boundaries = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        values = np.add.reduceat(signs, boundaries)
+        kept = values != 0
+        values = values[kept]
+        flat = keys[boundaries][kept]
+
+        # Sublinear term frequency, keeping the hash sign
+        weights = np.copysign(np.log1p(np.abs(values)), values)
+        rows = flat // dimensions
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=len(normalized)))
+        weights /= norms[rows]
+        return rows, flat - rows * dimensions, weights
+
+    def target_vector(self, target: str) -> np.ndarray:
+        """The vector for a target, from the index or the cache of other targets"""
+        row = self._rows.get(target)
+        if row is not None:
+            return self.matrix[row]
+        vector = self._extra.get(target)
+        if vector is not None:
+            self._extra.move_to_end(target)
+            return vector
+        self.extra_misses += 1
+        vector = self.vectorize([target])[0]
+        self._extra[target] = vector
+        if len(self._extra) > self.cache_size:
+            self._extra.popitem(last=False)
+        return vector
+
+    def score(self, output: str, target: str) -> float:
+        """Cosine similarity of one output to its target, clipped to [0, 1]"""
+        return float(self.score_pairs([output], [target])[0])
+
+    def score_many(self, outputs: Sequence[str], target: str) -> np.ndarray:
+        """Similarity of each output to one target"""
+        return self.score_pairs(outputs, [target] * len(outputs))
+
+    def score_pairs(self, outputs: Sequence[str], targets: Sequence[str]) -> np.ndarray:
+        """Similarity of each output to its own target, as dot products of the sparse outputs with the target rows"""
+        self.scored += len(outputs)
+        distinct: Dict[str, int] = {}
+        target_index = np.fromiter((distinct.setdefault(target, len(distinct)) for target in targets), dtype=np.int64, count=len(targets))
+        target_matrix = np.stack([self.target_vector(target) for target in distinct])
+
+        scores = np.zeros(len(outputs), dtype=np.float64)
+        for start in range(0, len(outputs), VECTORIZE_CHUNK):
+            chunk = outputs[start:start + VECTORIZE_CHUNK]
+            rows, buckets, weights = self._features(chunk)
+            products = weights * target_matrix[target_index[rows + start], buckets]
+            scores[start:start + len(chunk)] = np.bincount(rows, weights=products, minlength=len(chunk))
+        return np.clip(scores, 0.0, 1.0)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "targets": len(self.targets),
+            "dimensions": self.dimensions,
+            "cached_targets": len(self._extra),
+            "cache_misses": self.extra_misses,
+            "scored": self.scored
+        }
+
+# Built at import so the target vectors are ready before the first request
+similarity_index = SimilarityIndex.from_env()
+
+def with_similarity(result: Dict, similarity: float) -> Dict:
+    """Copy an evaluation result with metrics["target_similarity"] set; cached results are never modified"""
+    return {**result, "metrics": {**result.get("metrics", {}), "target_similarity": round(float(similarity), 4)}}
+
+def with_target_similarity(result: Dict, output: Optional[str], target_output: Optional[str]) -> Dict:
+    """Add the output's similarity to the target when both texts are known"""
+    if not output or not target_output:
+        return result
+    return with_similarity(result, similarity_index.score(output, target_output))
@@ -0,0 +1,168 @@
+import logging
+import os
+import time
+import random
+import asyncio
+from dataclasses import dataclass, replace
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .errors import ServiceUnavailable
+
+logger = logging.getLogger(__name__)
+
+class SimulatedOverload(ServiceUnavailable):
+    """Raised when the simulated serving queue is full"""
+
+class SimulatedFailure(Exception):
+    """An injected model failure"""
+
+@dataclass(frozen=True)
+class SimulationProfile:
+    """
+    Latency model for a mock engine. A request waits for one of `slots`
+    execution slots, pays time-to-first-token plus prefill per prompt token,
+    then decode time per output token. Decode slows by `batch_slowdown` for
+    every other request sharing the engine. Each request's service time is
+    scaled by log-normal jitter, and with `tail_probability` by `tail_multiplier`;
+    `failure_rate` of requests fail outright.
+    """
+    slots: int = 8
+    max_queue: int = 256
+    ttft_ms: float = 250.0
+    prefill_ms_per_token: float = 0.5
+    decode_ms_per_token: float = 25.0
+    batch_slowdown: float = 0.02
+    jitter: float = 0.1
+    tail_probability: float = 0.01
+    tail_multiplier: float = 5.0
+    failure_rate: float = 0.0
+
+    @classmethod
+    def from_env(cls, prefix: str, **defaults: Any) -> "SimulationProfile":
+        """Build a profile from PREFIX_SLOTS, PREFIX_TTFT_MS, ... falling back to the given defaults"""
+        profile = replace(cls(), **defaults)
+        overrides = {}
+        for name, value in vars(profile).items():
+            raw = os.getenv(f"{prefix}_{name.upper()}")
+            if raw is not None:
+                overrides[name] = type(value)(raw)
+        return replace(profile, **overrides)
+
+class LatencySimulator:
+    """Sleeps for as long as a model serving the request would, given the current load"""
+    def __init__(self, profile: SimulationProfile, name: str = "simulator"):
+        self.profile = profile
+        self.name = name
+
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.active = 0
+        self.queued = 0
+
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.tail_events = 0
+        self.total_queue_time = 0.0
+        self.total_service_time = 0.0
+
+    async def run(self, prompt_tokens: int, output_tokens: int, rng: Optional[random.Random] = None) -> float:
+        """Simulate a complete (non-streaming) request; returns the seconds spent"""
+        start_time = time.monotonic()
+        async for _ in self.stream(prompt_tokens, [""] * output_tokens, rng):
+            pass
+        return time.monotonic() - start_time
+
+    async def stream(
+        self,
+        prompt_tokens: int,
+        pieces: List[str],
+        rng: Optional[random.Random] = None
+    ) -> AsyncIterator[str]:
+        """Yield each piece when a model would have produced it"""
+        rng = rng or random
+        profile = self.profile
+        slots = self._ensure_slots()
+
+        if self.queued >= profile.max_queue and slots.locked():
+            self.rejected += 1
+            raise SimulatedOverload(
+                f"Simulated {self.name} queue is full ({self.queued} waiting)",
+                retry_after=self._estimated_wait()
+            )
+
+        queued_at = time.monotonic()
+        self.queued += 1
+        try:
+            await slots.acquire()
+        finally:
+            self.queued -= 1
+
+        self.active += 1
+        service_start = time.monotonic()
+        self.total_queue_time += service_start - queued_at
+        try:
+            # One draw per request so a slow request stays slow throughout
+            scale = rng.lognormvariate(0.0, profile.jitter) if profile.jitter else 1.0
+            if profile.tail_probability and rng.random() < profile.tail_probability:
+                self.tail_events += 1
+                scale *= profile.tail_multiplier
+            fails = profile.failure_rate and rng.random() < profile.failure_rate
+
+            await asyncio.sleep(scale * (profile.ttft_ms + profile.prefill_ms_per_token * prompt_tokens) / 1000.0)
+            if fails:
+                raise SimulatedFailure(f"Simulated {self.name} failure")
+
+            for piece in pieces:
+                contention = 1.0 + profile.batch_slowdown * (self.active - 1)
+                await asyncio.sleep(scale * contention * profile.decode_ms_per_token / 1000.0)
+                yield piece
+            self.completed += 1
+        except SimulatedFailure:
+            self.failed += 1
+            raise
+        finally:
+            self.active -= 1
+            self.total_service_time += time.monotonic() - service_start
+            slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        finished = (self.completed + self.failed) or 1
+        return {
+            "name": self.name,
+            "profile": vars(self.profile),
+            "active": self.active,
+            "queued": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "tail_events": self.tail_events,
+            "avg_queue_ms": (self.total_queue_time / finished) * 1000.0,
+            "avg_service_ms": (self.total_service_time / finished) * 1000.0
+        }
+
+    def _ensure_slots(self) -> asyncio.Semaphore:
+        """Create the slot semaphore on the running loop, recreating it if the loop changed"""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(max(1, self.profile.slots))
+            self.active = 0
+            self.queued = 0
+        return self._slots
+
+    def _estimated_wait(self) -> float:
+        """Rough seconds until a slot frees up for a newly queued request"""
+        finished = self.completed + self.failed
+        avg_service = self.total_service_time / finished if finished else 1.0
+        return max(1.0, avg_service * self.queued / max(1, self.profile.slots))
+
+# Simulated engines behind the /mock endpoints (MOCK_GENERATE_* and MOCK_EVALUATE_* override the profiles)
+generation_simulator = LatencySimulator(
+    SimulationProfile.from_env("MOCK_GENERATE"),
+    name="mock-generate"
+)
+evaluation_simulator = LatencySimulator(
+    SimulationProfile.from_env("MOCK_EVALUATE", ttft_ms=150.0, prefill_ms_per_token=1.0, decode_ms_per_token=20.0),
+    name="mock-evaluate"
+)
@@ -0,0 +1,73 @@
+import logging
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one shared computation.
+    The first caller starts the work as its own task; callers arriving while it
+    runs await the same task. Each caller waits through asyncio.shield, so one
+    caller being cancelled (e.g. a client disconnecting) does not cancel the
+    work for the others. The work is only cancelled once every caller has gone.
+    """
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        # key -> (task, number of callers still waiting)
+        self._inflight: Dict[str, Tuple[asyncio.Task, int]] = {}
+
+        self.executed = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    async def do(self, key: str, work: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run work() once per key at a time; returns (result, whether it was shared with an earlier caller)"""
+        entry = self._inflight.get(key)
+        if entry is not None and entry[0].get_loop() is not asyncio.get_running_loop():
+            # Left over from a previous event loop
+            entry = None
+
+        if entry is None:
+            task = asyncio.ensure_future(work())
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+            self.executed += 1
+            shared = False
+            waiters = 1
+        else:
+            task, waiters = entry
+            self.coalesced += 1
+            shared = True
+            waiters += 1
+        self._inflight[key] = (task, waiters)
+
+        try:
+            return await asyncio.shield(task), shared
+        except asyncio.CancelledError:
+            if task.done():
+                raise
+            task, waiters = self._inflight.get(key, (task, 1))
+            if waiters <= 1:
+                # Nobody is left to use the result
+                self.abandoned += 1
+                task.cancel()
+            else:
+                self._inflight[key] = (task, waiters - 1)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "in_flight": len(self._inflight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned
+        }
+
+    def _forget(self, key: str, task: asyncio.Task):
+        entry = self._inflight.get(key)
+        if entry is not None and entry[0] is task:
+            del self._inflight[key]
+        # Mark the outcome as retrieved when every caller has gone
+        if not task.cancelled():
+            task.exception()
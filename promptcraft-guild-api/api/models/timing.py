@@ -0,0 +1,70 @@
+import time
+from contextvars import ContextVar, Token
+from typing import Dict, Optional
+
+class RequestTimer:
+    """
+    Span durations for one request, summed by name. `checkpoint` is when the
+    last mark or span ended, so a mark covers the gap since then.
+    """
+    def __init__(self):
+        self.start = self.checkpoint = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def header(self) -> str:
+        """Server-Timing header value, in milliseconds, with the total so far last"""
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.spans.items()]
+        parts.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.2f}")
+        return ", ".join(parts)
+
+# Set only while ServerTimingMiddleware is timing the request; spans are no-ops otherwise
+_current: ContextVar[Optional[RequestTimer]] = ContextVar("request_timer", default=None)
+
+class _Span:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer: RequestTimer, name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        self.timer.add(self.name, end - self.start)
+        self.timer.checkpoint = end
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        return False
+
+NO_SPAN = _NoSpan()
+
+def span(name: str):
+    """Context manager timing its block as span name; shared and free when the request is not timed"""
+    timer = _current.get()
+    return NO_SPAN if timer is None else _Span(timer, name)
+
+def mark(name: str):
+    """Record the time since the previous mark or span ended (or the request started) as span name"""
+    timer = _current.get()
+    if timer is not None:
+        now = time.perf_counter()
+        timer.add(name, now - timer.checkpoint)
+        timer.checkpoint = now
+
+def begin(timer: RequestTimer) -> Token:
+    return _current.set(timer)
+
+def end(token: Token):
+    _current.reset(token)
@@ -0,0 +1,284 @@
+import logging
+import os
+import re
+import sys
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MERGES_PATH = os.path.join(os.path.dirname(__file__), "vocab", "merges.txt")
+
+# Longest run of byte symbols merged as one piece. Merging is quadratic in a piece's length,
+# so longer pre-tokens (a pasted hash, a word with no spaces) are cut into runs of this size first.
+MAX_WORD_SYMBOLS = 64
+
+# Longest text the API accepts in a prompt, draft or tokenize request, in characters
+MAX_TEXT_CHARS = int(os.getenv("MAX_TEXT_CHARS", "8000"))
+
+# Split text into words, numbers, punctuation runs and whitespace before applying merges.
+# A leading space stays attached to the following word, as in GPT-2 style byte-level BPE.
+PRETOKENIZE_PATTERN = re.compile(
+    r"""'s|'t|'re|'ve|'m|'ll|'d| ?[^\W\d_]+| ?\d+| ?(?:[^\s\w]|_)+|\s+(?!\S)|\s+"""
+)
+
+def bytes_to_unicode() -> Dict[int, str]:
+    """Map every byte to a printable character so merges can be stored as plain text"""
+    printable = (
+        list(range(ord("!"), ord("~") + 1))
+        + list(range(ord("¡"), ord("¬") + 1))
+        + list(range(ord("®"), ord("ÿ") + 1))
+    )
+    chars = printable[:]
+    extra = 0
+    for byte in range(256):
+        if byte not in printable:
+            printable.append(byte)
+            chars.append(256 + extra)
+            extra += 1
+    return dict(zip(printable, (chr(char) for char in chars)))
+
+BYTE_ENCODER = bytes_to_unicode()
+BYTE_DECODER = {char: byte for byte, char in BYTE_ENCODER.items()}
+
+def _encode_bytes(piece: str) -> str:
+    """Render a pre-token as its byte-level symbol string"""
+    return "".join(BYTE_ENCODER[byte] for byte in piece.encode("utf-8"))
+
+class BPETokenizer:
+    """
+    Offline byte-level BPE tokenizer backed by a merges file.
+    The merge table is compiled into a rank dict once at load time; merged
+    pre-tokens and whole-string counts are memoized so repeated text is cheap.
+    """
+    def __init__(
+        self,
+        merges_path: str = DEFAULT_MERGES_PATH,
+        cache_size: int = 4096,
+        word_cache_size: int = 65536
+    ):
+        logger.info(f"Loading BPE merges from {merges_path}")
+        self.merges_path = merges_path
+        self.ranks = self._load_ranks(merges_path)
+        self.cache_size = cache_size
+        self.word_cache_size = word_cache_size
+
+        # Recently counted strings, least recently used first
+        self._count_cache: "OrderedDict[str, int]" = OrderedDict()
+        # Pre-token -> merged symbols
+        self._word_cache: Dict[str, Tuple[str, ...]] = {}
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        logger.info(f"BPE tokenizer ready with {len(self.ranks)} merges")
+
+    @staticmethod
+    def _load_ranks(merges_path: str) -> Dict[Tuple[str, str], int]:
+        """Read a GPT-2 style merges file into a pair -> rank table"""
+        ranks = {}
+        if not os.path.exists(merges_path):
+            logger.warning(f"BPE merges file {merges_path} not found, falling back to byte-level tokens")
+            return ranks
+        with open(merges_path, encoding="utf-8") as merges_file:
+            for line_number, line in enumerate(merges_file):
+                line = line.rstrip("\n")
+                # Only the first line may be a "#version" header; "#" is also a valid symbol
+                if not line or (line_number == 0 and line.startswith("#version")):
+                    continue
+                first, second = line.split(" ")
+                ranks.setdefault((sys.intern(first), sys.intern(second)), len(ranks))
+        return ranks
+
+    def _bpe(self, word: str) -> Tuple[str, ...]:
+        """Apply merges to one byte-level pre-token, lowest rank first"""
+        cached = self._word_cache.get(word)
+        if cached is not None:
+            return cached
+        if len(word) > MAX_WORD_SYMBOLS:
+            # Merges never cross a run boundary; real words are far shorter than a run
+            return tuple(
+                symbol
+                for offset in range(0, len(word), MAX_WORD_SYMBOLS)
+                for symbol in self._bpe(word[offset:offset + MAX_WORD_SYMBOLS])
+            )
+
+        symbols = list(word)
+        ranks = self.ranks
+        while len(symbols) > 1:
+            best_rank = None
+            best_index = -1
+            for index in range(len(symbols) - 1):
+                rank = ranks.get((symbols[index], symbols[index + 1]))
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best_rank = rank
+                    best_index = index
+            if best_rank is None:
+                break
+            first, second = symbols[best_index], symbols[best_index + 1]
+            # Merge every occurrence of the best pair in one pass
+            merged = []
+            index = 0
+            while index < len(symbols):
+                if index < len(symbols) - 1 and symbols[index] == first and symbols[index + 1] == second:
+                    merged.append(first + second)
+                    index += 2
+                else:
+                    merged.append(symbols[index])
+                    index += 1
+            symbols = merged
+
+        result = tuple(symbols)
+        if len(self._word_cache) >= self.word_cache_size:
+            self._word_cache.clear()
+        self._word_cache[word] = result
+        return result
+
+    def pretokenize(self, text: str) -> List[str]:
+        """Split text into the pieces merges are applied within"""
+        return PRETOKENIZE_PATTERN.findall(text)
+
+    def encode(self, text: str) -> List[str]:
+        """Return the byte-level BPE tokens for a string"""
+        tokens = []
+        for piece in self.pretokenize(text):
+            tokens.extend(self._bpe(_encode_bytes(piece)))
+        return tokens
+
+    def tokenize(self, text: str) -> List[str]:
+        """
+        Split a string into one text piece per token.
+        A token that ends inside a multi-byte character yields an empty piece and
+        the character is emitted with the token that completes it.
+        """
+        pieces = []
+        pending = b""
+        for token in self.encode(text):
+            pending += bytes(BYTE_DECODER[char] for char in token)
+            try:
+                pieces.append(pending.decode("utf-8"))
+                pending = b""
+            except UnicodeDecodeError:
+                pieces.append("")
+        if pending:
+            pieces[-1] = pending.decode("utf-8", errors="replace")
+        return pieces
+
+    def count_piece(self, piece: str) -> int:
+        """Count the tokens in one pre-token, as returned by pretokenize"""
+        return len(self._bpe(_encode_bytes(piece)))
+
+    def count(self, text: str) -> int:
+        """Count the tokens in a single string, using the LRU of recent strings"""
+        cached = self._count_cache.get(text)
+        if cached is not None:
+            self._count_cache.move_to_end(text)
+            self.cache_hits += 1
+            return cached
+
+        self.cache_misses += 1
+        token_count = sum(len(self._bpe(_encode_bytes(piece))) for piece in self.pretokenize(text))
+
+        self._count_cache[text] = token_count
+        if len(self._count_cache) > self.cache_size:
+            self._count_cache.popitem(last=False)
+        return token_count
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """Count the tokens of each string in a batch"""
+        return [self.count(text) for text in texts]
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache occupancy and hit counters"""
+        return {
+            "merges": len(self.ranks),
+            "cached_strings": len(self._count_cache),
+            "cached_words": len(self._word_cache),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses
+        }
+
+def train_merges(texts: Iterable[str], num_merges: int) -> List[Tuple[str, str]]:
+    """Learn a byte-level BPE merge list from a corpus"""
+    word_counts = Counter()
+    for text in texts:
+        for piece in PRETOKENIZE_PATTERN.findall(text):
+            word_counts[_encode_bytes(piece)] += 1
+
+    words = [list(word) for word in word_counts]
+    frequencies = list(word_counts.values())
+
+    # Pair counts plus an index of which words contain each pair
+    pair_counts = Counter()
+    pair_words = defaultdict(set)
+    for word_index, symbols in enumerate(words):
+        for pair in zip(symbols, symbols[1:]):
+            pair_counts[pair] += frequencies[word_index]
+            pair_words[pair].add(word_index)
+
+    merges = []
+    learned = set()
+    while len(merges) < num_merges and pair_counts:
+        pair, count = max(pair_counts.items(), key=lambda item: (item[1], item[0]))
+        if count < 2:
+            break
+        if pair in learned:
+            # Stale count for a pair that was already merged everywhere
+            del pair_counts[pair]
+            continue
+        learned.add(pair)
+        merges.append(pair)
+        first, second = pair
+
+        for word_index in list(pair_words.pop(pair, ())):
+            symbols = words[word_index]
+            frequency = frequencies[word_index]
+            for old_pair in zip(symbols, symbols[1:]):
+                pair_counts[old_pair] -= frequency
+                if pair_counts[old_pair] <= 0:
+                    del pair_counts[old_pair]
+
+            merged = []
+            index = 0
+            while index < len(symbols):
+                if index < len(symbols) - 1 and symbols[index] == first and symbols[index + 1] == second:
+                    merged.append(first + second)
+                    index += 2
+                else:
+                    merged.append(symbols[index])
+                    index += 1
+            words[word_index] = merged
+
+            for new_pair in zip(merged, merged[1:]):
+                pair_counts[new_pair] += frequency
+                pair_words[new_pair].add(word_index)
+
+        pair_counts.pop(pair, None)
+
+    return merges
+
+# Initialize the shared tokenizer
+tokenizer = BPETokenizer(os.getenv("TOKENIZER_MERGES_PATH", DEFAULT_MERGES_PATH))
+
+def count_tokens(texts: List[str]) -> List[int]:
+    """Wrapper function to count tokens for a batch of strings"""
+    return tokenizer.count_tokens(texts)
+
+def count_text_tokens(text: str) -> int:
+    """Wrapper function to count tokens for one string"""
+    return tokenizer.count(text)
+
+if __name__ == "__main__":
+    # Usage: python -m api.models.tokenizer OUTPUT NUM_MERGES CORPUS_FILE...
+    output_path, num_merges, *corpus_paths = sys.argv[1:]
+
+    def read_corpus(paths: List[str]) -> Iterable[str]:
+        for path in paths:
+            with open(path, encoding="utf-8", errors="ignore") as corpus_file:
+                yield corpus_file.read()
+
+    learned = train_merges(read_corpus(corpus_paths), int(num_merges))
+    with open(output_path, "w", encoding="utf-8") as merges_file:
+        merges_file.write("#version: 0.2\n")
+        for first, second in learned:
+            merges_file.write(f"{first} {second}\n")
+    print(f"Wrote {len(learned)} merges to {output_path}")
@@ -0,0 +1,179 @@
+import logging
+import os
+import time
+import asyncio
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+from .errors import ServiceUnavailable
+
+logger = logging.getLogger(__name__)
+
+class WorkerPoolSaturated(ServiceUnavailable):
+    """Raised when the inference queue is full"""
+
+# Engines loaded once per worker process by _init_worker
+_engines: Dict[str, Any] = {}
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _init_worker():
+    """Load the engines in a freshly started worker process"""
+    global _worker_loop
+    from .load_mistral import generator
+    from .eval_prometheus import evaluator
+
+    generator.load()
+    evaluator.load()
+    _engines["mistral"] = generator
+    _engines["prometheus"] = evaluator
+    _worker_loop = asyncio.new_event_loop()
+    logger.info(f"Inference worker {os.getpid()} ready")
+
+def _run_task(engine_name: str, method_name: str, kwargs: Dict[str, Any], memory_limit_mb: float) -> Tuple[Any, bool]:
+    """Run one engine call in a worker and report whether the worker has outgrown its memory ceiling"""
+    method = getattr(_engines[engine_name], method_name)
+    result = _worker_loop.run_until_complete(method(**kwargs))
+
+    # ru_maxrss is in kilobytes on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return result, bool(memory_limit_mb) and peak_mb > memory_limit_mb
+
+class InferenceWorkerPool:
+    """
+    Runs engine calls in separate processes so model work never blocks the event loop.
+    At most num_workers calls run at once and max_queue more may wait; beyond that
+    submit raises WorkerPoolSaturated. A crashed pool is replaced, and the pool is
+    recycled once a worker reports it has passed memory_limit_mb.
+    """
+    def __init__(
+        self,
+        num_workers: int,
+        max_queue: int = 64,
+        memory_limit_mb: float = 0.0,
+        start_method: str = "spawn"
+    ):
+        self.num_workers = max(1, num_workers)
+        self.max_queue = max(0, max_queue)
+        self.memory_limit_mb = memory_limit_mb
+        self.start_method = start_method
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.outstanding = 0
+
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.recycles = 0
+        self.avg_task_time = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["InferenceWorkerPool"]:
+        """Build the pool from INFERENCE_WORKERS, or None to run engines in-process"""
+        num_workers = int(os.getenv("INFERENCE_WORKERS", "0"))
+        if num_workers <= 0:
+            return None
+
+        return cls(
+            num_workers=num_workers,
+            max_queue=int(os.getenv("INFERENCE_QUEUE_SIZE", "64")),
+            memory_limit_mb=float(os.getenv("INFERENCE_WORKER_MEMORY_MB", "0")),
+            start_method=os.getenv("INFERENCE_WORKER_START_METHOD", "spawn")
+        )
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            logger.info(f"Starting {self.num_workers} inference workers")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=_init_worker
+            )
+        return self._executor
+
+    async def submit(self, engine_name: str, method_name: str, **kwargs) -> Any:
+        """Run engine.method(**kwargs) in a worker and await its result"""
+        if self.outstanding >= self.num_workers + self.max_queue:
+            self.rejected += 1
+            raise WorkerPoolSaturated(
+                f"Inference queue is full ({self.outstanding} requests outstanding)",
+                retry_after=self._estimated_wait()
+            )
+
+        self.outstanding += 1
+        start_time = time.monotonic()
+        executor = self.executor
+        try:
+            try:
+                result, over_limit = await self._dispatch(executor, engine_name, method_name, kwargs)
+            except BrokenProcessPool:
+                # A worker died (crash or OOM kill); replace the pool once and retry
+                if self._executor is executor:
+                    logger.error("Inference worker pool broke, restarting it")
+                    self._replace_executor()
+                    self.restarts += 1
+                executor = self.executor
+                result, over_limit = await self._dispatch(executor, engine_name, method_name, kwargs)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.outstanding -= 1
+
+        if over_limit and self._executor is executor:
+            logger.warning(f"Inference worker passed {self.memory_limit_mb:.0f}MB, recycling the pool")
+            self._replace_executor()
+            self.recycles += 1
+
+        elapsed_time = time.monotonic() - start_time
+        self.avg_task_time = elapsed_time if not self.completed else 0.9 * self.avg_task_time + 0.1 * elapsed_time
+        self.completed += 1
+        return result
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.num_workers,
+            "max_queue": self.max_queue,
+            "outstanding": self.outstanding,
+            "queued": max(0, self.outstanding - self.num_workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "recycles": self.recycles,
+            "avg_task_ms": self.avg_task_time * 1000.0
+        }
+
+    async def _dispatch(
+        self,
+        executor: ProcessPoolExecutor,
+        engine_name: str,
+        method_name: str,
+        kwargs: Dict[str, Any]
+    ) -> Tuple[Any, bool]:
+        future = executor.submit(_run_task, engine_name, method_name, kwargs, self.memory_limit_mb)
+        return await asyncio.wrap_future(future)
+
+    def _replace_executor(self):
+        """Swap in a fresh pool; work already handed to the old one finishes there"""
+        old_executor = self._executor
+        self._executor = None
+        if old_executor is not None:
+            old_executor.shutdown(wait=False)
+
+    def _estimated_wait(self) -> float:
+        """Rough seconds until a queue slot frees up"""
+        return max(1.0, self.avg_task_time * (self.outstanding / self.num_workers))
+
+# Shared by both engines; None runs them in-process
+worker_pool = InferenceWorkerPool.from_env()
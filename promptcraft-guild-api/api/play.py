@@ -0,0 +1,122 @@
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import logging
+import time
+import asyncio
+from .models.errors import ServiceUnavailable
+from .models.remote import RemoteServiceError
+from .models.load_mistral import generate_response
+from .models.eval_prometheus import evaluate_prompt
+from .models.attempts import attempt_log
+from .models.scheduler import scheduler
+from .models.similarity import with_target_similarity
+from .models import timing
+from .models.tokenizer import MAX_TEXT_CHARS
+from .mistral import GenerationResponse
+from .prometheus import EvaluationCriteria, EvaluationResponse
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+# Define models
+class PlayRequest(BaseModel):
+    prompt: str = Field(max_length=MAX_TEXT_CHARS)
+    target_output: Optional[str] = None
+    mentor_type: Optional[str] = None
+    method_type: Optional[str] = None
+    modifiers: Optional[List[str]] = None
+    temperature: float = 0.7
+    max_tokens: int = 256
+    token_limit: int = Field(default=150, ge=1)
+    criteria: Optional[EvaluationCriteria] = None
+    seed: Optional[int] = None
+    no_cache: bool = False
+    level: Optional[int] = None
+
+class PlayResponse(BaseModel):
+    generation: GenerationResponse
+    evaluation: EvaluationResponse
+    total_time: float = 0.0
+
+# Play endpoint
+@router.post("/", response_model=PlayResponse)
+async def play(request: PlayRequest, x_client_id: Optional[str] = Header(default=None)):
+    """
+    Generate a response and evaluate the prompt in a single round trip
+
+    Evaluation only looks at the prompt and the selected cards, so it runs
+    concurrently with generation instead of waiting for the output. With a
+    target_output, the output's similarity to it is added to the evaluation
+    metrics once both are done.
+
+    - prompt: The user's written prompt
+    - target_output: The expected output format or style (optional)
+    - mentor_type / method_type / modifiers: The selected cards
+    - temperature / max_tokens: Generation parameters
+    - token_limit / criteria: Evaluation parameters
+    - seed / no_cache: Reproducibility and cache control, shared by both stages
+    - level: The player's current level, stored with the attempt (optional)
+    """
+    timing.mark("parse")
+    logger.info(f"Received play request for prompt: {request.prompt[:30]}...")
+
+    start_time = time.time()
+
+    try:
+        with timing.span("engine"):
+            generation, evaluation = await asyncio.gather(
+                generate_response(
+                    prompt=request.prompt,
+                    temperature=request.temperature,
+                    max_tokens=request.max_tokens,
+                    mentor_type=request.mentor_type,
+                    method_type=request.method_type,
+                    modifiers=request.modifiers,
+                    seed=request.seed,
+                    use_cache=not request.no_cache
+                ),
+                evaluate_prompt(
+                    prompt=request.prompt,
+                    target_output=request.target_output,
+                    mentor_type=request.mentor_type,
+                    method_type=request.method_type,
+                    modifiers=request.modifiers,
+                    token_limit=request.token_limit,
+                    criteria=request.criteria.model_dump() if request.criteria else None,
+                    seed=request.seed,
+                    use_cache=not request.no_cache
+                )
+            )
+    except (ServiceUnavailable, RemoteServiceError):
+        # Handled by the app-level handlers in main.py
+        raise
+    except Exception as e:
+        logger.error(f"Error running play pipeline: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Play error: {str(e)}")
+
+    # Needs the generated output, so it runs after both calls rather than alongside them
+    evaluation = with_target_similarity(evaluation, generation["output"], request.target_output)
+
+    elapsed_time = time.time() - start_time
+    logger.info(f"Play pipeline completed in {elapsed_time:.2f}s")
+
+    attempt_log.record(
+        "play", request.prompt, request.mentor_type, request.method_type, request.modifiers,
+        player_id=scheduler.verified_client_id(x_client_id), level=request.level, output=generation["output"],
+        score=evaluation["score"], tier=evaluation.get("tier"), token_count=generation["token_count"],
+        metrics=evaluation.get("metrics"), latency=elapsed_time
+    )
+
+    # Both results are typed already, so the response is encoded without re-validating them
+    with timing.span("serialize"):
+        response = ORJSONResponse({
+            "generation": generation,
+            "evaluation": evaluation,
+            "total_time": elapsed_time
+        })
+    return response
@@ -1,10 +1,23 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Header, Request
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import logging
 import time
 import asyncio
-from .models.eval_prometheus import evaluate_prompt
+import random
+from .models.errors import ServiceUnavailable
+from .models.remote import RemoteServiceError
+from .models.eval_prometheus import evaluate_prompt, evaluate_prompts, evaluation_cache, evaluation_flight, remote
+from .models.tokenizer import count_text_tokens, MAX_TEXT_CHARS
+from .models.cascade import cascade
+from .models.drafts import DraftEditError, drafts
+from .models.scheduler import scheduler
+from .models.attempts import attempt_log
+from .models.similarity import similarity_index
+from .models.results import EvaluationResult
+from .models import timing
+from .models.simulation import SimulatedFailure, evaluation_simulator
 
 # Initialize logging
 logger = logging.getLogger(__name__)
@@ -12,6 +25,9 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter()
 
+# Most prompts scored in one batch request
+MAX_BATCH_ITEMS = 256
+
 # Define models
 class EvaluationCriteria(BaseModel):
     clarity: bool = True
@@ -20,13 +36,17 @@ class EvaluationCriteria(BaseModel):
     constraints_met: bool = True
 
 class EvaluationRequest(BaseModel):
-    prompt: str
-    target_output: Optional[str] = None
+    prompt: str = Field(max_length=MAX_TEXT_CHARS)
+    target_output: Optional[str] = Field(default=None, max_length=MAX_TEXT_CHARS)
     mentor_type: Optional[str] = None
     method_type: Optional[str] = None
     modifiers: Optional[List[str]] = None
-    token_limit: int = 150
+    token_limit: int = Field(default=150, ge=1)
     criteria: Optional[EvaluationCriteria] = None
+    seed: Optional[int] = None
+    no_cache: bool = False
+    level: Optional[int] = None
+    output: Optional[str] = Field(default=None, max_length=MAX_TEXT_CHARS)
 
 class EvaluationResponse(BaseModel):
     score: float
@@ -35,10 +55,46 @@ class EvaluationResponse(BaseModel):
     highlighted_tokens: List[str] = []
     suggestions: List[str] = []
     metrics: Dict[str, float] = {}
+    tier: str = "model"
+
+class BatchEvaluationRequest(BaseModel):
+    items: List[EvaluationRequest] = Field(max_length=MAX_BATCH_ITEMS)
+    no_cache: bool = False
+
+class BatchEvaluationItem(BaseModel):
+    index: int
+    result: Optional[EvaluationResponse] = None
+    error: Optional[str] = None
+
+class BatchEvaluationResponse(BaseModel):
+    results: List[BatchEvaluationItem]
+    succeeded: int = 0
+    failed: int = 0
+    evaluation_time: float = 0.0
+
+class DraftEdit(BaseModel):
+    start: int
+    end: int
+    text: str = Field(default="", max_length=MAX_TEXT_CHARS)
+
+class DraftRequest(BaseModel):
+    text: str = Field(default="", max_length=MAX_TEXT_CHARS)
+    mentor_type: Optional[str] = None
+    method_type: Optional[str] = None
+    modifiers: Optional[List[str]] = None
+    token_limit: int = Field(default=150, ge=1)
+
+class DraftUpdateRequest(BaseModel):
+    edits: List[DraftEdit] = []
+    version: Optional[int] = None
+    mentor_type: Optional[str] = None
+    method_type: Optional[str] = None
+    modifiers: Optional[List[str]] = None
+    token_limit: Optional[int] = Field(default=None, ge=1)
 
 # Evaluation endpoint
 @router.post("/", response_model=EvaluationResponse)
-async def evaluate(request: EvaluationRequest, background_tasks: BackgroundTasks):
+async def evaluate(request: EvaluationRequest, background_tasks: BackgroundTasks, x_client_id: Optional[str] = Header(default=None)):
     """
     Evaluate a prompt based on selected criteria using Prometheus 2
     
@@ -49,38 +105,192 @@ async def evaluate(request: EvaluationRequest, background_tasks: BackgroundTasks
     - modifiers: List of modifier constraints (e.g., ["Use Metaphor", "Token Limit"])
     - token_limit: Maximum tokens allowed (default: 150)
     - criteria: Evaluation criteria to focus on
+    - seed: Makes the result reproducible and cacheable (optional)
+    - no_cache: Skip the response cache
+    - level: The player's current level, stored with the attempt (optional)
+    - output: The generated output; with target_output, adds metrics.target_similarity (optional)
+    
+    Clear passes and failures are answered by a fast heuristic tier; the
+    response's `tier` says whether the heuristic or the model scored it.
     """
+    timing.mark("parse")
     logger.info(f"Received evaluation request for prompt: {request.prompt[:30]}...")
     
+    start_time = time.time()
+    
     try:
         # In a production environment, this would call the actual Prometheus model
         # For now, we'll use a mock implementation
-        result = await evaluate_prompt(
-            prompt=request.prompt,
-            target_output=request.target_output,
-            mentor_type=request.mentor_type,
-            method_type=request.method_type,
-            modifiers=request.modifiers,
-            token_limit=request.token_limit,
-            criteria=request.criteria.dict() if request.criteria else None
-        )
+        with timing.span("engine"):
+            result = await evaluate_prompt(
+                prompt=request.prompt,
+                target_output=request.target_output,
+                mentor_type=request.mentor_type,
+                method_type=request.method_type,
+                modifiers=request.modifiers,
+                token_limit=request.token_limit,
+                criteria=request.criteria.model_dump() if request.criteria else None,
+                seed=request.seed,
+                use_cache=not request.no_cache,
+                output=request.output
+            )
         
-        return result
+        attempt_log.record(
+            "evaluate", request.prompt, request.mentor_type, request.method_type, request.modifiers,
+            player_id=scheduler.verified_client_id(x_client_id), level=request.level, score=result["score"], tier=result.get("tier"),
+            metrics=result.get("metrics"), latency=time.time() - start_time
+        )
+        # The typed result is encoded as is rather than re-validated against EvaluationResponse
+        with timing.span("serialize"):
+            response = ORJSONResponse(result)
+        return response
+    except (ServiceUnavailable, RemoteServiceError):
+        # Handled by the app-level handlers in main.py
+        raise
     except Exception as e:
         logger.error(f"Error evaluating prompt: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Evaluation error: {str(e)}")
     
+# Batch evaluation endpoint
+@router.post("/batch", response_model=BatchEvaluationResponse)
+async def evaluate_batch(request: BatchEvaluationRequest, x_client_id: Optional[str] = Header(default=None)):
+    """
+    Evaluate many prompts in one call, e.g. to re-score a level or grade a class
+    
+    - items: EvaluationRequests to score; results are returned in the same order
+    
+    Items with both output and target_output are compared in one vectorized pass.
+    A failure on one item is reported in that item's `error` and does not fail the batch.
+    """
+    timing.mark("parse")
+    logger.info(f"Received batch evaluation request for {len(request.items)} prompts")
+    
+    start_time = time.time()
+    
+    try:
+        with timing.span("engine"):
+            outcomes = await evaluate_prompts([
+                {
+                    "prompt": item.prompt,
+                    "target_output": item.target_output,
+                    "mentor_type": item.mentor_type,
+                    "method_type": item.method_type,
+                    "modifiers": item.modifiers,
+                    "token_limit": item.token_limit,
+                    "criteria": item.criteria.model_dump() if item.criteria else None,
+                    "seed": item.seed
+                }
+                for item in request.items
+            ], use_cache=not request.no_cache, outputs=[item.output for item in request.items])
+    except (ServiceUnavailable, RemoteServiceError):
+        # Handled by the app-level handlers in main.py
+        raise
+    except Exception as e:
+        logger.error(f"Error evaluating batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Evaluation error: {str(e)}")
+    
+    results = []
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome, Exception):
+            results.append({"index": index, "result": None, "error": f"Evaluation error: {str(outcome)}"})
+        else:
+            results.append({"index": index, "result": outcome, "error": None})
+            item = request.items[index]
+            # Logged for the record, but a re-score is nobody's attempt at the level
+            attempt_log.record(
+                "rescore", item.prompt, item.mentor_type, item.method_type, item.modifiers,
+                player_id=scheduler.verified_client_id(x_client_id), level=item.level, score=outcome["score"], tier=outcome.get("tier"),
+                metrics=outcome.get("metrics")
+            )
+    
+    failed = sum(1 for outcome in outcomes if isinstance(outcome, Exception))
+    
+    with timing.span("serialize"):
+        response = ORJSONResponse({
+            "results": results,
+            "succeeded": len(outcomes) - failed,
+            "failed": failed,
+            "evaluation_time": time.time() - start_time
+        })
+    return response
+
+# Draft scoring endpoints
+@router.post("/draft")
+async def open_draft(request: DraftRequest, http_request: Request, x_client_id: Optional[str] = Header(default=None)):
+    """
+    Start live scoring for a prompt being composed
+    
+    Returns a draft_id and the draft's full state: token_count, tokens_remaining,
+    the heuristic score, constraint checks and sub-scores. Send keystrokes to
+    PATCH /draft/{draft_id}; drafts are not model calls and are not scheduled.
+    Drafts expire after DRAFT_TTL_SECONDS without edits, and a client opening
+    more than DRAFT_MAX_PER_CLIENT loses its least recently used one.
+    """
+    owner = scheduler.client_key(x_client_id, http_request.client.host if http_request.client else None)
+    draft_id, draft = drafts.create(owner=owner, **request.model_dump())
+    return {"draft_id": draft_id, **draft.delta()}
+
+@router.patch("/draft/{draft_id}")
+async def update_draft(draft_id: str, request: DraftUpdateRequest):
+    """
+    Apply text edits to a draft and return what changed
+    
+    - edits: {start, end, text} replacements in character offsets, applied in order
+    - version: The version the edits were made against; a mismatch returns 409
+    - mentor_type / method_type / modifiers / token_limit: Change the cards being checked
+    
+    The response holds the new version plus only the fields whose values changed.
+    """
+    draft = drafts.get(draft_id)
+    if draft is None:
+        raise HTTPException(status_code=404, detail=f"Draft {draft_id} not found")
+    if request.version is not None and request.version != draft.version:
+        raise HTTPException(status_code=409, detail=f"Draft is at version {draft.version}, not {request.version}")
+    
+    changed_cards = request.model_dump(include={"mentor_type", "method_type", "modifiers", "token_limit"}, exclude_unset=True)
+    if changed_cards:
+        cards = {**draft.cards(), **changed_cards}
+        cards["token_limit"] = cards["token_limit"] or draft.token_limit
+        draft.configure(**cards)
+    
+    try:
+        return drafts.update(draft, [edit.model_dump() for edit in request.edits])
+    except DraftEditError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.delete("/draft/{draft_id}")
+async def close_draft(draft_id: str):
+    """Stop tracking a draft"""
+    if not drafts.discard(draft_id):
+        raise HTTPException(status_code=404, detail=f"Draft {draft_id} not found")
+    return {"draft_id": draft_id, "closed": True}
+
+# Cache and remote statistics endpoint
+@router.get("/stats")
+async def evaluation_stats():
+    """Report how evaluation requests are being cached and forwarded"""
+    return {
+        "cache": evaluation_cache.stats(),
+        "coalescing": evaluation_flight.stats(),
+        "cascade": cascade.stats(),
+        "drafts": drafts.stats(),
+        "remote": remote.stats() if remote else None,
+        "similarity": similarity_index.stats(),
+        "simulation": evaluation_simulator.stats()
+    }
+
 # Mock evaluation endpoint for testing without model
 @router.post("/mock", response_model=EvaluationResponse)
-async def mock_evaluate(request: EvaluationRequest):
-    """Mock evaluation endpoint for testing without the Prometheus model"""
-    logger.info(f"Received mock evaluation request for prompt: {request.prompt[:30]}...")
+async def mock_evaluate(request: EvaluationRequest, x_client_id: Optional[str] = Header(default=None)):
+    """
+    Mock evaluation endpoint for testing without the Prometheus model
     
-    # Simulate processing time
-    await asyncio.sleep(1.5)
+    Response time follows the simulated serving profile configured by MOCK_EVALUATE_* settings.
+    """
+    logger.info(f"Received mock evaluation request for prompt: {request.prompt[:30]}...")
     
     # Generate mock response based on input
-    token_count = len(request.prompt.split())
+    token_count = count_text_tokens(request.prompt)
     is_over_limit = token_count > request.token_limit
     has_mentor = request.mentor_type is not None
     has_method = request.method_type is not None
@@ -100,13 +310,10 @@ async def mock_evaluate(request: EvaluationRequest):
     # Generate feedback based on score
     if score > 0.8:
         feedback = f"The Guide nods approvingly. 'Your prompt demonstrates mastery of the {request.method_type or 'chosen method'}. Well crafted!'"
-        result = "success"
     elif score > 0.5:
         feedback = f"The Guide considers your work. 'There's potential in your approach using {request.method_type or 'this method'}, but it could be refined further.'"
-        result = "success"
     else:
         feedback = f"The Guide raises an eyebrow. 'Your approach shows promise, but the constraints weren't fully addressed. Consider how your chosen {request.mentor_type or 'Mentor'} would approach this differently.'"
-        result = "failure"
     
     # Create reasoning
     reasoning_points = []
@@ -150,12 +357,28 @@ async def mock_evaluate(request: EvaluationRequest):
         "coherence": 0.8 * score,
         "constraint_adherence": 0.0 if is_over_limit else 0.9
     }
+    if request.output and request.target_output:
+        metrics["target_similarity"] = round(similarity_index.score(request.output, request.target_output), 4)
+    
+    # Simulate processing time: reading the prompt, then writing the feedback and reasoning
+    rng = random.Random(request.seed) if request.seed is not None else None
+    try:
+        await evaluation_simulator.run(token_count, count_text_tokens(f"{feedback} {reasoning}"), rng)
+    except SimulatedFailure as e:
+        logger.error(f"Error in mock evaluation: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Evaluation error: {str(e)}")
     
-    return EvaluationResponse(
+    attempt_log.record(
+        "evaluate", request.prompt, request.mentor_type, request.method_type, request.modifiers,
+        player_id=scheduler.verified_client_id(x_client_id), level=request.level, score=score, tier="mock", token_count=token_count,
+        metrics=metrics
+    )
+    return ORJSONResponse(EvaluationResult(
         score=score,
         feedback=feedback,
         reasoning=reasoning,
         highlighted_tokens=highlighted_tokens,
         suggestions=suggestions,
-        metrics=metrics
-    ) 
\ No newline at end of file
+        metrics=metrics,
+        tier="mock"
+    )) 
\ No newline at end of file
@@ -0,0 +1,91 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+import logging
+import time
+import asyncio
+from typing import Optional
+from .models import timing
+from .models.errors import ServiceUnavailable
+from .models.scheduler import FairScheduler, scheduler
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+# Routes that run model work; their /stats endpoints and live draft scoring are not scheduled
+SCHEDULED_PREFIXES = ("/api/generate", "/api/evaluate", "/api/play")
+UNSCHEDULED_PREFIXES = ("/api/evaluate/draft",)
+
+def _is_scheduled(path: str) -> bool:
+    return path.startswith(SCHEDULED_PREFIXES) and not path.startswith(UNSCHEDULED_PREFIXES) and not path.endswith("/stats")
+
+def _error_response(status_code: int, detail: str, retry_after: Optional[float] = None) -> JSONResponse:
+    headers = {"Retry-After": str(max(1, round(retry_after)))} if retry_after is not None else None
+    return JSONResponse(status_code=status_code, content={"detail": detail}, headers=headers)
+
+class SchedulerMiddleware:
+    """
+    Pure ASGI middleware that admits model requests through the fair scheduler.
+    Clients are keyed by peer address, or by X-Client-Id when
+    SCHEDULER_TRUST_CLIENT_ID is set; only set it behind a proxy that
+    overwrites the header with an authenticated identity. Clients may send
+    X-Deadline-Ms, the milliseconds they are still willing to wait.
+    Rejected requests get 429 (rate limited), 503 (overloaded) or 504 (deadline),
+    and a request still running at its deadline is cancelled.
+    """
+    def __init__(self, app, scheduler: FairScheduler = scheduler):
+        self.app = app
+        self.scheduler = scheduler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or not _is_scheduled(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        client_id = self.scheduler.client_key(headers.get("x-client-id"), scope["client"][0] if scope.get("client") else None)
+        deadline = None
+        if headers.get("x-deadline-ms"):
+            try:
+                deadline = time.monotonic() + float(headers["x-deadline-ms"]) / 1000.0
+            except ValueError:
+                await _error_response(400, "X-Deadline-Ms must be a number of milliseconds")(scope, receive, send)
+                return
+
+        try:
+            await self.scheduler.acquire(client_id, deadline)
+        except ServiceUnavailable as exc:
+            logger.warning(f"Rejected {scope['path']} for {client_id}: {str(exc)}")
+            await _error_response(exc.status_code, str(exc), exc.retry_after)(scope, receive, send)
+            return
+        timing.mark("queue")
+
+        response_started = False
+
+        async def send_tracking_start(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        start_time = time.monotonic()
+        try:
+            if deadline is None:
+                await self.app(scope, receive, send_tracking_start)
+            else:
+                await asyncio.wait_for(self.app(scope, receive, send_tracking_start), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self.scheduler.timed_out += 1
+            logger.warning(f"Cancelled {scope['path']} for {client_id} at its deadline")
+            if not response_started:
+                await _error_response(504, "Request deadline passed while running")(scope, receive, send)
+        finally:
+            self.scheduler.release(time.monotonic() - start_time)
+
+# Scheduler statistics endpoint
+@router.get("/stats")
+async def scheduler_stats():
+    """Report admission control and fair queueing counters"""
+    return scheduler.stats()
@@ -0,0 +1,388 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Dict, List, Optional
+import logging
+import asyncio
+import json
+import os
+import time
+from .models.errors import ServiceUnavailable
+from .models.remote import RemoteServiceError
+from .models.scheduler import scheduler
+from .models.tokenizer import tokenizer
+from .models.load_mistral import generate_response, stream_response, generator
+from .mistral import GenerationRequest
+from .prometheus import EvaluationRequest, DraftEdit
+from .tokenize import TokenizeRequest
+from .models.eval_prometheus import evaluate_prompt
+from .models.drafts import DraftDocument, DraftEditError, drafts
+from .models.attempts import attempt_log
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+# Requests one session may have running at once, and outgoing messages buffered before senders wait
+SESSION_MAX_IN_FLIGHT = int(os.getenv("SESSION_MAX_IN_FLIGHT", "8"))
+SESSION_SEND_QUEUE = int(os.getenv("SESSION_SEND_QUEUE", "256"))
+# How long a request holding a scheduler slot may wait for room in a full outbox before it is stopped
+SESSION_SEND_TIMEOUT_MS = float(os.getenv("SESSION_SEND_TIMEOUT_MS", "5000"))
+
+class SlowReader(Exception):
+    """Raised when a message cannot be queued in time because the client stopped reading"""
+
+# Define models
+class SessionState(BaseModel):
+    """Per-connection game state; request fields left out fall back to these"""
+    mentor_type: Optional[str] = None
+    method_type: Optional[str] = None
+    modifiers: Optional[List[str]] = None
+    target_output: Optional[str] = None
+    token_limit: int = Field(default=150, ge=1)
+    temperature: float = 0.7
+    max_tokens: int = 256
+    level: Optional[int] = None
+    last_prompt: Optional[str] = None
+
+class SessionMessage(BaseModel):
+    id: Optional[str] = None
+    type: str
+    payload: Dict[str, Any] = {}
+    deadline_ms: Optional[float] = None
+
+# Fields each request type takes from the session state
+GENERATION_DEFAULTS = ("mentor_type", "method_type", "modifiers", "temperature", "max_tokens", "level")
+EVALUATION_DEFAULTS = ("mentor_type", "method_type", "modifiers", "target_output", "token_limit", "level")
+
+# Currently connected sessions (reported in /metrics)
+active_sessions: Dict[int, "GameSession"] = {}
+
+class GameSession:
+    """
+    One player's multiplexed connection. Each request message runs as its own
+    task and answers with the same id, so results arrive as soon as they are
+    ready rather than in request order. Outgoing messages go through a bounded
+    queue drained by a single writer: a slow reader makes streaming producers
+    wait instead of buffering without limit, and at most SESSION_MAX_IN_FLIGHT
+    requests run at once. A producer holding a scheduler slot waits at most
+    SESSION_SEND_TIMEOUT_MS for room, so a client that stops reading cannot
+    keep slots from other players.
+    """
+    def __init__(self, websocket: WebSocket, client_id: str, scheduler_key: Optional[str] = None, player_id: Optional[str] = None):
+        self.websocket = websocket
+        self.client_id = client_id
+        # Who the scheduler queues and rate limits this session as
+        self.scheduler_key = scheduler_key or client_id
+        # Whose attempts these are on the leaderboards; None (anonymous) unless the client id is trusted
+        self.player_id = player_id
+        self.state = SessionState()
+        self.draft: Optional[DraftDocument] = None
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=SESSION_SEND_QUEUE)
+        self.send_timeout = SESSION_SEND_TIMEOUT_MS / 1000.0
+        self._next_id = 0
+
+        self.received = 0
+        self.sent = 0
+
+    async def run(self):
+        writer = asyncio.ensure_future(self._write())
+        try:
+            while True:
+                try:
+                    raw = await self.websocket.receive_text()
+                except WebSocketDisconnect:
+                    break
+                self.received += 1
+                await self._dispatch(raw)
+        finally:
+            tasks = list(self.tasks.values())
+            for task in tasks:
+                task.cancel()
+            # Let cancelled requests give back their scheduler slots before the connection goes away
+            await asyncio.gather(*tasks, return_exceptions=True)
+            writer.cancel()
+
+    async def send(self, message_id: Optional[str], message_type: str, payload: Any = None):
+        await self.outbox.put({"id": message_id, "type": message_type, "payload": payload})
+
+    async def send_within(self, message_id: Optional[str], message_type: str, payload: Any = None):
+        """send(), giving up with SlowReader after send_timeout; for producers holding a scheduler slot"""
+        try:
+            await asyncio.wait_for(self.send(message_id, message_type, payload), timeout=self.send_timeout)
+        except asyncio.TimeoutError:
+            raise SlowReader(f"Client did not read for {self.send_timeout:.1f}s")
+
+    def send_nowait(self, message_id: Optional[str], message_type: str, payload: Any = None):
+        """Queue a message if there is room, else drop it; for paths that must not wait on the reader"""
+        try:
+            self.outbox.put_nowait({"id": message_id, "type": message_type, "payload": payload})
+        except asyncio.QueueFull:
+            pass
+
+    async def _write(self):
+        while True:
+            message = await self.outbox.get()
+            try:
+                await self.websocket.send_text(json.dumps(message))
+            except Exception:
+                # The receive loop notices the disconnect and cleans up
+                return
+            self.sent += 1
+
+    async def _dispatch(self, raw: str):
+        try:
+            message = SessionMessage(**json.loads(raw))
+        except (ValueError, ValidationError) as e:
+            await self.send(None, "error", {"status_code": 400, "detail": f"Invalid message: {str(e)}"})
+            return
+
+        if message.id is None:
+            self._next_id += 1
+            message.id = f"s{self._next_id}"
+
+        if message.type == "ping":
+            await self.send(message.id, "pong", {"time": time.time()})
+        elif message.type == "set_state":
+            await self._set_state(message)
+        elif message.type == "get_state":
+            await self.send(message.id, "state", self.state.model_dump())
+        elif message.type == "draft":
+            await self._draft(message)
+        elif message.type == "cancel":
+            task = self.tasks.get(message.payload.get("target_id"))
+            if task is not None:
+                task.cancel()
+            await self.send(message.id, "cancelled", {"target_id": message.payload.get("target_id"), "found": task is not None})
+        elif message.type in HANDLERS:
+            if message.id in self.tasks:
+                await self.send(message.id, "error", {"status_code": 409, "detail": f"Message id {message.id} is already in flight"})
+            elif len(self.tasks) >= SESSION_MAX_IN_FLIGHT:
+                await self.send(message.id, "error", {
+                    "status_code": 429,
+                    "detail": f"Too many requests in flight ({len(self.tasks)})",
+                    "retry_after": 1
+                })
+            else:
+                task = asyncio.ensure_future(self._handle(message))
+                self.tasks[message.id] = task
+                task.add_done_callback(lambda done, message_id=message.id: self.tasks.pop(message_id, None))
+        else:
+            await self.send(message.id, "error", {"status_code": 400, "detail": f"Unknown message type: {message.type}"})
+
+    async def _set_state(self, message: SessionMessage):
+        try:
+            self.state = SessionState(**{**self.state.model_dump(), **message.payload})
+        except ValidationError as e:
+            await self.send(message.id, "error", {"status_code": 422, "detail": str(e)})
+            return
+        await self.send(message.id, "state", self.state.model_dump())
+
+    async def _draft(self, message: SessionMessage):
+        """Score the prompt being composed; handled inline so edits apply in the order they were sent"""
+        cards = {field: getattr(self.state, field) for field in ("mentor_type", "method_type", "modifiers", "token_limit")}
+        payload = message.payload
+        try:
+            if self.draft is None or "text" in payload:
+                self.draft = DraftDocument(text=payload.get("text") or "", **cards)
+                changes = self.draft.delta()
+            else:
+                if payload.get("version") is not None and payload["version"] != self.draft.version:
+                    await self.send(message.id, "error", {
+                        "status_code": 409,
+                        "detail": f"Draft is at version {self.draft.version}, not {payload['version']}"
+                    })
+                    return
+                self.draft.configure(**cards)
+                edits = [DraftEdit(**edit).model_dump() for edit in payload.get("edits") or []]
+                changes = drafts.update(self.draft, edits)
+        except (DraftEditError, ValidationError, TypeError) as e:
+            await self.send(message.id, "error", {"status_code": 422, "detail": f"Invalid draft edit: {str(e)}"})
+            return
+        self.state.last_prompt = self.draft.text
+        await self.send(message.id, "draft", changes)
+
+    def _with_defaults(self, payload: Dict[str, Any], fields) -> Dict[str, Any]:
+        merged = {field: getattr(self.state, field) for field in fields}
+        merged.update(payload)
+        return merged
+
+    async def _handle(self, message: SessionMessage):
+        """Run one request through the scheduler and report its result or error under its id"""
+        try:
+            reply_type, reply = await self._run(message)
+        except asyncio.CancelledError:
+            # Never wait on a full outbox here: the reader may be gone, and cancellation must finish
+            self.send_nowait(message.id, "error", {"status_code": 499, "detail": "Cancelled"})
+            raise
+        except SlowReader as e:
+            logger.warning(f"Stopped session {message.type} for {self.client_id}: {str(e)}")
+            self.send_nowait(message.id, "error", {"status_code": 408, "detail": str(e)})
+            return
+        except asyncio.TimeoutError:
+            reply_type, reply = "error", {"status_code": 504, "detail": "Request deadline passed while running"}
+        except ValidationError as e:
+            reply_type, reply = "error", {"status_code": 422, "detail": str(e)}
+        except ServiceUnavailable as e:
+            reply_type, reply = "error", {"status_code": e.status_code, "detail": str(e), "retry_after": e.retry_after}
+        except RemoteServiceError as e:
+            reply_type, reply = "error", {"status_code": e.status_code, "detail": str(e)}
+        except Exception as e:
+            logger.error(f"Error handling session {message.type}: {str(e)}")
+            reply_type, reply = "error", {"status_code": 500, "detail": f"{message.type} error: {str(e)}"}
+        await self.send(message.id, reply_type, reply)
+
+    async def _run(self, message: SessionMessage):
+        """Run the handler holding a scheduler slot, released before its reply is queued behind a slow reader"""
+        handler = HANDLERS[message.type]
+        deadline = time.monotonic() + message.deadline_ms / 1000.0 if message.deadline_ms is not None else None
+        acquired = False
+        start_time = time.monotonic()
+        try:
+            if handler.scheduled:
+                await scheduler.acquire(self.scheduler_key, deadline)
+                acquired = True
+            work = handler(self, message)
+            if deadline is not None:
+                return await asyncio.wait_for(work, timeout=max(0.0, deadline - time.monotonic()))
+            return await work
+        finally:
+            if acquired:
+                scheduler.release(time.monotonic() - start_time)
+
+# Handlers return their final (message type, payload); _handle sends it once the scheduler slot is free
+def _handler(scheduled: bool):
+    def register(function):
+        function.scheduled = scheduled
+        return function
+    return register
+
+@_handler(scheduled=True)
+async def _generate(session: GameSession, message: SessionMessage):
+    request = GenerationRequest(**session._with_defaults(message.payload, GENERATION_DEFAULTS))
+    session.state.last_prompt = request.prompt
+    result = await generate_response(
+        prompt=request.prompt,
+        temperature=request.temperature,
+        max_tokens=request.max_tokens,
+        mentor_type=request.mentor_type,
+        method_type=request.method_type,
+        modifiers=request.modifiers,
+        seed=request.seed,
+        use_cache=not request.no_cache
+    )
+    attempt_log.record(
+        "generate", request.prompt, request.mentor_type, request.method_type, request.modifiers,
+        player_id=session.player_id, level=request.level, output=result["output"],
+        token_count=result["token_count"], latency=result.get("generation_time")
+    )
+    return "result", result
+
+@_handler(scheduled=True)
+async def _evaluate(session: GameSession, message: SessionMessage):
+    request = EvaluationRequest(**session._with_defaults(message.payload, EVALUATION_DEFAULTS))
+    session.state.last_prompt = request.prompt
+    start_time = time.time()
+    result = await evaluate_prompt(
+        prompt=request.prompt,
+        target_output=request.target_output,
+        mentor_type=request.mentor_type,
+        method_type=request.method_type,
+        modifiers=request.modifiers,
+        token_limit=request.token_limit,
+        criteria=request.criteria.model_dump() if request.criteria else None,
+        seed=request.seed,
+        use_cache=not request.no_cache,
+        output=request.output
+    )
+    attempt_log.record(
+        "evaluate", request.prompt, request.mentor_type, request.method_type, request.modifiers,
+        player_id=session.player_id, level=request.level, score=result["score"], tier=result.get("tier"),
+        metrics=result.get("metrics"), latency=time.time() - start_time
+    )
+    return "result", result
+
+@_handler(scheduled=True)
+async def _stream(session: GameSession, message: SessionMessage):
+    request = GenerationRequest(**session._with_defaults(message.payload, GENERATION_DEFAULTS))
+    session.state.last_prompt = request.prompt
+    start_time = time.time()
+    time_to_first_token = None
+    token_count = 0
+    async for token in stream_response(
+        prompt=request.prompt,
+        temperature=request.temperature,
+        max_tokens=request.max_tokens,
+        mentor_type=request.mentor_type,
+        method_type=request.method_type,
+        modifiers=request.modifiers,
+        seed=request.seed
+    ):
+        if time_to_first_token is None:
+            time_to_first_token = time.time() - start_time
+        # Waits here when the client is not keeping up, and gives up the slot if it stops reading
+        await session.send_within(message.id, "token", {"index": token_count, "token": token})
+        token_count += 1
+    return "done", {
+        "token_count": token_count,
+        "time_to_first_token": time_to_first_token or 0.0,
+        "generation_time": time.time() - start_time,
+        "model_used": generator.model_name
+    }
+
+@_handler(scheduled=False)
+async def _tokenize(session: GameSession, message: SessionMessage):
+    request = TokenizeRequest(**message.payload)
+    texts = ([request.text] if request.text is not None else []) + (request.texts or [])
+    if not texts:
+        return "error", {"status_code": 400, "detail": "Provide text or texts to tokenize"}
+    counts = tokenizer.count_tokens(texts)
+    return "result", {
+        "counts": counts,
+        "total": sum(counts),
+        "tokens": [tokenizer.tokenize(text) for text in texts] if request.include_tokens else None
+    }
+
+HANDLERS = {
+    "generate": _generate,
+    "evaluate": _evaluate,
+    "stream": _stream,
+    "tokenize": _tokenize
+}
+
+# Game session endpoint
+@router.websocket("/ws/session")
+async def game_session(websocket: WebSocket, client_id: Optional[str] = None):
+    """
+    Multiplex generate, evaluate, tokenize and streaming requests over one connection
+
+    Client messages are JSON objects: {"id", "type", "payload", "deadline_ms"}.
+    - generate / evaluate / tokenize: answered with a "result" message
+    - stream: answered with "token" messages and a final "done" message
+    - set_state / get_state: update or read the session's cards, target and
+      generation settings, which fill in any fields a request leaves out
+    - draft: live scoring of the prompt being typed. payload.text starts a draft,
+      payload.edits ({start, end, text}) update it; answered with a "draft"
+      message holding only what changed
+    - cancel: stop the request whose id is payload.target_id
+    - ping: answered with "pong"
+    Every reply carries the id of the message it answers; failures come back as
+    "error" messages with an HTTP-style status_code.
+    """
+    await websocket.accept()
+    peer = websocket.client.host if websocket.client else None
+    session = GameSession(
+        websocket,
+        client_id or peer or "anonymous",
+        scheduler.client_key(client_id, peer),
+        scheduler.verified_client_id(client_id)
+    )
+    active_sessions[id(session)] = session
+    logger.info(f"Game session opened for {session.client_id}")
+    try:
+        await session.run()
+    finally:
+        del active_sessions[id(session)]
+        logger.info(f"Game session closed for {session.client_id} after {session.received} messages")
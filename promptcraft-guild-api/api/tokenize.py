@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Optional
+import logging
+from .models.tokenizer import tokenizer, MAX_TEXT_CHARS
+
+# Initialize logging
+logger = logging.getLogger(__name__)
+
+# Create router
+router = APIRouter()
+
+# Most strings counted in one request
+MAX_TEXTS = 256
+
+# Define models
+class TokenizeRequest(BaseModel):
+    text: Optional[str] = Field(default=None, max_length=MAX_TEXT_CHARS)
+    texts: Optional[List[Annotated[str, Field(max_length=MAX_TEXT_CHARS)]]] = Field(default=None, max_length=MAX_TEXTS)
+    include_tokens: bool = False
+
+class TokenizeResponse(BaseModel):
+    counts: List[int]
+    total: int
+    tokens: Optional[List[List[str]]] = None
+
+# Tokenize endpoint
+@router.post("/", response_model=TokenizeResponse)
+async def tokenize(request: TokenizeRequest):
+    """
+    Count tokens with the same BPE tokenizer the engines use, without touching a model
+    
+    - text: A single string to count
+    - texts: A batch of strings to count (counted after `text` if both are given)
+    - include_tokens: Also return the token pieces for each string
+    """
+    texts = ([request.text] if request.text is not None else []) + (request.texts or [])
+    if not texts:
+        raise HTTPException(status_code=400, detail="Provide text or texts to tokenize")
+    
+    counts = tokenizer.count_tokens(texts)
+    
+    return {
+        "counts": counts,
+        "total": sum(counts),
+        "tokens": [tokenizer.tokenize(text) for text in texts] if request.include_tokens else None
+    }
+
+# Tokenizer statistics endpoint
+@router.get("/stats")
+async def tokenize_stats():
+    """Report tokenizer cache occupancy and hit counters"""
+    return tokenizer.stats()
@@ -0,0 +1 @@
+"""Load-testing harness for the API (run with python -m benchmarks.run)"""
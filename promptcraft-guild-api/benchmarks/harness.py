@@ -0,0 +1,200 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+PROMPTS = (
+    "Explain how photosynthesis turns sunlight into chemical energy.",
+    "Describe the causes of the French Revolution in a few sentences.",
+    "How would you design a city that adapts to rising sea levels?",
+    "What makes a good mentor, and how can one become one?",
+    "Summarize the trade-offs between renewable and nuclear energy.",
+    "Write a short pitch for a bicycle that never needs maintenance.",
+    "Why do some civilizations collapse while others endure?",
+    "Outline a plan to learn a new language in six months."
+)
+MENTORS = (None, "The Archivist", "The Sage", "The Guide", "The Inventor", "The Storyteller")
+METHODS = (None, "SCAMPER", "First Principles", "Chain-of-Thought", "SWOT Analysis", "Socratic Method")
+MODIFIERS = ("Token Limit", "Use Metaphor", "Concrete Examples", "Data Driven", "Opposing Views")
+
+def generation_payload(rng: random.Random, seeded: bool) -> Dict[str, Any]:
+    return {
+        "prompt": rng.choice(PROMPTS),
+        "temperature": round(rng.uniform(0.2, 1.0), 2),
+        "max_tokens": rng.choice((64, 128, 256)),
+        "mentor_type": rng.choice(MENTORS),
+        "method_type": rng.choice(METHODS),
+        "modifiers": rng.sample(MODIFIERS, rng.randint(0, 2)),
+        "seed": rng.randint(0, 3) if seeded else None
+    }
+
+def evaluation_payload(rng: random.Random, seeded: bool) -> Dict[str, Any]:
+    return {
+        "prompt": rng.choice(PROMPTS),
+        "mentor_type": rng.choice(MENTORS),
+        "method_type": rng.choice(METHODS),
+        "modifiers": rng.sample(MODIFIERS, rng.randint(0, 2)),
+        "token_limit": 150,
+        "seed": rng.randint(0, 3) if seeded else None
+    }
+
+@dataclass(frozen=True)
+class Scenario:
+    """One endpoint to drive and how to build its request bodies"""
+    name: str
+    path: str
+    payload: Callable[[random.Random, bool], Dict[str, Any]]
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario for scenario in (
+        Scenario("generate", "/api/generate/", generation_payload),
+        Scenario("evaluate", "/api/evaluate/", evaluation_payload),
+        Scenario("generate_mock", "/api/generate/mock", generation_payload),
+        Scenario("evaluate_mock", "/api/evaluate/mock", evaluation_payload)
+    )
+}
+
+@dataclass
+class LoadConfig:
+    """
+    How hard to drive a scenario. Without a rate the run is closed-loop:
+    `concurrency` clients send back to back. With a rate (requests/second)
+    arrivals follow a Poisson process, capped at `concurrency` in flight, and
+    latency is measured from each request's scheduled arrival so queueing
+    delay is not hidden.
+    """
+    requests: int = 200
+    concurrency: int = 16
+    rate: Optional[float] = None
+    warmup: int = 10
+    seeded: bool = False
+    timeout: float = 60.0
+    random_seed: int = 42
+    # Requests rotate through this many X-Client-Id values, like distinct players
+    clients: int = 1000
+
+@dataclass
+class RunResult:
+    latencies: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=dict)
+    wall_time: float = 0.0
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(result: RunResult) -> Dict[str, Any]:
+    """Reduce a run to the figures we track: latency percentiles (ms), throughput and error rate"""
+    latencies = sorted(result.latencies)
+    failed = sum(result.errors.values())
+    total = len(latencies) + failed
+    return {
+        "requests": total,
+        "succeeded": len(latencies),
+        "failed": failed,
+        "errors": dict(result.errors),
+        "error_rate": failed / total if total else 0.0,
+        "throughput_rps": len(latencies) / result.wall_time if result.wall_time else 0.0,
+        "latency_ms": {
+            "mean": 1000.0 * sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50": 1000.0 * percentile(latencies, 0.50),
+            "p95": 1000.0 * percentile(latencies, 0.95),
+            "p99": 1000.0 * percentile(latencies, 0.99),
+            "max": 1000.0 * latencies[-1] if latencies else 0.0
+        },
+        "wall_time": result.wall_time
+    }
+
+async def _send(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    payload: Dict[str, Any],
+    client_id: str,
+    result: RunResult,
+    started: float
+):
+    try:
+        response = await client.post(scenario.path, json=payload, headers={"X-Client-Id": client_id})
+        if response.status_code >= 400:
+            key = str(response.status_code)
+            result.errors[key] = result.errors.get(key, 0) + 1
+            return
+    except Exception as e:
+        key = type(e).__name__
+        result.errors[key] = result.errors.get(key, 0) + 1
+        return
+    result.latencies.append(time.perf_counter() - started)
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, config: LoadConfig) -> RunResult:
+    """Drive one scenario and collect per-request latencies and error counts"""
+    rng = random.Random(config.random_seed)
+    payloads = [
+        (scenario.payload(rng, config.seeded), f"bench-{index % max(1, config.clients)}")
+        for index in range(config.warmup + config.requests)
+    ]
+
+    # Warm caches, pools and lazy loads without recording
+    discard = RunResult()
+    for payload, client_id in payloads[:config.warmup]:
+        await _send(client, scenario, payload, client_id, discard, time.perf_counter())
+    payloads = payloads[config.warmup:]
+
+    result = RunResult()
+    slots = asyncio.Semaphore(max(1, config.concurrency))
+    start_time = time.perf_counter()
+
+    if config.rate:
+        async def arrival(payload: Dict[str, Any], client_id: str, scheduled: float):
+            async with slots:
+                await _send(client, scenario, payload, client_id, result, scheduled)
+
+        tasks = []
+        next_arrival = start_time
+        for payload, client_id in payloads:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(arrival(payload, client_id, next_arrival)))
+            next_arrival += rng.expovariate(config.rate)
+        await asyncio.gather(*tasks)
+    else:
+        queue = list(reversed(payloads))
+
+        async def client_loop():
+            while queue:
+                payload, client_id = queue.pop()
+                await _send(client, scenario, payload, client_id, result, time.perf_counter())
+
+        await asyncio.gather(*(client_loop() for _ in range(max(1, config.concurrency))))
+
+    result.wall_time = time.perf_counter() - start_time
+    return result
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """
+    List regressions against a baseline: p50/p95/p99 or throughput worse by more
+    than `threshold` (a fraction), or an error rate more than one point higher.
+    """
+    regressions = []
+    for name, expected in baseline.items():
+        actual = results.get(name)
+        if actual is None:
+            continue
+        for quantile in ("p50", "p95", "p99"):
+            before = expected["latency_ms"][quantile]
+            after = actual["latency_ms"][quantile]
+            if before > 0 and after > before * (1.0 + threshold):
+                regressions.append(f"{name}: {quantile} {after:.1f}ms vs baseline {before:.1f}ms")
+        before = expected["throughput_rps"]
+        after = actual["throughput_rps"]
+        if before > 0 and after < before * (1.0 - threshold):
+            regressions.append(f"{name}: throughput {after:.1f} rps vs baseline {before:.1f} rps")
+        if actual["error_rate"] > expected["error_rate"] + 0.01:
+            regressions.append(f"{name}: error rate {actual['error_rate']:.2%} vs baseline {expected['error_rate']:.2%}")
+    return regressions
@@ -0,0 +1,129 @@
+"""
+Benchmark the generate/evaluate endpoints.
+
+    python -m benchmarks.run                              # in-process, all non-mock scenarios
+    python -m benchmarks.run --url http://localhost:8000  # against a running server
+    python -m benchmarks.run --scenarios generate_mock --requests 50 --concurrency 50
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.25
+
+Results are written as JSON; with --baseline the run exits non-zero when any
+scenario regresses past the threshold. Use --save-baseline to record a new one.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Any
+
+import httpx
+
+from .harness import SCENARIOS, LoadConfig, compare, run_scenario, summarize
+
+DEFAULT_SCENARIOS = ("generate", "evaluate")
+
+@asynccontextmanager
+async def open_client(url: str, timeout: float) -> AsyncIterator[httpx.AsyncClient]:
+    """A client for a live server, or one wired straight into the app with its lifespan running"""
+    limits = httpx.Limits(max_connections=1000, max_keepalive_connections=1000)
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+            yield client
+        return
+
+    # A fresh attempt log unless one is configured: replaying earlier runs' attempts at
+    # startup would compete with the measured load and slow every run more than the last
+    with tempfile.TemporaryDirectory() as log_dir:
+        os.environ.setdefault("ATTEMPT_LOG_PATH", os.path.join(log_dir, "attempts.db"))
+        from api.main import app
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=timeout) as client:
+                yield client
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    config = LoadConfig(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        warmup=args.warmup,
+        seeded=args.seeded,
+        timeout=args.timeout,
+        clients=args.clients
+    )
+    results = {}
+    async with open_client(args.url, config.timeout) as client:
+        for name in args.scenarios:
+            outcome = summarize(await run_scenario(client, SCENARIOS[name], config))
+            results[name] = outcome
+            latency = outcome["latency_ms"]
+            print(
+                f"{name:<14} p50 {latency['p50']:8.1f}ms  p95 {latency['p95']:8.1f}ms  p99 {latency['p99']:8.1f}ms  "
+                f"{outcome['throughput_rps']:8.1f} rps  errors {outcome['error_rate']:.1%}"
+            )
+    return results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load-test the generate/evaluate endpoints")
+    parser.add_argument("--url", default="", help="Base URL of a running server (default: in-process)")
+    parser.add_argument("--scenarios", nargs="+", default=list(DEFAULT_SCENARIOS), choices=sorted(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight")
+    parser.add_argument("--rate", type=float, default=None, help="Open-loop arrival rate in requests/second")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests sent first")
+    parser.add_argument("--clients", type=int, default=1000, help="Distinct X-Client-Id values to spread requests over")
+    parser.add_argument("--seeded", action="store_true", help="Send seeded requests so the response cache is exercised")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", default="benchmark-results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed regression as a fraction (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to --baseline instead of comparing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # api.main configures INFO logging on import; keep benchmark output readable
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = asyncio.run(run(args))
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "target": args.url or "in-process",
+        "python": platform.python_version(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "clients": args.clients,
+            "seeded": args.seeded
+        },
+        "scenarios": results
+    }
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Wrote results to {args.output}")
+
+    if not args.baseline:
+        return 0
+    if args.save_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = compare(results, baseline["scenarios"], args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} of {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
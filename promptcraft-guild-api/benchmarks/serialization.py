@@ -0,0 +1,108 @@
+"""
+Micro-benchmark of the response serialization path.
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --iterations 20000 --batch-size 64
+
+For generation, evaluation and batch payloads built by the real engines, this
+measures the CPU per response of FastAPI's default path for a route with a
+response_model (validate the returned dict against the model, dump it back
+out, encode with json.dumps) against returning the engine's typed result as an
+ORJSONResponse, then the cost and size of compressing the encoded body.
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api.compression import _Encoder, ENCODINGS
+from api.mistral import GenerationResponse
+from api.prometheus import BatchEvaluationResponse, EvaluationResponse
+from api.models.load_mistral import generator
+from api.models.eval_prometheus import evaluator
+
+from .harness import PROMPTS, MENTORS, METHODS, MODIFIERS
+
+def build_payloads(batch_size: int) -> Dict[str, Tuple[Any, Any]]:
+    """One representative payload per route kind, with the response model FastAPI would validate it against"""
+    generation = asyncio.run(generator.generate(
+        prompt=PROMPTS[0], mentor_type=MENTORS[1], method_type=METHODS[3], modifiers=list(MODIFIERS[1:3]), seed=1
+    ))
+    evaluations = asyncio.run(evaluator.evaluate_many([
+        {
+            "prompt": PROMPTS[index % len(PROMPTS)],
+            "mentor_type": MENTORS[1 + index % (len(MENTORS) - 1)],
+            "method_type": METHODS[1 + index % (len(METHODS) - 1)],
+            "modifiers": list(MODIFIERS[:1 + index % 3]),
+            "seed": index
+        }
+        for index in range(batch_size)
+    ]))
+    batch = {
+        "results": [{"index": index, "result": result, "error": None} for index, result in enumerate(evaluations)],
+        "succeeded": len(evaluations),
+        "failed": 0,
+        "evaluation_time": 0.01
+    }
+    return {
+        "generate": (generation, GenerationResponse),
+        "evaluate": (evaluations[0], EvaluationResponse),
+        f"batch[{batch_size}]": (batch, BatchEvaluationResponse)
+    }
+
+def run_inline(coroutine) -> Any:
+    """Finish a coroutine that never suspends (serialize_response does not, for async routes) without an event loop"""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("coroutine suspended")
+
+def cpu_per_call(function: Callable[[], Any], iterations: int) -> float:
+    """Process CPU time per call, in microseconds"""
+    function()
+    start_time = time.process_time()
+    for _ in range(iterations):
+        function()
+    return (time.process_time() - start_time) / iterations * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the default and fast response serialization paths")
+    parser.add_argument("--iterations", type=int, default=5000, help="Responses encoded per measurement")
+    parser.add_argument("--batch-size", type=int, default=32, help="Items in the batch evaluation payload")
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.batch_size)
+
+    print(f"{'payload':<12} {'bytes':>7} {'default us':>11} {'orjson us':>10} {'saved us':>9} {'speedup':>8}")
+    bodies: List[Tuple[str, bytes]] = []
+    for name, (content, model) in payloads.items():
+        field = create_response_field(name=f"Response_{name}", type_=model)
+
+        def default_path():
+            serialized = run_inline(serialize_response(field=field, response_content=content))
+            return JSONResponse(serialized).body
+
+        def fast_path():
+            return ORJSONResponse(content).body
+
+        default_us = cpu_per_call(default_path, max(1, args.iterations // 10) if name.startswith("batch") else args.iterations)
+        fast_us = cpu_per_call(fast_path, args.iterations)
+        body = fast_path()
+        bodies.append((name, body))
+        print(f"{name:<12} {len(body):>7} {default_us:>11.1f} {fast_us:>10.1f} {default_us - fast_us:>9.1f} {default_us / fast_us:>7.1f}x")
+
+    print()
+    print(f"{'payload':<12} {'encoding':>8} {'bytes':>7} {'ratio':>6} {'us':>8}")
+    for name, body in bodies:
+        for encoding in ENCODINGS:
+            compressed = _Encoder(encoding, 6, 4).compress(body, final=True)
+            compress_us = cpu_per_call(lambda: _Encoder(encoding, 6, 4).compress(body, final=True), max(1, args.iterations // 10))
+            print(f"{name:<12} {encoding:>8} {len(compressed):>7} {len(body) / len(compressed):>5.1f}x {compress_us:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import asyncio
+
+from api.models import analytics
+from api.models.analytics import OTHER_CARD, AnalyticsRollups
+from api.models.attempts import AttemptLog
+
+def observe(rollups, player_id="p1", level=1, mentor_type="The Sage", method_type="SCAMPER", modifiers=None, score=0.7, tier="model"):
+    rollups.observe(1.0, player_id, level, mentor_type, method_type, modifiers or [], score, {"clarity": score}, tier)
+
+def test_card_names_with_separators_are_summarized():
+    rollups = AnalyticsRollups()
+    observe(rollups, mentor_type="Wise|Sage", modifiers=["a+b", "Use Metaphor"])
+    summaries = rollups.combination_summaries()
+    assert len(summaries) == 1
+    assert summaries[0]["mentor_type"] == OTHER_CARD
+    assert summaries[0]["modifiers"] == sorted([OTHER_CARD, "Use Metaphor"])
+
+def test_unknown_cards_share_one_bucket():
+    rollups = AnalyticsRollups()
+    for index in range(50):
+        observe(rollups, mentor_type=f"mentor {index}", modifiers=[f"modifier {index}"] * 3)
+    assert len(rollups.combinations) == 1
+    assert rollups.combination("anything", "SCAMPER", ["whatever"])["attempts"] == 50
+
+def test_modifier_order_and_duplicates_do_not_split_combinations():
+    rollups = AnalyticsRollups()
+    observe(rollups, modifiers=["Use Metaphor", "Token Limit"])
+    observe(rollups, modifiers=["Token Limit", "Use Metaphor", "Token Limit"])
+    assert rollups.combination("The Sage", "SCAMPER", ["Token Limit", "Use Metaphor"])["attempts"] == 2
+
+def test_levels_out_of_range_are_not_ranked():
+    rollups = AnalyticsRollups(max_level=10)
+    for level in (11, 10 ** 9, -1):
+        observe(rollups, level=level)
+    observe(rollups, level=3)
+    assert set(rollups.level_boards) == {3}
+    assert rollups.stats()["attempts"] == 4
+
+def test_mock_tier_is_ignored():
+    rollups = AnalyticsRollups()
+    observe(rollups, score=1.0, tier="mock")
+    assert rollups.stats()["attempts"] == 0
+    assert rollups.streak_leaderboard()["entries"] == []
+
+def test_rebuild_replays_cards_and_skips_mock(tmp_path):
+    path = str(tmp_path / "attempts.db")
+
+    async def write():
+        log = AttemptLog(path=path)
+        await log.start()
+        log.record("evaluate", "p", "Wise|Sage", None, ["a+b"], player_id="p1", level=1, score=0.9, tier="model")
+        log.record("evaluate", "p", "The Sage", None, None, player_id="p1", level=1, score=0.9, tier="mock")
+        await log.close()
+
+    asyncio.run(write())
+    rollups = AnalyticsRollups()
+    asyncio.run(rollups.rebuild(path, float("inf")))
+    assert rollups.rebuilt == 1
+    [summary] = rollups.combination_summaries()
+    assert (summary["mentor_type"], summary["modifiers"]) == (OTHER_CARD, [OTHER_CARD])
+
+def test_rebuild_skips_rescores(tmp_path):
+    path = str(tmp_path / "attempts.db")
+
+    async def write():
+        log = AttemptLog(path=path)
+        await log.start()
+        log.record("rescore", "p", "The Sage", None, None, player_id="p1", level=1, score=0.9, tier="model")
+        log.record("evaluate", "p", "The Sage", None, None, player_id="p1", level=1, score=0.8, tier="model")
+        await log.close()
+
+    asyncio.run(write())
+    rollups = AnalyticsRollups()
+    asyncio.run(rollups.rebuild(path, float("inf")))
+    assert rollups.rebuilt == 1
+
+def test_rebuild_lets_requests_run_between_slices(tmp_path, monkeypatch):
+    path = str(tmp_path / "attempts.db")
+
+    async def write():
+        log = AttemptLog(path=path)
+        await log.start()
+        for index in range(100):
+            log.record("evaluate", "p", "The Sage", None, None, player_id=f"p{index}", level=1, score=0.7, tier="model")
+        await log.close()
+
+    async def rebuild():
+        rollups = AnalyticsRollups()
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticker = asyncio.ensure_future(tick())
+        await asyncio.sleep(0)
+        await rollups.rebuild(path, float("inf"))
+        ticker.cancel()
+        assert rollups.rebuilt == 100
+        return ticks
+
+    asyncio.run(write())
+    monkeypatch.setattr(analytics, "REBUILD_SLICE", 10)
+    assert asyncio.run(rebuild()) >= 10
@@ -0,0 +1,74 @@
+import asyncio
+import sqlite3
+
+from fastapi.testclient import TestClient
+
+from api import prometheus
+from api.main import app
+from api.models.attempts import AttemptLog
+from api.models.scheduler import FairScheduler
+
+def rows(path, query="SELECT kind, player_id, score FROM attempts ORDER BY id"):
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute(query).fetchall()
+    finally:
+        connection.close()
+
+def test_queued_attempts_are_flushed_in_batches(tmp_path):
+    path = str(tmp_path / "attempts.db")
+
+    async def run():
+        log = AttemptLog(path=path, batch_size=2, flush_interval_ms=10)
+        await log.start()
+        for index in range(5):
+            assert log.record("evaluate", f"prompt {index}", player_id="p1", score=0.5)
+        await asyncio.sleep(0.2)
+        assert log.written == 5
+        assert log.stats()["queued"] == 0
+        log.record("generate", "last")
+        await log.close()
+        assert log.written == 6
+
+    asyncio.run(run())
+    assert len(rows(path)) == 6
+
+def test_unstarted_log_does_not_queue(tmp_path):
+    log = AttemptLog(path=str(tmp_path / "attempts.db"))
+    assert not log.record("evaluate", "prompt", score=0.5)
+    assert log.stats()["queued"] == 0
+    assert log.unstarted == 1
+
+def test_rescores_are_logged_but_not_ranked(tmp_path):
+    seen = []
+    path = str(tmp_path / "attempts.db")
+
+    async def run():
+        log = AttemptLog(path=path)
+        log.add_listener(lambda *attempt: seen.append(attempt))
+        await log.start()
+        log.record("rescore", "prompt", player_id="p1", score=0.9)
+        log.record("evaluate", "prompt", player_id="p1", score=0.9)
+        await log.close()
+
+    asyncio.run(run())
+    assert len(seen) == 1
+    assert [kind for kind, _, _ in rows(path)] == ["rescore", "evaluate"]
+
+def test_player_id_is_only_taken_from_a_trusted_client_id():
+    assert FairScheduler().verified_client_id("mallory") is None
+    assert FairScheduler(trust_client_id=True).verified_client_id("alice") == "alice"
+    assert FairScheduler(trust_client_id=True).verified_client_id(None) is None
+
+def test_untrusted_client_id_is_logged_as_anonymous(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(prometheus.attempt_log, "record", lambda *args, **kwargs: recorded.append(kwargs))
+    monkeypatch.setattr(prometheus.scheduler, "trust_client_id", False)
+    client = TestClient(app)
+    response = client.post(
+        "/api/evaluate/mock",
+        json={"prompt": "Explain photosynthesis to a child", "token_limit": 150},
+        headers={"X-Client-Id": "someone-else"}
+    )
+    assert response.status_code == 200
+    assert recorded[-1]["player_id"] is None
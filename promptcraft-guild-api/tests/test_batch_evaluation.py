@@ -0,0 +1,40 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.models import eval_prometheus
+from api.models.eval_prometheus import PrometheusEvaluator
+
+client = TestClient(app)
+
+def fail_on(evaluator, monkeypatch, bad_prompt):
+    evaluate_one = evaluator._evaluate_one
+
+    def flaky(prompt, **kwargs):
+        if prompt == bad_prompt:
+            raise ValueError("unreadable prompt")
+        return evaluate_one(prompt=prompt, **kwargs)
+
+    monkeypatch.setattr(evaluator, "_evaluate_one", flaky)
+
+def test_evaluate_many_keeps_order_and_isolates_failures(monkeypatch):
+    evaluator = PrometheusEvaluator()
+    fail_on(evaluator, monkeypatch, "bad")
+    prompts = ["Explain tides", "bad", "Describe a volcano in the voice of a pirate"]
+    results = asyncio.run(evaluator.evaluate_many([{"prompt": prompt, "seed": 1} for prompt in prompts]))
+    assert isinstance(results[1], ValueError)
+    for prompt, result in zip(prompts[::2], results[::2]):
+        assert result == evaluator._evaluate_one(prompt=prompt, token_count=evaluator.count_tokens([prompt])[0], seed=1)
+
+def test_batch_endpoint_reports_item_errors_in_place(monkeypatch):
+    fail_on(eval_prometheus.evaluator, monkeypatch, "bad")
+    items = [{"prompt": "Explain tides"}, {"prompt": "bad"}, {"prompt": "Describe a volcano"}]
+    response = client.post("/api/evaluate/batch", json={"items": items, "no_cache": True})
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["index"] for result in body["results"]] == [0, 1, 2]
+    assert (body["succeeded"], body["failed"]) == (2, 1)
+    assert body["results"][1]["result"] is None
+    assert "unreadable prompt" in body["results"][1]["error"]
+    assert body["results"][0]["error"] is None and body["results"][2]["result"]["score"] >= 0.0
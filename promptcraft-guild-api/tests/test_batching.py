@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from api.models.batching import MicroBatcher
+
+def test_results_go_back_to_their_callers_in_order():
+    batches = []
+
+    async def run_batch(items):
+        batches.append([item["value"] for item in items])
+        return [item["value"] * 10 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(value=value) for value in range(6)))
+        assert results == [value * 10 for value in range(6)]
+        assert batches == [[0, 1, 2, 3], [4, 5]]
+        assert batcher.stats()["max_observed_batch_size"] == 4
+
+    asyncio.run(run())
+
+def test_an_item_error_fails_only_its_caller():
+    async def run_batch(items):
+        return [ValueError(item["value"]) if item["value"] == 1 else item["value"] for item in items]
+
+    async def run():
+        batcher = MicroBatcher(run_batch, max_batch_size=3, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(value=value) for value in range(3)), return_exceptions=True)
+        assert results[0] == 0 and results[2] == 2
+        assert isinstance(results[1], ValueError)
+
+    asyncio.run(run())
+
+def test_a_failed_batch_fails_every_caller_and_the_next_batch_still_runs():
+    calls = []
+
+    async def run_batch(items):
+        calls.append(len(items))
+        if len(calls) == 1:
+            raise RuntimeError("engine crashed")
+        return [item["value"] for item in items]
+
+    async def run():
+        batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait_ms=50)
+        results = await asyncio.gather(batcher.submit(value=1), batcher.submit(value=2), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert await batcher.submit(value=3) == 3
+
+    asyncio.run(run())
+
+def test_a_partial_batch_is_dispatched_after_the_wait():
+    async def run_batch(items):
+        return [item["value"] for item in items]
+
+    async def run():
+        batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait_ms=5)
+        assert await asyncio.wait_for(batcher.submit(value=1), timeout=1.0) == 1
+        assert batcher.stats()["last_batch_size"] == 1
+
+    asyncio.run(run())
+
+def test_cancelled_callers_are_not_computed():
+    seen = []
+
+    async def run_batch(items):
+        seen.extend(item["value"] for item in items)
+        return [item["value"] for item in items]
+
+    async def run():
+        batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=20)
+        cancelled = asyncio.ensure_future(batcher.submit(value="gone"))
+        kept = asyncio.ensure_future(batcher.submit(value="kept"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        assert await kept == "kept"
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert seen == ["kept"]
+
+    asyncio.run(run())
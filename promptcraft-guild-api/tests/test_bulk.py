@@ -0,0 +1,60 @@
+import json
+import sys
+
+from api import bulk
+
+RECORDS = [
+    {"prompt": "Explain tides", "mentor_type": "The Sage", "seed": 1},
+    {"prompt": "Describe a volcano", "method_type": "SCAMPER", "seed": 2},
+    "not json",
+    {"prompt": "Summarize photosynthesis", "modifiers": ["Use Metaphor"], "seed": 3, "output": "Plants eat light", "target_output": "Plants turn light into sugar"},
+    {"kind": "generate", "prompt": "Write a haiku", "seed": 4}
+]
+
+def write_input(tmp_path):
+    path = tmp_path / "input.jsonl"
+    path.write_text("".join((record if isinstance(record, str) else json.dumps(record)) + "\n" for record in RECORDS))
+    return path
+
+def run_bulk(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["bulk", *map(str, args), "--workers", "0", "--batch-size", "2"])
+    return bulk.main()
+
+def read_output(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def without_timing(record):
+    if "generation" in record:
+        record = {**record, "generation": {**record["generation"], "generation_time": None}}
+    return record
+
+def test_every_line_gets_a_result_in_order(tmp_path, monkeypatch):
+    output = tmp_path / "output.jsonl"
+    assert run_bulk(monkeypatch, write_input(tmp_path), "--output", output) == 0
+    records = read_output(output)
+    assert [record["line"] for record in records] == [1, 2, 3, 4, 5]
+    assert records[2]["error"].startswith("Invalid record")
+    assert "target_similarity" in records[3]["evaluation"]["metrics"]
+    assert "generation" in records[4] and "evaluation" not in records[4]
+
+def test_resume_cuts_a_torn_last_line_and_matches_a_clean_run(tmp_path, monkeypatch):
+    input_path = write_input(tmp_path)
+    clean = tmp_path / "clean.jsonl"
+    run_bulk(monkeypatch, input_path, "--output", clean)
+    lines = clean.read_text().splitlines(keepends=True)
+
+    interrupted = tmp_path / "interrupted.jsonl"
+    interrupted.write_text("".join(lines[:2]) + lines[2][:10])
+    assert run_bulk(monkeypatch, input_path, "--output", interrupted, "--resume") == 0
+
+    resumed = read_output(interrupted)
+    assert [record["line"] for record in resumed] == [1, 2, 3, 4, 5]
+    # Seeded engines give the same results however the run was split; only timings differ
+    assert list(map(without_timing, resumed)) == list(map(without_timing, read_output(clean)))
+
+def test_existing_output_needs_resume_or_overwrite(tmp_path, monkeypatch):
+    output = tmp_path / "output.jsonl"
+    output.write_text("")
+    assert run_bulk(monkeypatch, write_input(tmp_path), "--output", output) == 2
+    assert run_bulk(monkeypatch, write_input(tmp_path), "--output", output, "--overwrite") == 0
+    assert len(read_output(output)) == len(RECORDS)
@@ -0,0 +1,50 @@
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.models.cache import ResponseCache, canonical_key, normalize_modifiers, normalize_prompt
+from api.models.eval_prometheus import evaluation_cache
+
+client = TestClient(app)
+
+def test_hit_miss_and_expiry():
+    cache = ResponseCache(ttl_seconds=60.0)
+    assert cache.get("k") is None
+    cache.set("k", {"score": 0.5})
+    assert cache.get("k") == {"score": 0.5}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    expired = ResponseCache(ttl_seconds=-1.0)
+    expired.set("k", {"score": 0.5})
+    assert expired.get("k") is None
+    assert expired.expirations == 1
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    cache.get("a")
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1} and cache.get("c") == {"v": 3}
+    assert cache.evictions == 1
+
+def test_equivalent_requests_share_a_key():
+    first = canonical_key("eval", prompt=normalize_prompt("Explain  the\ntides"), modifiers=normalize_modifiers(["b", "a"]), seed=1)
+    second = canonical_key("eval", prompt=normalize_prompt("Explain the tides"), modifiers=normalize_modifiers(["a", "b"]), seed=1)
+    assert first == second
+    assert first != canonical_key("eval", prompt="Explain the tides", modifiers=["a", "b"], seed=2)
+
+def test_seeded_evaluation_is_served_from_the_cache():
+    evaluation_cache.clear()
+    request = {"prompt": "Explain tides to a sailor", "mentor_type": "The Sage", "seed": 42}
+    hits, misses, bypasses = evaluation_cache.hits, evaluation_cache.misses, evaluation_cache.bypasses
+
+    first = client.post("/api/evaluate/", json=request).json()
+    second = client.post("/api/evaluate/", json=request).json()
+    assert first == second
+    assert (evaluation_cache.hits - hits, evaluation_cache.misses - misses) == (1, 1)
+
+    client.post("/api/evaluate/", json={**request, "no_cache": True})
+    client.post("/api/evaluate/", json={**request, "seed": None})
+    assert evaluation_cache.bypasses - bypasses == 2
+    assert evaluation_cache.hits - hits == 1
@@ -0,0 +1,46 @@
+import dataclasses
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.models.cards import DEFAULT_MENTOR_INTRO, DEFAULT_METHOD_INTRO, registry
+
+client = TestClient(app)
+
+def test_cards_are_found_by_type_and_title():
+    assert registry.mentor("The Sage").id == "mentor-2"
+    assert registry.method("SCAMPER").id == "method-1"
+    assert registry.modifier("Use Metaphor").id == "modifier-2"
+    # Titles are only looked up within their own type
+    assert registry.mentor("SCAMPER") is None
+    assert registry.mentor(None) is None
+
+def test_registry_is_read_only():
+    with pytest.raises(TypeError):
+        registry.by_id["mentor-x"] = registry.cards[0]
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        registry.cards[0].title = "Renamed"
+
+def test_preamble_assembles_the_combination_once():
+    preamble = registry.preamble("The Sage", "SCAMPER", ["Use Metaphor", "Unknown card"])
+    assert preamble.mentor_intro == registry.mentor("The Sage").fragment
+    assert preamble.method_intro == registry.method("SCAMPER").fragment
+    assert preamble.modifier_fragments == (registry.modifier("Use Metaphor").fragment,)
+    assert registry.preamble("The Sage", "SCAMPER", ["Use Metaphor", "Unknown card"]) is preamble
+
+    empty = registry.preamble(None, None, None)
+    assert (empty.mentor_intro, empty.method_intro, empty.modifier_fragments) == (DEFAULT_MENTOR_INTRO, DEFAULT_METHOD_INTRO, ())
+
+def test_cards_endpoint_revalidates_with_the_etag():
+    response = client.get("/api/cards/")
+    assert response.status_code == 200
+    cards = response.json()
+    assert len(cards["mentors"]) == len(cards["methods"]) == len(cards["modifiers"]) == 5
+    assert set(cards["mentors"][0]) == {"id", "type", "title", "content", "tokenCost", "icon"}
+
+    etag = response.headers["etag"]
+    revalidated = client.get("/api/cards/", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert client.get("/api/cards/", headers={"If-None-Match": '"stale"'}).status_code == 200
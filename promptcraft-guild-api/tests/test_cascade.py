@@ -0,0 +1,68 @@
+import itertools
+
+import pytest
+
+from api.models.cascade import CascadeEvaluator
+from api.models.eval_prometheus import evaluator
+
+CARD_CHOICES = {
+    "mentor_type": (None, "The Sage"),
+    "method_type": (None, "SCAMPER"),
+    "modifiers": (None, ["Use Metaphor"])
+}
+CARDS = {"mentor_type": "The Sage", "method_type": "SCAMPER", "modifiers": ["Use Metaphor"]}
+
+def test_cascade_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("EVALUATION_CASCADE", raising=False)
+    cascade = CascadeEvaluator.from_env()
+    assert not cascade.enabled
+    assert cascade.answer("Explain tides", 3) is None
+
+def test_heuristic_stays_within_the_model_range():
+    cascade = CascadeEvaluator(enabled=True)
+    for mentor_type, method_type, modifiers in itertools.product(*CARD_CHOICES.values()):
+        for token_count in (0, 4, 30, 100, 150, 200, 400):
+            heuristic = cascade.heuristic_score(token_count, mentor_type, method_type, modifiers, 150)
+            scores = [
+                evaluator._evaluate_one("word " * token_count, token_count, mentor_type, method_type, modifiers, 150, seed=seed)["score"]
+                for seed in range(200)
+            ]
+            # Seeded, so the sampled extremes are fixed; they sit within a hair of the true bounds
+            assert min(scores) - 0.01 <= heuristic <= max(scores) + 0.01, (mentor_type, method_type, modifiers, token_count)
+
+def test_strong_prompts_pass_without_the_model():
+    cascade = CascadeEvaluator(enabled=True)
+    result = cascade.answer("word " * 100, 100, token_limit=150, **CARDS)
+    assert result is not None
+    assert result["tier"] == "heuristic"
+    assert result["score"] > cascade.high
+    assert cascade.stats()["passed"] == 1
+
+def test_weak_prompts_fail_without_the_model():
+    cascade = CascadeEvaluator(enabled=True)
+    assert cascade.answer("", 0)["score"] < cascade.low
+    assert cascade.answer("word " * 300, 300, token_limit=150, **CARDS)["score"] < cascade.low
+    assert cascade.answer("Be brief", 2, token_limit=150, mentor_type="The Sage")["score"] < cascade.low
+    assert cascade.stats()["failed"] == 3
+
+@pytest.mark.parametrize("token_count, cards", [
+    (30, CARDS),                                   # complete, but well short of its budget
+    (4, CARDS),                                    # complete, but too short
+    (100, {**CARDS, "modifiers": None}),           # one card missing
+    (100, {})                                      # no cards, reasonable length
+])
+def test_mid_band_prompts_escalate(token_count, cards):
+    cascade = CascadeEvaluator(enabled=True)
+    assert cascade.answer("word " * token_count, token_count, token_limit=150, **cards) is None
+    assert cascade.stats()["escalated"] == 1
+
+def test_token_limit_must_be_positive():
+    with pytest.raises(ValueError):
+        CascadeEvaluator().heuristic_score(10, None, None, None, 0)
+
+def test_evaluation_rejects_a_zero_token_limit():
+    from fastapi.testclient import TestClient
+    from api.main import app
+
+    response = TestClient(app).post("/api/evaluate/", json={"prompt": "Explain tides", "token_limit": 0})
+    assert response.status_code == 422
@@ -0,0 +1,105 @@
+import asyncio
+import gzip
+import zlib
+
+from starlette.responses import JSONResponse, StreamingResponse
+
+from api.compression import ENCODINGS, CompressionMiddleware, negotiate
+
+EVENTS = [f"data: token {index}\n\n".encode() for index in range(5)]
+
+def call(app, accept_encoding="gzip"):
+    """Run one GET through the app and return the messages it sent"""
+    messages = []
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            # The client stays connected until the response is done
+            await asyncio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages
+
+def headers_of(messages):
+    return {name.decode().lower(): value.decode() for name, value in messages[0]["headers"]}
+
+def json_app(payload):
+    async def app(scope, receive, send):
+        await JSONResponse(payload)(scope, receive, send)
+    return CompressionMiddleware(app, minimum_size=500)
+
+def test_negotiation_follows_quality_values():
+    assert negotiate("gzip") == "gzip"
+    assert negotiate("gzip;q=0, deflate") is None
+    assert negotiate("") is None
+    assert negotiate("*;q=0.5") == ENCODINGS[0]
+    if "br" in ENCODINGS:
+        assert negotiate("gzip, br") == "br"
+        assert negotiate("gzip;q=1.0, br;q=0.5") == "gzip"
+
+def test_large_bodies_are_compressed_and_small_ones_are_not():
+    payload = {"items": ["a reasonably long repeated string"] * 50}
+    messages = call(json_app(payload))
+    headers = headers_of(messages)
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(messages[1]["body"])
+    assert gzip.decompress(messages[1]["body"]) == JSONResponse(payload).body
+
+    small = call(json_app({"ok": True}))
+    assert "content-encoding" not in headers_of(small)
+    assert small[1]["body"] == b'{"ok":true}'
+
+    identity = call(json_app(payload), accept_encoding="identity")
+    assert "content-encoding" not in headers_of(identity)
+
+def test_every_streamed_event_can_be_decoded_as_soon_as_it_is_sent():
+    async def events():
+        for event in EVENTS:
+            yield event
+
+    async def app(scope, receive, send):
+        await StreamingResponse(events(), media_type="text/event-stream")(scope, receive, send)
+
+    messages = call(CompressionMiddleware(app), accept_encoding="gzip")
+    headers = headers_of(messages)
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+
+    decoder = zlib.decompressobj(31)
+    received = b""
+    chunks = [message for message in messages[1:] if message.get("body")]
+    for index, message in enumerate(chunks[:len(EVENTS)]):
+        received += decoder.decompress(message["body"])
+        # Nothing is held back in the compressor between events
+        assert received == b"".join(EVENTS[:index + 1])
+    for message in chunks[len(EVENTS):]:
+        received += decoder.decompress(message["body"])
+    assert decoder.eof and received == b"".join(EVENTS)
+
+def test_disabled_middleware_leaves_responses_alone():
+    payload = {"items": ["a reasonably long repeated string"] * 50}
+
+    async def app(scope, receive, send):
+        await JSONResponse(payload)(scope, receive, send)
+
+    messages = call(CompressionMiddleware(app, enabled=False))
+    assert "content-encoding" not in headers_of(messages)
+
+def test_single_engine_responses_are_sent_uncompressed_by_default():
+    evaluation = {"score": 0.5, "feedback": "f" * 300, "reasoning": "r" * 300, "metrics": {"clarity": 0.5}}
+
+    async def app(scope, receive, send):
+        await JSONResponse(evaluation)(scope, receive, send)
+
+    assert "content-encoding" not in headers_of(call(CompressionMiddleware(app)))
+    assert headers_of(call(json_app({"items": [evaluation] * 3})))["content-encoding"] == "gzip"
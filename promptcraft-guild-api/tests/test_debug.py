@@ -0,0 +1,41 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from api import debug
+from api.main import app
+
+client = TestClient(app)
+
+ADMIN = {"Authorization": "Bearer s3cret"}
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(debug, "DEBUG_TOKEN", "s3cret")
+
+def test_debug_routes_do_not_exist_without_a_token(monkeypatch):
+    monkeypatch.setattr(debug, "DEBUG_TOKEN", "")
+    assert client.get("/debug/stats", headers=ADMIN).status_code == 404
+    assert client.get("/debug/profile", headers=ADMIN).status_code == 404
+
+def test_debug_routes_need_the_admin_token(admin_token):
+    missing = client.get("/debug/stats")
+    assert missing.status_code == 401
+    assert missing.headers["www-authenticate"] == "Bearer"
+    assert client.get("/debug/stats", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert client.get("/debug/profile", params={"seconds": 0.05}, headers={"Authorization": "s3cret"}).status_code == 403
+    assert client.get("/debug/stats", headers=ADMIN).status_code == 200
+
+def test_profile_returns_collapsed_stacks(admin_token):
+    response = client.get("/debug/profile", params={"seconds": 0.1}, headers=ADMIN)
+    assert response.status_code == 200
+    assert int(response.headers["x-profile-samples"]) > 0
+    line = response.text.splitlines()[0]
+    stack, count = line.rsplit(" ", 1)
+    assert stack.startswith(("thread:", "tasks")) and int(count) > 0
+
+def test_only_one_profile_runs_at_a_time(admin_token):
+    debug.profiler._lock.acquire()
+    try:
+        assert client.get("/debug/profile", params={"seconds": 0.05}, headers=ADMIN).status_code == 409
+    finally:
+        debug.profiler._lock.release()
@@ -0,0 +1,58 @@
+import random
+from collections import Counter
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.models.drafts import DraftDocument, DraftStore, _word
+from api.models.tokenizer import tokenizer
+
+# Letters, digits, punctuation, contractions, runs of whitespace and non-ASCII
+FRAGMENTS = ["a", "the", " ", "  ", "\n", "\n\n", "\t", "7", "42", ".", ",", "!?", "'s", "'re", "don't", "é", "naïve", "日本", " like", "-", "x"]
+
+def random_text(rng, size):
+    return "".join(rng.choice(FRAGMENTS) for _ in range(size))
+
+def assert_matches_full_relex(document):
+    pieces = tokenizer.pretokenize(document.text)
+    assert document.pieces == pieces
+    assert "".join(document.pieces) == document.text
+    assert document.starts == [sum(len(piece) for piece in pieces[:index]) for index in range(len(pieces))]
+    assert document.token_count == tokenizer.count(document.text)
+    assert document.words == Counter(_word(piece) for piece in pieces)
+
+def test_incremental_relex_matches_pretokenize():
+    rng = random.Random(1234)
+    for _ in range(50):
+        document = DraftDocument(text=random_text(rng, rng.randint(0, 30)))
+        assert_matches_full_relex(document)
+        for _ in range(40):
+            start = rng.randint(0, len(document.text))
+            end = rng.randint(start, min(len(document.text), start + 8))
+            document.apply([{"start": start, "end": end, "text": random_text(rng, rng.randint(0, 4))}])
+            assert_matches_full_relex(document)
+
+def test_each_client_keeps_only_its_most_recent_drafts():
+    store = DraftStore(max_per_client=2)
+    first, _ = store.create(owner="a", text="one")
+    second, _ = store.create(owner="a", text="two")
+    other, _ = store.create(owner="b", text="three")
+    store.get(first)
+    third, _ = store.create(owner="a", text="four")
+
+    assert store.get(second) is None
+    assert all(store.get(draft_id) is not None for draft_id in (first, third, other))
+    assert store.stats()["open"] == 3
+
+def test_idle_drafts_expire():
+    store = DraftStore(ttl_seconds=-1.0)
+    draft_id, _ = store.create(owner="a", text="idle")
+    assert store.get(draft_id) is None
+    store.create(owner="a", text="fresh")
+    assert store.stats()["expired"] == 1
+
+def test_draft_token_limit_must_be_positive():
+    client = TestClient(app)
+    assert client.post("/api/evaluate/draft", json={"text": "Explain tides", "token_limit": 0}).status_code == 422
+    draft_id = client.post("/api/evaluate/draft", json={"text": "Explain tides"}).json()["draft_id"]
+    assert client.patch(f"/api/evaluate/draft/{draft_id}", json={"token_limit": 0}).status_code == 422
@@ -0,0 +1,48 @@
+import re
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.models.metrics import MetricsRegistry
+
+client = TestClient(app)
+
+def sample(text, name, **labels):
+    """The value of the sample with exactly these labels, or None"""
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}{re.escape('{' + label_text + '}' if labels else '')} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+def test_routes_are_labelled_by_template():
+    draft_id = client.post("/api/evaluate/draft", json={"text": "Explain tides"}).json()["draft_id"]
+    client.patch(f"/api/evaluate/draft/{draft_id}", json={"edits": []})
+    client.get("/no/such/route")
+    text = client.get("/metrics").text
+
+    assert sample(text, "promptcraft_http_requests_total", method="POST", route="/api/evaluate/draft", status="200") >= 1
+    assert sample(text, "promptcraft_http_requests_total", method="PATCH", route="/api/evaluate/draft/{draft_id}", status="200") >= 1
+    assert sample(text, "promptcraft_http_requests_total", method="GET", route="unmatched", status="404") >= 1
+    # Path parameters never become label values
+    assert draft_id not in text
+
+def test_evaluations_are_labelled_by_source():
+    request = {"prompt": "Explain tides to a sailor", "seed": 7}
+    client.post("/api/evaluate/", json=request)
+    client.post("/api/evaluate/", json=request)
+    text = client.get("/metrics").text
+    assert sample(text, "promptcraft_evaluation_requests_total", source="model") >= 1
+    assert sample(text, "promptcraft_evaluation_requests_total", source="cache") >= 1
+    assert sample(text, "promptcraft_cache_hits_total", cache="evaluation") >= 1
+
+def test_histograms_render_cumulative_buckets_and_escaped_labels():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, 'say "hi"\n')
+    text = registry.render()
+    route = 'say \\"hi\\"\\n'
+    assert sample(text, "latency_seconds_bucket", route=route, le="0.1") == 1
+    assert sample(text, "latency_seconds_bucket", route=route, le="1") == 2
+    assert sample(text, "latency_seconds_bucket", route=route, le="+Inf") == 3
+    assert sample(text, "latency_seconds_count", route=route) == 3
+    assert "# TYPE latency_seconds histogram" in text
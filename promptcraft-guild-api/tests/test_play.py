@@ -0,0 +1,55 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from api import play
+from api.main import app
+
+client = TestClient(app)
+
+def evaluation(score=0.8):
+    return {"score": score, "feedback": "ok", "reasoning": "ok", "metrics": {"clarity": score}, "tier": "model"}
+
+def test_play_generates_and_evaluates_in_one_round_trip(monkeypatch):
+    calls = []
+
+    async def generate(prompt, **kwargs):
+        calls.append(("generate", prompt, kwargs["mentor_type"], kwargs["seed"]))
+        # Evaluation must not wait for the generation to finish
+        await asyncio.sleep(0.05)
+        calls.append(("generated", prompt))
+        return {"output": "Tides rise and fall with the moon", "token_count": 7, "generation_time": 0.05}
+
+    async def evaluate(prompt, **kwargs):
+        calls.append(("evaluate", prompt, kwargs["token_limit"], kwargs["seed"]))
+        return evaluation()
+
+    monkeypatch.setattr(play, "generate_response", generate)
+    monkeypatch.setattr(play, "evaluate_prompt", evaluate)
+    response = client.post("/api/play/", json={
+        "prompt": "Explain tides", "mentor_type": "The Sage", "token_limit": 50, "seed": 3,
+        "target_output": "Tides follow the moon"
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body["generation"]["output"] == "Tides rise and fall with the moon"
+    assert body["evaluation"]["score"] == 0.8
+    assert "target_similarity" in body["evaluation"]["metrics"]
+    assert calls == [
+        ("generate", "Explain tides", "The Sage", 3),
+        ("evaluate", "Explain tides", 50, 3),
+        ("generated", "Explain tides")
+    ]
+
+def test_play_reports_a_failed_stage(monkeypatch):
+    async def generate(prompt, **kwargs):
+        raise RuntimeError("model crashed")
+
+    async def evaluate(prompt, **kwargs):
+        return evaluation()
+
+    monkeypatch.setattr(play, "generate_response", generate)
+    monkeypatch.setattr(play, "evaluate_prompt", evaluate)
+    response = client.post("/api/play/", json={"prompt": "Explain tides"})
+    assert response.status_code == 500
+    assert "model crashed" in response.json()["detail"]
@@ -0,0 +1,51 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.models import eval_prometheus, load_mistral
+from api.models.loading import ModelLoadState, ModelNotReady
+
+client = TestClient(app)
+
+@pytest.fixture
+def states(monkeypatch):
+    mistral, prometheus = ModelLoadState("mistral"), ModelLoadState("prometheus")
+    monkeypatch.setattr(load_mistral.generator, "load_state", mistral)
+    monkeypatch.setattr(eval_prometheus.evaluator, "load_state", prometheus)
+    return mistral, prometheus
+
+def test_not_ready_until_every_model_is_loaded(states):
+    mistral, prometheus = states
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "loading"
+
+    mistral.run(lambda: None)
+    assert client.get("/ready").status_code == 503
+
+    prometheus.mark_remote()
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["models"]["mistral"]["status"] == "ready"
+    assert response.json()["models"]["prometheus"]["status"] == "remote"
+
+def test_failed_load_is_reported(states):
+    mistral, prometheus = states
+    prometheus.run(lambda: None)
+
+    def broken():
+        raise OSError("weights not found")
+
+    with pytest.raises(ModelNotReady):
+        mistral.run(broken)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    failed = response.json()["models"]["mistral"]
+    assert (failed["status"], failed["error"]) == ("failed", "weights not found")
+
+def test_load_runs_once(states):
+    mistral, _ = states
+    calls = []
+    mistral.run(lambda: calls.append(1))
+    mistral.run(lambda: calls.append(1))
+    assert calls == [1]
@@ -0,0 +1,110 @@
+import asyncio
+
+import httpx
+import pytest
+
+from api.models.remote import RemoteServiceClient, RemoteServiceUnavailable
+
+def make_client(handler, replicas=2, hedge_delay_ms=0.0, retries=0):
+    client = RemoteServiceClient(
+        name="test",
+        base_urls=[f"http://replica-{index}" for index in range(replicas)],
+        retries=retries,
+        hedge_delay_ms=hedge_delay_ms,
+        failure_threshold=1,
+        reset_timeout=0.0
+    )
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+def attach(client):
+    # The pooled client is rebuilt when the loop changes; keep the mocked one
+    client._loop = asyncio.get_running_loop()
+
+def half_open(client, url):
+    breaker = client.breakers[url]
+    breaker.record_failure()
+    assert breaker.state == "half-open"
+    return breaker
+
+def test_half_open_replica_is_not_claimed_when_another_answers():
+    async def handler(request):
+        return httpx.Response(200, json={"ok": True})
+
+    async def run():
+        client = make_client(handler)
+        attach(client)
+        breaker = half_open(client, "http://replica-1")
+        assert await client.post("/x", {}) == {"ok": True}
+        assert not breaker.trial_in_flight
+
+    asyncio.run(run())
+
+def test_cancelled_request_releases_the_trial():
+    started = asyncio.Event()
+
+    async def handler(request):
+        started.set()
+        await asyncio.sleep(10)
+
+    async def run():
+        client = make_client(handler, replicas=1)
+        attach(client)
+        breaker = half_open(client, "http://replica-0")
+        task = asyncio.ensure_future(client.post("/x", {}))
+        await started.wait()
+        assert breaker.trial_in_flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not breaker.trial_in_flight
+        assert breaker.available()
+
+    asyncio.run(run())
+
+def test_hedge_loser_releases_its_trial():
+    async def handler(request):
+        if request.url.host == "replica-0":
+            await asyncio.sleep(10)
+        return httpx.Response(200, json={"host": request.url.host})
+
+    async def run():
+        client = make_client(handler, hedge_delay_ms=10)
+        attach(client)
+        breaker = half_open(client, "http://replica-0")
+        assert await client.post("/x", {}) == {"host": "replica-1"}
+        assert client.hedged == 1
+        # Let the cancelled hedge unwind
+        await asyncio.sleep(0)
+        assert not breaker.trial_in_flight
+        assert breaker.state == "half-open"
+
+    asyncio.run(run())
+
+def test_overloaded_replica_is_not_a_breaker_failure():
+    async def handler(request):
+        return httpx.Response(503, json={"detail": "busy"})
+
+    async def run():
+        client = make_client(handler, replicas=1)
+        attach(client)
+        with pytest.raises(RemoteServiceUnavailable):
+            await client.post("/x", {})
+        breaker = client.breakers["http://replica-0"]
+        assert breaker.failures == 0
+        assert breaker.state == "closed"
+
+    asyncio.run(run())
+
+def test_server_error_opens_the_breaker():
+    async def handler(request):
+        return httpx.Response(500)
+
+    async def run():
+        client = make_client(handler, replicas=1)
+        attach(client)
+        with pytest.raises(RemoteServiceUnavailable):
+            await client.post("/x", {})
+        assert client.breakers["http://replica-0"].failures == 1
+
+    asyncio.run(run())
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from api.models.scheduler import FairScheduler, RateLimited
+
+def test_a_burst_only_delays_its_own_client():
+    async def run():
+        scheduler = FairScheduler(max_concurrent=1)
+        await scheduler.acquire("holder")
+        order = []
+
+        async def request(client_id, name):
+            await scheduler.acquire(client_id)
+            order.append(name)
+            scheduler.release(0.0)
+
+        tasks = [asyncio.ensure_future(request("a", f"a{index}")) for index in range(4)]
+        tasks.append(asyncio.ensure_future(request("b", "b0")))
+        await asyncio.sleep(0)
+        scheduler.release(0.0)
+        await asyncio.gather(*tasks)
+        assert order == ["a0", "b0", "a1", "a2", "a3"]
+        assert scheduler.running == 0
+
+    asyncio.run(run())
+
+def test_rate_limit_is_off_by_default_and_per_client_when_set():
+    async def run():
+        unlimited = FairScheduler()
+        for _ in range(100):
+            await unlimited.acquire("a")
+            unlimited.release(0.0)
+
+        scheduler = FairScheduler(client_rate=1.0, client_burst=2.0)
+        for _ in range(2):
+            await scheduler.acquire("a")
+            scheduler.release(0.0)
+        with pytest.raises(RateLimited):
+            await scheduler.acquire("a")
+        await scheduler.acquire("b")
+        assert scheduler.stats()["rate_limited"] == 1
+
+    asyncio.run(run())
+
+def test_cancelled_waiters_give_back_their_place():
+    async def run():
+        scheduler = FairScheduler(max_concurrent=1)
+        await scheduler.acquire("holder")
+        waiter = asyncio.ensure_future(scheduler.acquire("a"))
+        await asyncio.sleep(0)
+        assert scheduler.stats()["queued"] == 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.stats()["queued"] == 0
+
+        # Cancelled just after being granted the slot: it is handed on, not kept
+        granted = asyncio.ensure_future(scheduler.acquire("a"))
+        await asyncio.sleep(0)
+        scheduler.release(0.0)
+        granted.cancel()
+        await asyncio.gather(granted, return_exceptions=True)
+        assert scheduler.running == 0
+
+    asyncio.run(run())
+
+def test_claimed_client_ids_are_only_used_when_trusted():
+    assert FairScheduler().client_key("someone", "10.0.0.1") == "10.0.0.1"
+    assert FairScheduler().client_key(None, None) == "anonymous"
+    assert FairScheduler(trust_client_id=True).client_key("someone", "10.0.0.1") == "someone"
+    assert FairScheduler(trust_client_id=True).client_key(None, "10.0.0.1") == "10.0.0.1"
@@ -0,0 +1,114 @@
+import asyncio
+import json
+
+from fastapi import WebSocketDisconnect
+
+from api import session as session_module
+from api.models.scheduler import FairScheduler
+
+class FakeWebSocket:
+    """Delivers the given messages, then disconnects; sending blocks like a reader that stopped reading"""
+    def __init__(self, messages=()):
+        self.messages = [json.dumps(message) for message in messages]
+
+    async def receive_text(self):
+        if self.messages:
+            return self.messages.pop(0)
+        await asyncio.sleep(0.01)
+        raise WebSocketDisconnect()
+
+    async def send_text(self, text):
+        await asyncio.sleep(10)
+
+def install(monkeypatch, handler):
+    scheduler = FairScheduler(max_concurrent=1, client_rate=0)
+    monkeypatch.setattr(session_module, "scheduler", scheduler)
+    monkeypatch.setitem(session_module.HANDLERS, "generate", session_module._handler(scheduled=True)(handler))
+    return scheduler
+
+def make_session(messages=(), outbox_size=1):
+    session = session_module.GameSession(FakeWebSocket(messages), "client")
+    session.outbox = asyncio.Queue(maxsize=outbox_size)
+    return session
+
+def test_slot_is_released_before_the_reply_is_queued(monkeypatch):
+    async def handler(session, message):
+        return "result", {"ok": True}
+
+    scheduler = install(monkeypatch, handler)
+
+    async def run():
+        session = make_session()
+        session.outbox.put_nowait({"type": "filler"})
+        task = asyncio.ensure_future(session._handle(session_module.SessionMessage(id="1", type="generate")))
+        await asyncio.sleep(0.01)
+        # Blocked on the full outbox, without holding the slot
+        assert not task.done()
+        assert scheduler.running == 0
+        task.cancel()
+
+    asyncio.run(run())
+
+def test_cancel_with_a_full_outbox_does_not_block(monkeypatch):
+    async def handler(session, message):
+        await asyncio.sleep(10)
+
+    scheduler = install(monkeypatch, handler)
+
+    async def run():
+        session = make_session()
+        task = asyncio.ensure_future(session._handle(session_module.SessionMessage(id="1", type="generate")))
+        await asyncio.sleep(0.01)
+        assert scheduler.running == 1
+        session.outbox.put_nowait({"type": "filler"})
+        task.cancel()
+        await asyncio.wait_for(asyncio.gather(task, return_exceptions=True), timeout=1.0)
+        assert scheduler.running == 0
+
+    asyncio.run(run())
+
+def test_closing_the_session_waits_for_cancelled_requests(monkeypatch):
+    async def handler(session, message):
+        await asyncio.sleep(10)
+
+    scheduler = install(monkeypatch, handler)
+
+    async def run():
+        session = make_session([{"id": "1", "type": "generate"}], outbox_size=16)
+        await asyncio.wait_for(session.run(), timeout=1.0)
+        assert scheduler.running == 0
+        assert not session.tasks
+
+    asyncio.run(run())
+
+class SilentWebSocket(FakeWebSocket):
+    """Sends its messages and stays connected, but never reads what the server sends"""
+    async def receive_text(self):
+        if self.messages:
+            return self.messages.pop(0)
+        await asyncio.sleep(3600)
+
+def test_streams_to_a_client_that_never_reads_give_up_their_slots(monkeypatch):
+    async def tokens(**request):
+        for index in range(10000):
+            yield f"t{index} "
+
+    scheduler = FairScheduler(max_concurrent=8, client_rate=0)
+    monkeypatch.setattr(session_module, "scheduler", scheduler)
+    monkeypatch.setattr(session_module, "stream_response", tokens)
+
+    async def run():
+        messages = [{"id": str(index), "type": "stream", "payload": {"prompt": "Explain tides"}} for index in range(8)]
+        session = session_module.GameSession(SilentWebSocket(messages), "client")
+        session.outbox = asyncio.Queue(maxsize=4)
+        session.send_timeout = 0.05
+        connection = asyncio.ensure_future(session.run())
+        await asyncio.sleep(0.01)
+        assert scheduler.running == 8
+
+        await asyncio.wait_for(asyncio.gather(*list(session.tasks.values())), timeout=2.0)
+        assert scheduler.running == 0
+        connection.cancel()
+        await asyncio.gather(connection, return_exceptions=True)
+
+    asyncio.run(run())
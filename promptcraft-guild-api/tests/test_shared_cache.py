@@ -0,0 +1,51 @@
+import multiprocessing
+import time
+
+from api.models.shared_cache import SharedMemoryStore
+
+def _round_trip(path, queue):
+    store = SharedMemoryStore(path, size_mb=1)
+    queue.put(store.get("from parent"))
+    store.set("from child", {"pid": "child"}, ttl=60)
+    store.close()
+
+def test_entries_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / "cache")
+    store = SharedMemoryStore(path, size_mb=1)
+    store.set("from parent", {"output": "hello", "tokens": [1, 2]}, ttl=60)
+
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    child = context.Process(target=_round_trip, args=(path, queue))
+    child.start()
+    seen = queue.get(timeout=30)
+    child.join(timeout=30)
+
+    assert child.exitcode == 0
+    assert seen == {"output": "hello", "tokens": [1, 2]}
+    assert store.get("from child") == {"pid": "child"}
+    store.close()
+
+def test_full_set_evicts_the_least_recently_used(tmp_path):
+    # One set of two slots
+    store = SharedMemoryStore(str(tmp_path / "cache"), size_mb=512 / (1024 * 1024), slot_bytes=256, ways=2)
+    assert (store.sets, store.ways) == (1, 2)
+    store.set("a", {"v": "a"}, ttl=60)
+    store.set("b", {"v": "b"}, ttl=60)
+    time.sleep(0.01)
+    assert store.get("a") == {"v": "a"}
+    store.set("c", {"v": "c"}, ttl=60)
+
+    assert store.get("b") is None
+    assert store.get("a") == {"v": "a"}
+    assert store.get("c") == {"v": "c"}
+    assert store.evictions == 1
+    store.close()
+
+def test_expired_and_oversized_entries_are_not_served(tmp_path):
+    store = SharedMemoryStore(str(tmp_path / "cache"), size_mb=1, slot_bytes=256)
+    store.set("gone", {"v": 1}, ttl=-1)
+    assert store.get("gone") is None
+    assert not store.set("big", {"v": "x" * 1000}, ttl=60)
+    assert store.too_large == 1
+    store.close()
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from api.models.similarity import TARGET_RESPONSES, VECTORIZE_CHUNK, SimilarityIndex, with_similarity
+
+index = SimilarityIndex(dimensions=1024)
+
+def dense_score(output, target):
+    """Reference: cosine of the dense vectors"""
+    return float(np.clip(index.vectorize([output])[0] @ index.vectorize([target])[0], 0.0, 1.0))
+
+def test_identical_text_scores_one_and_normalization_is_ignored():
+    target = TARGET_RESPONSES[0]
+    assert index.score(target, target) == pytest.approx(1.0, abs=1e-5)
+    assert index.score("  " + target.upper().replace(" ", "\n  "), target) == pytest.approx(1.0, abs=1e-5)
+
+def test_closer_text_scores_higher():
+    target = TARGET_RESPONSES[1]
+    paraphrase = "Machine learning algorithms learn patterns from data, like students studying many examples of cats."
+    unrelated = "Bake the bread at two hundred degrees until the crust turns golden."
+    assert index.score(paraphrase, target) > index.score(unrelated, target) + 0.2
+    assert index.score("", target) == 0.0
+
+def test_sparse_batch_scoring_matches_the_dense_vectors():
+    outputs = [f"Recursion {number} calls itself like nesting dolls" for number in range(VECTORIZE_CHUNK + 3)] + ["ab", ""]
+    targets = [TARGET_RESPONSES[position % 3] if position % 2 else "an uncached target about dolls" for position in range(len(outputs))]
+    scores = index.score_pairs(outputs, targets)
+    for position in (0, 1, VECTORIZE_CHUNK, VECTORIZE_CHUNK + 2, len(outputs) - 2, len(outputs) - 1):
+        assert scores[position] == pytest.approx(dense_score(outputs[position], targets[position]), abs=1e-5)
+    assert list(index.score_many(outputs[:3], TARGET_RESPONSES[0])) == pytest.approx(list(index.score_pairs(outputs[:3], [TARGET_RESPONSES[0]] * 3)))
+
+def test_other_targets_are_cached_up_to_the_limit():
+    small = SimilarityIndex(dimensions=256, cache_size=2)
+    for target in ("first target", "second target", "first target", "third target"):
+        small.score("some output", target)
+    assert small.stats()["cached_targets"] == 2
+    assert small.extra_misses == 3
+    # "second target" was least recently used, so it was evicted
+    small.score("some output", "second target")
+    assert small.extra_misses == 4
+    assert small.stats()["targets"] == len(TARGET_RESPONSES)
+
+def test_cached_results_are_not_modified():
+    cached = {"score": 0.5, "metrics": {"clarity": 0.5}}
+    result = with_similarity(cached, 0.123456)
+    assert result["metrics"] == {"clarity": 0.5, "target_similarity": 0.1235}
+    assert cached == {"score": 0.5, "metrics": {"clarity": 0.5}}
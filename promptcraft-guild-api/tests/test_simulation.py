@@ -0,0 +1,59 @@
+import asyncio
+import random
+
+import pytest
+
+from api.models.simulation import LatencySimulator, SimulatedFailure, SimulatedOverload, SimulationProfile
+
+def profile(**overrides):
+    quiet = dict(ttft_ms=0.0, prefill_ms_per_token=0.0, decode_ms_per_token=0.0, jitter=0.0, tail_probability=0.0)
+    return SimulationProfile(**{**quiet, **overrides})
+
+def test_latency_follows_the_profile():
+    simulator = LatencySimulator(profile(ttft_ms=20.0, prefill_ms_per_token=1.0, decode_ms_per_token=2.0))
+    elapsed = asyncio.run(simulator.run(prompt_tokens=10, output_tokens=10))
+    # 20ms to first token + 10ms prefill + 20ms decode
+    assert 0.045 <= elapsed < 0.5
+    assert simulator.completed == 1
+
+def test_requests_beyond_the_slots_wait_and_beyond_the_queue_are_rejected():
+    async def run():
+        simulator = LatencySimulator(profile(slots=1, max_queue=1, ttft_ms=50.0))
+        first = asyncio.ensure_future(simulator.run(0, 0))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(simulator.run(0, 0))
+        await asyncio.sleep(0)
+        assert (simulator.active, simulator.queued) == (1, 1)
+        with pytest.raises(SimulatedOverload) as excinfo:
+            await simulator.run(0, 0)
+        assert excinfo.value.retry_after >= 1.0
+        await asyncio.gather(first, second)
+        assert (simulator.completed, simulator.rejected) == (2, 1)
+        assert simulator.stats()["avg_queue_ms"] > 0
+
+    asyncio.run(run())
+
+def test_injected_failures_and_tails():
+    failing = LatencySimulator(profile(failure_rate=1.0))
+    with pytest.raises(SimulatedFailure):
+        asyncio.run(failing.run(0, 0))
+    assert failing.failed == 1
+
+    slow = LatencySimulator(profile(ttft_ms=10.0, tail_probability=1.0, tail_multiplier=5.0))
+    assert asyncio.run(slow.run(0, 0)) >= 0.045
+    assert slow.tail_events == 1
+
+def test_streams_pieces_in_order_and_seeded_runs_repeat():
+    async def collect(seed):
+        simulator = LatencySimulator(profile(jitter=0.5, tail_probability=0.5, decode_ms_per_token=1.0))
+        pieces = [piece async for piece in simulator.stream(5, ["a", "b", "c"], random.Random(seed))]
+        return pieces, simulator.tail_events
+
+    assert asyncio.run(collect(3)) == asyncio.run(collect(3))
+    assert asyncio.run(collect(3))[0] == ["a", "b", "c"]
+
+def test_profile_reads_overrides_from_the_environment(monkeypatch):
+    monkeypatch.setenv("MOCK_TEST_SLOTS", "3")
+    monkeypatch.setenv("MOCK_TEST_TTFT_MS", "12.5")
+    loaded = SimulationProfile.from_env("MOCK_TEST", decode_ms_per_token=4.0)
+    assert (loaded.slots, loaded.ttft_ms, loaded.decode_ms_per_token) == (3, 12.5, 4.0)
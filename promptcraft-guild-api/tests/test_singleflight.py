@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from api.models.singleflight import SingleFlight
+
+def test_one_waiter_cancelling_leaves_the_work_for_the_others():
+    async def run():
+        flight = SingleFlight()
+        started = 0
+        release = asyncio.Event()
+
+        async def work():
+            nonlocal started
+            started += 1
+            await release.wait()
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await second == ("done", True)
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert started == 1
+        assert flight.stats()["abandoned"] == 0
+
+    asyncio.run(run())
+
+def test_work_is_cancelled_once_every_waiter_has_gone():
+    async def run():
+        flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.ensure_future(flight.do("key", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), timeout=1.0)
+        assert flight.stats() == {"name": "singleflight", "in_flight": 0, "executed": 1, "coalesced": 2, "abandoned": 1}
+
+    asyncio.run(run())
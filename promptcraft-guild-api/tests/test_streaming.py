@@ -0,0 +1,28 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.models import load_mistral
+from api.models.remote import RemoteServiceClient
+
+@pytest.fixture
+def remote_mistral(monkeypatch):
+    # Configure the remote service the way the app does at import time
+    monkeypatch.setenv("MISTRAL_SERVICE_URL", "http://mistral-service:7860")
+    monkeypatch.setattr(load_mistral, "remote", RemoteServiceClient.from_env("mistral", "MISTRAL_SERVICE_URL"))
+    assert load_mistral.remote is not None
+    return load_mistral.generator.is_initialized
+
+def test_stream_is_rejected_with_a_remote_service(remote_mistral):
+    response = TestClient(app).post("/api/generate/stream", json={"prompt": "Explain tides"})
+    assert response.status_code == 501
+    assert "remote mistral service" in response.json()["detail"]
+    assert load_mistral.generator.is_initialized == remote_mistral
+
+def test_session_stream_is_rejected_with_a_remote_service(remote_mistral):
+    with TestClient(app).websocket_connect("/ws/session") as websocket:
+        websocket.send_json({"id": "1", "type": "stream", "payload": {"prompt": "Explain tides"}})
+        reply = websocket.receive_json()
+    assert (reply["id"], reply["type"], reply["payload"]["status_code"]) == ("1", "error", 501)
+    assert "remote mistral service" in reply["payload"]["detail"]
+    assert load_mistral.generator.is_initialized == remote_mistral
@@ -0,0 +1,48 @@
+import random
+import string
+import time
+
+from fastapi.testclient import TestClient
+
+from api.main import app
+from api.prometheus import MAX_BATCH_ITEMS
+from api.models.tokenizer import BPETokenizer, MAX_TEXT_CHARS, MAX_WORD_SYMBOLS, _encode_bytes
+
+client = TestClient(app)
+
+def random_word(length: int, seed: int = 0) -> str:
+    generator = random.Random(seed)
+    return "".join(generator.choice(string.ascii_lowercase) for _ in range(length))
+
+def test_long_pre_tokens_are_merged_in_runs():
+    tokenizer = BPETokenizer()
+    word = _encode_bytes(random_word(5 * MAX_WORD_SYMBOLS + 7))
+    expected = []
+    for offset in range(0, len(word), MAX_WORD_SYMBOLS):
+        expected.extend(BPETokenizer()._bpe(word[offset:offset + MAX_WORD_SYMBOLS]))
+    assert tokenizer._bpe(word) == tuple(expected)
+    assert "".join(tokenizer._bpe(word)) == word
+
+def test_counting_one_long_word_is_linear():
+    tokenizer = BPETokenizer()
+    start_time = time.perf_counter()
+    tokenizer.count(random_word(32 * 1024))
+    # Quadratic merging took several seconds here
+    assert time.perf_counter() - start_time < 1.0
+
+def test_oversized_requests_are_rejected():
+    too_long = "a" * (MAX_TEXT_CHARS + 1)
+    assert client.post("/api/tokenize/", json={"text": too_long}).status_code == 422
+    assert client.post("/api/tokenize/", json={"texts": ["a"] * 1000}).status_code == 422
+    assert client.post("/api/evaluate/", json={"prompt": too_long}).status_code == 422
+    assert client.post("/api/evaluate/draft", json={"text": too_long}).status_code == 422
+    for field in ("target_output", "output"):
+        assert client.post("/api/evaluate/", json={"prompt": "Explain tides", field: too_long}).status_code == 422
+    batch = [{"prompt": "Explain tides"}] * (MAX_BATCH_ITEMS + 1)
+    assert client.post("/api/evaluate/batch", json={"items": batch}).status_code == 422
+
+def test_draft_edits_cannot_grow_past_the_limit():
+    draft_id = client.post("/api/evaluate/draft", json={"text": "Explain tides"}).json()["draft_id"]
+    edit = {"start": 0, "end": 0, "text": "a" * MAX_TEXT_CHARS}
+    response = client.patch(f"/api/evaluate/draft/{draft_id}", json={"edits": [edit]})
+    assert response.status_code == 422
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import signal
+import time
+
+import pytest
+
+from api.models.workers import InferenceWorkerPool, WorkerPoolSaturated
+
+def test_pool_recovers_from_a_crashed_worker():
+    async def run():
+        pool = InferenceWorkerPool(num_workers=1)
+        try:
+            first = await pool.submit("prometheus", "evaluate", prompt="Explain tides", seed=1)
+            for pid in list(pool.executor._processes):
+                os.kill(pid, signal.SIGKILL)
+            # Give the executor's manager thread a moment to notice the dead worker
+            deadline = time.monotonic() + 5.0
+            while not pool.executor._broken and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+
+            second = await pool.submit("prometheus", "evaluate", prompt="Explain tides", seed=1)
+            assert second == first
+            assert pool.restarts == 1
+            assert (pool.completed, pool.failed, pool.outstanding) == (2, 0, 0)
+        finally:
+            pool.shutdown()
+
+    asyncio.run(run())
+
+def test_full_queue_is_rejected_with_retry_after(monkeypatch):
+    async def run():
+        pool = InferenceWorkerPool(num_workers=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def dispatch(executor, engine_name, method_name, kwargs):
+            await release.wait()
+            return "done", False
+
+        monkeypatch.setattr(pool, "_dispatch", dispatch)
+        monkeypatch.setattr(InferenceWorkerPool, "executor", property(lambda self: None))
+        running = [asyncio.ensure_future(pool.submit("mistral", "generate")) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(WorkerPoolSaturated) as excinfo:
+            await pool.submit("mistral", "generate")
+        assert excinfo.value.retry_after >= 1.0
+        release.set()
+        assert await asyncio.gather(*running) == ["done", "done"]
+        assert (pool.rejected, pool.outstanding) == (1, 0)
+
+    asyncio.run(run())